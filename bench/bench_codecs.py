@@ -0,0 +1,75 @@
+# bench_codecs.py — bytes-on-air per IP packet for each RF codec (runs on CPython)
+#
+#   python3 bench/bench_codecs.py
+#
+# Builds a synthetic traffic mix of IPv4 packets, encodes each one with every
+# codec in lib/rf_codec.py and reports the ASCII frame length that AT+SEND
+# puts on the air, plus the largest raw packet that fits MAX_RF_ASCII_BYTES.
+# First it checks that every codec's raw_limit(n) really fits n chars, for
+# n from 3 to 240; the exit status is 1 if one does not.
+
+import os, random, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+from rf_codec import CODECS
+
+MAX_RF_ASCII_BYTES = 220
+
+def ipv4(proto, l4, src=b"\x0a\x0a\x0a\x01", dst=b"\x0a\x0a\x0a\x02", ident=0x1c46):
+    tot = 20 + len(l4)
+    hdr = bytes([0x45, 0, tot >> 8, tot & 0xFF, ident >> 8, ident & 0xFF, 0x40, 0,
+                 64, proto, 0, 0]) + src + dst
+    return hdr + l4
+
+def tcp(flags, payload=b"", opts=b"", seq=0x12345678, ack=0x9abcdef0, win=64240):
+    doff = (20 + len(opts)) // 4
+    hdr = bytes([0xC3, 0x50, 0x00, 0x16]) + seq.to_bytes(4, "big") + ack.to_bytes(4, "big")
+    hdr += bytes([doff << 4, flags, win >> 8, win & 0xFF, 0, 0, 0, 0])
+    return hdr + opts + payload
+
+def rnd(n, seed):
+    r = random.Random(seed)
+    return bytes(r.getrandbits(8) for _ in range(n))
+
+TS_OPT = b"\x01\x01\x08\x0a" + rnd(8, 1)
+MIX = [
+    ("tcp pure ack",        ipv4(6, tcp(0x10))),
+    ("tcp ack + ts",        ipv4(6, tcp(0x10, opts=TS_OPT))),
+    ("icmp echo 56",        ipv4(1, b"\x08\x00\x00\x00\x00\x01\x00\x01" + rnd(56, 2))),
+    ("ssh keystroke",       ipv4(6, tcp(0x18, rnd(36, 3), TS_OPT))),
+    ("http request",        ipv4(6, tcp(0x18, b"GET /status HTTP/1.1\r\nHost: 10.10.10.2\r\n\r\n"))),
+    ("bulk data (mtu 156)", ipv4(6, tcp(0x10, rnd(116, 4)))),
+]
+
+def check_limits():
+    """Encode raw_limit(n) bytes of several patterns with every codec; list the misfits."""
+    bad = []
+    for name, c in CODECS.items():
+        for n in range(3, 241):
+            L = c.raw_limit(n)
+            for pat in (bytes(L), b"\xff" * L, rnd(L, n)):
+                if len(c.encode(pat)) > n or len(c.decode(c.encode(pat))) != L:
+                    bad.append((name, n, L)); break
+    return bad
+
+def main():
+    bad = check_limits()
+    for name, n, L in bad:
+        print("FAIL %s: raw_limit(%d) = %d does not fit" % (name, n, L))
+    names = list(CODECS)
+    print("%-22s %5s" % ("packet", "raw") + "".join(" %9s" % n for n in names))
+    totals = dict((n, 0) for n in names); raw_total = 0
+    for label, pkt in MIX:
+        row = "%-22s %5d" % (label, len(pkt)); raw_total += len(pkt)
+        for n in names:
+            L = len(CODECS[n].encode(pkt)); totals[n] += L
+            row += " %9d" % L
+        print(row)
+    print("%-22s %5d" % ("total", raw_total) + "".join(" %9d" % totals[n] for n in names))
+    print("%-22s %5s" % ("overhead vs raw", "") +
+          "".join(" %8.1f%%" % (100.0 * (totals[n] - raw_total) / raw_total) for n in names))
+    print("%-22s %5s" % ("RAW_LIMIT @%d chars" % MAX_RF_ASCII_BYTES, "") +
+          "".join(" %9d" % CODECS[n].raw_limit(MAX_RF_ASCII_BYTES) for n in names))
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
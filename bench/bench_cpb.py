@@ -0,0 +1,138 @@
+# bench_cpb.py — CPU cost per byte of the host/RF codecs, before vs after
+#
+#   python3 bench/bench_cpb.py [cpu_mhz]
+#
+# Also runs on the board: copy it next to code.py together with lib/ and
+# import it from the REPL. "before" are the per-byte loops the bridges used
+# to carry inline (and the pure-Python base64); "after" is lib/kiss.py and
+# lib/rf_codec.py as shipped; "b91 into" is the allocation-free encoder
+# the TX path uses. Each row keeps the best of several alternating rounds.
+# Cycles are wall time x CPU clock, so on a PC they only compare the two
+# columns — run it on the board for real numbers.
+
+import sys
+try:
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+except (ImportError, AttributeError, NameError):
+    pass                                 # on the board lib/ is already on the path
+import time
+from kiss import KissDecoder, kiss_encode
+from rf_codec import b64encode, b64decode, b91encode, b91decode, _b64encode_py, _b64decode_py, _ALPH91, _b91_into, b91_size
+
+try:
+    _ns = time.monotonic_ns
+except AttributeError:
+    _ns = time.perf_counter_ns
+
+def cpu_mhz():
+    try:
+        import microcontroller
+        return microcontroller.cpu.frequency / 1e6
+    except ImportError:
+        pass
+    if len(sys.argv) > 1:
+        return float(sys.argv[1])
+    try:
+        for ln in open("/proc/cpuinfo"):
+            if ln.startswith("cpu MHz"): return float(ln.split(":")[1])
+    except OSError:
+        pass
+    return 1000.0
+
+# ---- before: the inline per-byte versions ----
+FEND=0xC0; FESC=0xDB; TFEND=0xDC; TFESC=0xDD; KISS_PORT_DATA=0x00
+_k_in=False; _esc=False; _port=False; _buf=bytearray()
+def old_kiss_encode(payload):
+    out=bytearray([FEND, KISS_PORT_DATA])
+    for b in payload:
+        if b==FEND: out.extend([FESC,TFEND])
+        elif b==FESC: out.extend([FESC,TFESC])
+        else: out.append(b)
+    out.append(FEND); return bytes(out)
+def old_kiss_feed(stream):
+    global _k_in,_esc,_port,_buf
+    frames=[]
+    for b in stream:
+        if not _k_in:
+            if b==FEND: _k_in=True; _esc=False; _port=False; _buf=bytearray()
+            continue
+        if b==FEND:
+            if len(_buf)>=1 and _buf[0]==KISS_PORT_DATA: frames.append(bytes(_buf[1:]))
+            _k_in=False; _esc=False; _port=False; _buf=bytearray(); continue
+        if not _port: _buf.append(b); _port=True; continue
+        if _esc:
+            if b==TFEND: _buf.append(FEND)
+            elif b==TFESC: _buf.append(FESC)
+            else: _buf.append(b)
+            _esc=False
+        elif b==FESC: _esc=True
+        else: _buf.append(b)
+    return frames
+
+def old_b91encode(data):
+    out=[]; acc=0; nbits=0
+    for byte in data:
+        acc|=byte<<nbits; nbits+=8
+        if nbits>13:
+            v=acc&8191
+            if v>88: acc>>=13; nbits-=13
+            else: v=acc&16383; acc>>=14; nbits-=14
+            out.append(_ALPH91[v%91]); out.append(_ALPH91[v//91])
+    if nbits:
+        out.append(_ALPH91[acc%91])
+        if nbits>7 or acc>90: out.append(_ALPH91[acc//91])
+    return "".join(out)
+
+# ---- workload ----
+def payload(n, seed=1):
+    # LCG bytes: roughly 1 in 128 is FEND or FESC, like real traffic
+    out = bytearray(n); x = seed
+    for i in range(n):
+        x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+        out[i] = (x >> 16) & 0xFF
+    return bytes(out)
+
+PKT = payload(1500)
+KISS_STREAM = kiss_encode(PKT) * 4
+B64 = b64encode(PKT)
+B91 = b91encode(PKT)
+
+def timed(fn, arg, nbytes, reps):
+    fn(arg)                              # warm-up
+    t0 = _ns()
+    for _ in range(reps): fn(arg)
+    return (_ns() - t0) / (reps * nbytes)
+
+def best(before, after, arg, nbytes, reps, rounds=7):
+    # alternate the two and keep each one's best round: on a busy PC a
+    # single run swings by more than the difference being measured
+    b = a = None
+    for _ in range(rounds):
+        tb = timed(before, arg, nbytes, reps); ta = timed(after, arg, nbytes, reps)
+        b = tb if b is None or tb < b else b; a = ta if a is None or ta < a else a
+    return b, a
+
+RF_BUF = bytearray(b91_size(len(PKT)))
+def b91_into(data):
+    return _b91_into(data, RF_BUF, 0)
+
+def run(reps=5):
+    mhz = cpu_mhz(); dec = KissDecoder(2048)
+    cases = [
+        ("kiss encode", old_kiss_encode, kiss_encode,  PKT,         len(PKT)),
+        ("kiss decode", old_kiss_feed,   dec.feed,     KISS_STREAM, len(KISS_STREAM)),
+        ("b64 encode",  _b64encode_py,   b64encode,    PKT,         len(PKT)),
+        ("b64 decode",  _b64decode_py,   b64decode,    B64,         len(B64)),
+        ("b91 encode",  old_b91encode,   b91encode,    PKT,         len(PKT)),
+        ("b91 into",    old_b91encode,   b91_into,     PKT,         len(PKT)),
+        ("b91 decode",  b91decode,       b91decode,    B91,         len(B91)),
+    ]
+    print("cpu %.0f MHz, cycles/byte" % mhz)
+    print("%-12s %10s %10s %8s" % ("", "before", "after", "speedup"))
+    for name, before, after, arg, n in cases:
+        b, a = best(before, after, arg, n, reps)
+        b *= mhz / 1000; a *= mhz / 1000
+        print("%-12s %10.1f %10.1f %7.1fx" % (name, b, a, b / a))
+
+run()
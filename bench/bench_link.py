@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+# bench_link.py — end-to-end benchmarks of the bridge pair on the host
+#
+# Runs code_A.py and code_B.py unchanged on the emulated RYLR998s in sim/
+# (virtual time, so a 2-minute run takes seconds) and drives IP traffic
+# through them the way the hosts on tnc0 would:
+#
+#   bulk         A -> B TCP-like flow, a window of segments in flight, B ACKs
+#   interactive  keystrokes and echoes both ways (ssh-like)
+#   http         small GETs from A, JSON responses from B
+#   ping         ICMP echo A -> B every few seconds, B replies
+#   mixed        bulk + interactive + ping at once
+#   tcp          one real TCP transfer A -> B (slow start, RTO, fast retransmit, FIN)
+#   --pcap FILE  replays the IPv4 packets of a capture with their timing;
+#                packets from --pcap-a-ip enter at A, the rest at B
+#
+# Reports, per direction: packets sent/delivered, goodput (IP bytes
+# delivered per second of traffic), one-way latency p50/p90/p99; the same
+# latencies per kind of traffic (so interactive latency under a bulk load
+# shows on its own line); plus ping RTT, the bridges' queue drops and the
+# air statistics. --json saves the
+# result, --compare checks it against a saved one and exits 1 if a metric
+# got worse by more than --tolerance.
+#
+#   python3 bench/bench_link.py mixed --duration 120 --json base.json
+#   ... change something ...
+#   python3 bench/bench_link.py mixed --duration 120 --compare base.json
+
+import argparse, json, os, random, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "sim"))
+
+from harness import build_pair
+from packets import tcp, icmp_echo, read_pcap, ip_bytes, TCP_FIN, TCP_SYN, TCP_RST, TCP_ACK, TCP_PSH
+
+IP_A = "10.10.10.1"
+IP_B = "10.10.10.2"
+T_START = 2.0          # let both bridges configure their radios first
+DRAIN_S = 30.0         # keep running after the traffic stops so queues can empty
+
+HTTP_REQ = (b"GET /api/v1/status?node=%d HTTP/1.1\r\nHost: 10.10.10.2\r\n"
+            b"User-Agent: curl/8.5.0\r\nAccept: */*\r\n\r\n")
+HTTP_RESP = (b"HTTP/1.1 200 OK\r\nServer: nginx\r\nContent-Type: application/json\r\n"
+             b"Content-Length: %d\r\nConnection: keep-alive\r\n\r\n")
+
+
+class Flows:
+    """Sends packets at either end and matches them at the other."""
+
+    def __init__(self, clock, a, b):
+        self.clock = clock
+        self.hosts = {"a2b": a.host, "b2a": b.host}
+        self.sent = {"a2b": {}, "b2a": {}}      # packet -> time sent
+        self.kind = {}                           # packet -> scenario that sent it
+        self.lat = {"a2b": [], "b2a": []}
+        self.lat_kind = {}                       # scenario -> one-way latencies, both directions
+        self.bytes = {"a2b": 0, "b2a": 0}
+        self.n_dup = 0
+        self.handlers = []                       # f(direction, packet, t), packets sent with send()
+        self.taps = []                           # f(direction, packet, t), every packet a host gets
+        b.host.on_packet = lambda t, port, p: self._got("a2b", t, port, p)
+        a.host.on_packet = lambda t, port, p: self._got("b2a", t, port, p)
+
+    def send(self, d, pkt, kind="replay"):
+        if pkt in self.sent[d]:
+            return                               # identical bytes can't be told apart
+        self.sent[d][pkt] = self.clock.now; self.kind[pkt] = kind
+        self.hosts[d].send(pkt)
+
+    def _got(self, d, t, port, p):
+        if port != 0:
+            return
+        for h in self.taps:
+            h(d, p, t)
+        t0 = self.sent[d].get(p)
+        if t0 is None:
+            return
+        if t0 < 0:
+            self.n_dup += 1; return
+        self.sent[d][p] = -1.0                   # delivered
+        self.lat[d].append(t - t0); self.bytes[d] += len(p)
+        self.lat_kind.setdefault(self.kind[p], []).append(t - t0)
+        for h in self.handlers:
+            h(d, p, t)
+
+
+# ---------- scenarios ----------
+class Bulk:
+    """A window-limited TCP-like sender; a segment not ACKed in rto_s frees its slot."""
+
+    def __init__(self, flows, rng, seg=200, window=4, rto_s=40.0):
+        self.f = flows; self.seg = seg; self.window = window; self.rto_s = rto_s
+        self.seq = 1000; self.ident = 1; self.inflight = {}    # seq -> time sent
+        flows.handlers.append(self._on)
+
+    def _on(self, d, p, t):
+        if d == "a2b" and p[9] == 6 and p[22:24] == b"\x13\x89":     # data to port 5001
+            seq = int.from_bytes(p[24:28], "big")
+            if seq in self.inflight:
+                del self.inflight[seq]
+                ack = seq + len(p) - 52
+                self.f.send("b2a", tcp(IP_B, IP_A, 5001, 40000, 7000, ack, TCP_ACK,
+                                       ts=(int(t * 1000), 0), ident=self.ident), "bulk")
+                self.ident += 1
+
+    def step(self, now, stop):
+        for s, t0 in list(self.inflight.items()):
+            if now - t0 >= self.rto_s:
+                del self.inflight[s]
+        while now < stop and len(self.inflight) < self.window:
+            data = bytes((self.seq + i) & 0xFF for i in range(self.seg))
+            p = tcp(IP_A, IP_B, 40000, 5001, self.seq, 7000, TCP_ACK | TCP_PSH, data,
+                    ts=(int(now * 1000), 0), ident=self.ident)
+            self.f.send("a2b", p, "bulk"); self.inflight[self.seq] = now
+            self.seq += self.seg; self.ident += 1
+
+
+class Tcp:
+    """A real TCP connection A -> B: handshake, Reno/NewReno sender with an RFC 6298 RTO
+    (200 ms floor, as Linux), a receiver that ACKs every segment, FIN both ways at the end.
+    Sees every packet that reaches either host, so ACKs made up by a bridge count too."""
+
+    PORTS = (40100, 5201)
+
+    def __init__(self, flows, rng, seg=200, rwnd=64000, ws=7):
+        self.f = flows; self.seg = seg; self.rwnd = rwnd; self.ws = ws
+        self.iss = 100000; self.irs = 500000; self.ident = {"a2b": 20000, "b2a": 20000}
+        self.state = "idle"; self.t_open = None; self.t_closed = None
+        # sender (A)
+        self.una = self.nxt = self.iss + 1; self.cwnd = 2.0; self.ssthresh = 1e9; self.dup = 0
+        self.recover = None; self.srtt = None; self.rttvar = 0.0; self.rto = 1.0; self.t_rto = None
+        self.peer_wnd = 0; self.fin_seq = None; self.ts_b = 0; self.segs = {}     # seq -> length
+        self.n_retx = 0; self.n_rto = 0
+        # receiver (B)
+        self.rcv = None; self.ooo = {}; self.ts_a = 0; self.got = 0; self.b_fin = False; self.b_fin_sent = False
+        flows.taps.append(self._on)
+
+    def _send(self, d, seq, ack, flags, data=b"", now=0.0, syn_opts=False):
+        a2b = d == "a2b"
+        src, dst = (IP_A, IP_B) if a2b else (IP_B, IP_A)
+        sp, dp = self.PORTS if a2b else self.PORTS[::-1]
+        win = self.rwnd if syn_opts else self.rwnd >> self.ws
+        p = tcp(src, dst, sp, dp, seq, ack, flags, data, win=min(win, 65535),
+                ts=(int(now * 1000), self.ts_b if a2b else self.ts_a), ident=self.ident[d],
+                ws=self.ws if syn_opts else None)
+        self.ident[d] += 1
+        self.f.send(d, p, "tcp")
+
+    def _xmit(self, seq, now):
+        n = self.segs[seq]
+        if seq == self.fin_seq:
+            self._send("a2b", seq, self.irs + 1, TCP_ACK | TCP_FIN, now=now)
+        else:
+            self._send("a2b", seq, self.irs + 1, TCP_ACK | TCP_PSH, bytes((seq + i) & 0xFF for i in range(n)), now)
+        if self.t_rto is None: self.t_rto = now + self.rto
+
+    def _on(self, d, p, t):
+        if p[9] != 6 or (p[20:22] + p[22:24]) not in (b"\x9c\xa4\x14\x51", b"\x14\x51\x9c\xa4"):
+            return
+        flags = p[33]; seq = int.from_bytes(p[24:28], "big"); ack = int.from_bytes(p[28:32], "big")
+        doff = (p[32] >> 4) * 4; data = len(p) - 20 - doff
+        tsv = int.from_bytes(p[44:48], "big") if doff >= 32 else 0
+        tse = int.from_bytes(p[48:52], "big") if doff >= 32 else 0
+        if d == "a2b":                                       # at B's host
+            self.ts_a = tsv
+            if flags & TCP_SYN:
+                self.rcv = seq + 1
+                self._send("b2a", self.irs, self.rcv, TCP_SYN | TCP_ACK, now=t, syn_opts=True); return
+            if self.rcv is None: return
+            if data or flags & TCP_FIN:
+                if seq == self.rcv:
+                    self.rcv += data + (flags & TCP_FIN); self.got += data
+                    if flags & TCP_FIN: self.b_fin = True
+                    while self.rcv in self.ooo:
+                        n, fin = self.ooo.pop(self.rcv); self.rcv += n + fin; self.got += n
+                        if fin: self.b_fin = True
+                elif seq > self.rcv:
+                    self.ooo[seq] = (data, flags & TCP_FIN)
+                if self.b_fin:                               # our FIN goes with the ACK of theirs
+                    self.b_fin_sent = True
+                    self._send("b2a", self.irs + 1, self.rcv, TCP_ACK | TCP_FIN, now=t)
+                else:
+                    self._send("b2a", self.irs + 1, self.rcv, TCP_ACK, now=t)
+            return
+        # at A's host
+        self.ts_b = tsv
+        if flags & TCP_RST:
+            self.state = "reset"; return
+        if flags & TCP_SYN:
+            if self.state == "syn":
+                self.state = "open"; self.t_open = t; self.peer_wnd = int.from_bytes(p[34:36], "big")
+                self._send("a2b", self.nxt, self.irs + 1, TCP_ACK, now=t); self.t_rto = None
+            return
+        self.peer_wnd = int.from_bytes(p[34:36], "big") << self.ws
+        if ack > self.una:
+            if tse:
+                r = t - tse / 1000.0
+                if self.srtt is None: self.srtt = r; self.rttvar = r / 2
+                else:
+                    self.rttvar += (abs(self.srtt - r) - self.rttvar) / 4; self.srtt += (r - self.srtt) / 8
+                self.rto = max(0.2, self.srtt + 4 * self.rttvar)
+            for s in [s for s in self.segs if s < ack]: del self.segs[s]
+            self.una = ack; self.dup = 0
+            if self.recover is not None:
+                if ack < self.recover:
+                    self._xmit(self.una, t); self.n_retx += 1
+                else:
+                    self.cwnd = self.ssthresh; self.recover = None
+            elif self.cwnd < self.ssthresh: self.cwnd += 1
+            else: self.cwnd += 1.0 / self.cwnd
+            self.t_rto = t + self.rto if self.una < self.nxt else None
+        elif ack == self.una and self.una < self.nxt and not data:
+            self.dup += 1
+            if self.dup == 3 and self.recover is None:
+                self.ssthresh = max((self.nxt - self.una) / self.seg / 2, 2); self.cwnd = self.ssthresh
+                self.recover = self.nxt; self._xmit(self.una, t); self.n_retx += 1
+        if flags & TCP_FIN:
+            self._send("a2b", self.nxt, self.irs + 2, TCP_ACK, now=t)
+            if self.t_closed is None: self.t_closed = t; self.state = "closed"
+
+    def step(self, now, stop):
+        if self.state == "idle" and now >= T_START:
+            self.state = "syn"; self.t_rto = now + self.rto
+            self._send("a2b", self.iss, 0, TCP_SYN, now=now, syn_opts=True)
+        if self.t_rto is not None and now >= self.t_rto:
+            self.n_rto += 1; self.rto = min(self.rto * 2, 60.0); self.t_rto = None
+            if self.state == "syn":
+                self.t_rto = now + self.rto
+                self._send("a2b", self.iss, 0, TCP_SYN, now=now, syn_opts=True); return
+            self.ssthresh = max((self.nxt - self.una) / self.seg / 2, 2); self.cwnd = 1.0
+            self.recover = None; self.dup = 0
+            self.nxt = self.una                               # go back N
+        if self.state != "open" or self.fin_seq is not None and self.nxt > self.fin_seq:
+            return
+        while self.nxt - self.una < min(int(self.cwnd) * self.seg, self.peer_wnd):
+            if self.nxt in self.segs:
+                self.n_retx += 1
+            elif now < stop:
+                self.segs[self.nxt] = self.seg
+            elif self.fin_seq is None or self.nxt == self.fin_seq:
+                self.fin_seq = self.nxt; self.segs[self.nxt] = 0
+            else: break
+            self._xmit(self.nxt, now)
+            self.nxt += self.segs[self.nxt] or 1
+            if self.nxt > (self.fin_seq or self.nxt): break
+
+
+class Interactive:
+    """Keystrokes from either side every few seconds, each echoed by the other."""
+
+    def __init__(self, flows, rng, mean_gap_s=3.0):
+        self.f = flows; self.rng = rng; self.gap = mean_gap_s
+        self.next = {"a2b": T_START, "b2a": T_START + 1.0}
+        self.seq = {"a2b": 1, "b2a": 1}; self.ident = {"a2b": 5000, "b2a": 5000}
+        self.ends = {"a2b": (IP_A, IP_B, 41000, 22), "b2a": (IP_B, IP_A, 22, 41000)}
+        flows.handlers.append(self._on)
+
+    def _seg(self, d, data, now):
+        src, dst, sp, dp = self.ends[d]
+        p = tcp(src, dst, sp, dp, self.seq[d], 1, TCP_ACK | TCP_PSH, data,
+                ts=(int(now * 1000), 0), ident=self.ident[d])
+        self.seq[d] += len(data); self.ident[d] += 1
+        self.f.send(d, p, "interactive")
+
+    def _on(self, d, p, t):
+        if p[9] == 6 and p[22:24] == b"\x00\x16" and len(p) > 52:     # keystroke to port 22
+            self._seg("b2a" if d == "a2b" else "a2b", b"\x1b[0m" + p[52:], t)
+
+    def step(self, now, stop):
+        for d in ("a2b", "b2a"):
+            if now < stop and now >= self.next[d]:
+                self._seg(d, bytes(self.rng.choice(b"abcdefghijklmnop \r") for _ in range(self.rng.randint(1, 8))), now)
+                self.next[d] = now + self.rng.expovariate(1.0 / self.gap)
+
+
+class Http:
+    """One GET every gap_s; each answered with a JSON body of 200-600 bytes."""
+
+    def __init__(self, flows, rng, gap_s=10.0):
+        self.f = flows; self.rng = rng; self.gap = gap_s
+        self.next = T_START; self.n = 0; self.ident = 9000
+        flows.handlers.append(self._on)
+
+    def _on(self, d, p, t):
+        if d != "a2b" or p[9] != 6 or p[22:24] != b"\x00\x50":
+            return
+        sport = int.from_bytes(p[20:22], "big")
+        body = json.dumps({"id": sport, "name": "node-%d" % sport, "status": "ok",
+                           "data": [{"value": self.rng.randint(0, 999), "type": "temp"}
+                                    for _ in range(self.rng.randint(3, 12))]}).encode()
+        resp = HTTP_RESP % len(body) + body
+        seq = 9000
+        for i in range(0, len(resp), 400):
+            self.f.send("b2a", tcp(IP_B, IP_A, 80, sport, seq, 1 + len(p) - 52, TCP_ACK | TCP_PSH,
+                                   resp[i:i + 400], ts=(int(t * 1000), 0), ident=self.ident), "http")
+            seq += len(resp[i:i + 400]); self.ident += 1
+
+    def step(self, now, stop):
+        if now < stop and now >= self.next:
+            self.n += 1
+            self.f.send("a2b", tcp(IP_A, IP_B, 50000 + self.n, 80, 1, 9000, TCP_ACK | TCP_PSH,
+                                   HTTP_REQ % self.n, ts=(int(now * 1000), 0), ident=self.n), "http")
+            self.next = now + self.gap
+
+
+class Ping:
+    """ICMP echo A -> B every gap_s; B's host answers every request it sees."""
+
+    def __init__(self, flows, rng, gap_s=5.0, size=56):
+        self.f = flows; self.gap = gap_s; self.size = size
+        self.next = T_START; self.seq = 0; self.out = {}; self.rtt = []
+        flows.handlers.append(self._on)
+
+    def _on(self, d, p, t):
+        if p[9] != 1:
+            return
+        seq = int.from_bytes(p[26:28], "big")
+        if d == "a2b" and p[20] == 8:
+            self.f.send("b2a", icmp_echo(IP_B, IP_A, 77, seq, p[28:], reply=True, ip_ident=seq), "ping")
+        elif d == "b2a" and p[20] == 0 and seq in self.out:
+            self.rtt.append(t - self.out.pop(seq))
+
+    def step(self, now, stop):
+        if now < stop and now >= self.next:
+            self.seq += 1; self.out[self.seq] = now
+            self.f.send("a2b", icmp_echo(IP_A, IP_B, 77, self.seq, bytes(range(self.size)),
+                                         ip_ident=self.seq), "ping")
+            self.next = now + self.gap
+
+
+class Replay:
+    """Packets of a capture at their recorded offsets from the first one."""
+
+    def __init__(self, flows, rng, path, a_ip, speed=1.0):
+        self.f = flows; a = ip_bytes(a_ip); self.pkts = []
+        t0 = None
+        for ts, p in read_pcap(path):
+            if t0 is None: t0 = ts
+            self.pkts.append((T_START + (ts - t0) / speed, "a2b" if p[12:16] == a else "b2a", p))
+        self.i = 0
+
+    def step(self, now, stop):
+        while self.i < len(self.pkts) and self.pkts[self.i][0] <= now < stop:
+            _, d, p = self.pkts[self.i]; self.f.send(d, p); self.i += 1
+
+
+SCENARIOS = {
+    "bulk": (Bulk,),
+    "interactive": (Interactive,),
+    "http": (Http,),
+    "ping": (Ping,),
+    "mixed": (Bulk, Interactive, Ping),
+    "tcp": (Tcp,),
+}
+
+
+# ---------- run ----------
+def pct(v, q):
+    if not v: return None
+    v = sorted(v)
+    return round(v[min(len(v) - 1, int(q * len(v)))], 3)
+
+
+def run(args):
+    clock, air, a, b, logs = build_pair(t_end=args.duration + DRAIN_S, loss=args.loss, seed=args.seed,
+                                        path_loss_db=args.path_loss, use_asyncio=not args.polling,
+                                        script_a=args.script_a, script_b=args.script_b)
+    rng = random.Random(args.seed)
+    flows = Flows(clock, a, b)
+    if args.pcap:
+        gens = [Replay(flows, rng, args.pcap, args.pcap_a_ip, args.pcap_speed)]
+    else:
+        gens = [g(flows, rng) for g in SCENARIOS[args.scenario]]
+    stop = args.duration
+
+    def hosts():
+        while True:
+            for g in gens: g.step(clock.now, stop)
+            a.host.pump(); b.host.pump()
+            clock.sleep(0.005)
+
+    a.start(); b.start(); clock.spawn(hosts, "hosts")
+    clock.run()
+
+    span = max(stop - T_START, 1e-9)
+    res = {"scenario": "pcap:" + os.path.basename(args.pcap) if args.pcap else args.scenario,
+           "duration": args.duration, "loss": args.loss, "path_loss": args.path_loss,
+           "seed": args.seed, "mode": "polling" if args.polling else "asyncio"}
+    for d in ("a2b", "b2a"):
+        n = len(flows.sent[d]); got = len(flows.lat[d])
+        res[d] = {"sent": n, "delivered": got,
+                  "ratio": round(got / n, 3) if n else None,
+                  "goodput_bps": round(flows.bytes[d] * 8 / span, 1),
+                  "lat_p50": pct(flows.lat[d], 0.50), "lat_p90": pct(flows.lat[d], 0.90),
+                  "lat_p99": pct(flows.lat[d], 0.99)}
+    res["kinds"] = {}
+    for k, v in sorted(flows.lat_kind.items()):
+        res["kinds"][k] = {"delivered": len(v), "lat_p50": pct(v, 0.50), "lat_p90": pct(v, 0.90)}
+    for g in gens:
+        if isinstance(g, Ping):
+            res["ping"] = {"sent": g.seq, "answered": len(g.rtt),
+                           "rtt_p50": pct(g.rtt, 0.50), "rtt_p90": pct(g.rtt, 0.90)}
+        if isinstance(g, Tcp):
+            res["tcp"] = {"goodput_bps": round(g.got * 8 / span, 1), "bytes": g.got, "retx": g.n_retx,
+                          "rto": g.n_rto, "srtt": round(g.srtt or 0, 2), "state": g.state,
+                          "closed_at": round(g.t_closed, 1) if g.t_closed else None}
+    res["drops"] = {"A": (a.globals or {}).get("dropped", 0), "B": (b.globals or {}).get("dropped", 0)}
+    res["dup"] = flows.n_dup
+    res["air"] = dict(air.stats, airtime_s=round(air.stats["airtime_s"], 2))
+    if args.verbose:
+        for t, name, line in logs:
+            if "STATS:" in line and t > clock.now - 15: print("%s %s" % (name, line))
+    return res
+
+
+# ---------- compare ----------
+# metric -> +1 if higher is better, -1 if lower is better
+METRICS = {"delivered": 1, "goodput_bps": 1, "lat_p50": -1, "lat_p90": -1}
+
+
+def compare(res, base, tol):
+    """List of regressions of res against base, each a printable line."""
+    bad = []
+    groups = [(d, res[d], base.get(d, {})) for d in ("a2b", "b2a")]
+    groups += [(k, v, base.get("kinds", {}).get(k, {})) for k, v in res.get("kinds", {}).items()]
+    for d, cur, old_d in groups:
+        for m, sign in METRICS.items():
+            new, old = cur.get(m), old_d.get(m)
+            if new is None or old is None or old == 0:
+                continue
+            change = (new - old) / abs(old)
+            flag = sign * change < -tol
+            print("  %-11s %-12s %10s -> %-10s %+6.1f%%%s" % (d, m, old, new, change * 100,
+                                                        "  REGRESSION" if flag else ""))
+            if flag: bad.append("%s %s" % (d, m))
+    return bad
+
+
+def show(res):
+    print("%s  %.0fs  loss=%.2f  path_loss=%.0fdB  seed=%d  %s" % (
+        res["scenario"], res["duration"], res["loss"], res["path_loss"], res["seed"], res["mode"]))
+    for d in ("a2b", "b2a"):
+        r = res[d]
+        if not r["sent"]: continue
+        print("  %s sent=%d delivered=%d (%s) goodput=%.0fbps lat p50/p90/p99=%s/%s/%s s" % (
+            d, r["sent"], r["delivered"], r["ratio"], r["goodput_bps"],
+            r["lat_p50"], r["lat_p90"], r["lat_p99"]))
+    for k, r in res.get("kinds", {}).items():
+        print("  %-11s delivered=%d lat p50/p90=%s/%s s" % (k, r["delivered"], r["lat_p50"], r["lat_p90"]))
+    if "tcp" in res:
+        c = res["tcp"]
+        print("  tcp goodput=%.0fbps (%d B in order) retx=%d rto=%d srtt=%ss %s, closed at %s" % (
+            c["goodput_bps"], c["bytes"], c["retx"], c["rto"], c["srtt"], c["state"], c["closed_at"]))
+    if "ping" in res:
+        p = res["ping"]
+        print("  ping %d/%d answered, rtt p50/p90=%s/%s s" % (p["answered"], p["sent"], p["rtt_p50"], p["rtt_p90"]))
+    print("  drops A=%d B=%d dup=%d  air %s" % (res["drops"]["A"], res["drops"]["B"], res["dup"], res["air"]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end benchmark of the KISS<->RYLR998 bridge pair")
+    ap.add_argument("scenario", nargs="?", default="mixed", choices=sorted(SCENARIOS))
+    ap.add_argument("--duration", type=float, default=120.0, help="seconds of traffic (virtual)")
+    ap.add_argument("--loss", type=float, default=0.0, help="random frame loss on the air, 0..1")
+    ap.add_argument("--path-loss", type=float, default=60.0, help="dB between the nodes")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--polling", action="store_true", help="run the bridges without asyncio")
+    ap.add_argument("--pcap", help="replay the IPv4 packets of a libpcap file instead")
+    ap.add_argument("--pcap-a-ip", default=IP_A, help="packets from this address enter at A")
+    ap.add_argument("--pcap-speed", type=float, default=1.0, help="replay speed-up factor")
+    ap.add_argument("--script-a", default="code_A.py")
+    ap.add_argument("--script-b", default="code_B.py")
+    ap.add_argument("--json", metavar="OUT", help="write the result to OUT")
+    ap.add_argument("--compare", metavar="BASE", help="compare against a saved result")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    ap.add_argument("-v", "--verbose", action="store_true", help="print the bridges' last STATS lines")
+    args = ap.parse_args()
+
+    res = run(args)
+    show(res)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        print("compare with %s:" % args.compare)
+        bad = compare(res, base, args.tolerance)
+        if bad:
+            print("regressed: " + ", ".join(bad))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
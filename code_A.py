@@ -2,177 +2,222 @@
 # Side A:
 #   - A-RX listens on 915.000 MHz with ADDRESS=3  (peer B-TX sends here)
 #   - A-TX sends  to 916.000 MHz with ADDRESS=2 -> target B-RX=1
-# Priority queues preserved: ACK > DATA > ICMP; base64 framing; KISS over usb_cdc.data
+# Priority queues preserved: ACK > DATA > ICMP; base64/basE91 framing; KISS over usb_cdc.data
+# PEERS/ROUTES turn it into a hub for several remote bridges: queues, ARQ and
+# header compression are kept per peer and the TX radio's airtime is shared.
 
 import time, binascii, usb_cdc
-from rylr998_cp import RYLR998
+from rylr998_cp import RYLR998, configure
+from rf_codec import CODECS, codec_for, bundle, bundle_size, unbundle, T_ADR, T_BOND
+from pkt_peek import ip_header_peek, ip_peek, is_pure_tcp_ack, tcp_ack_key, superseded_ack, flow_hash
+from hdrcomp import HeaderCompressor, HeaderDecompressor
+from frag import Fragmenter, Reassembler, frag_capacity, FRAG_MAX
+from pktqueue import Ring, PrioQueue, FlowQueue, ACK, DATA, LO
+from arq import ArqLink, ARQ_HDR
+from fec import FecEncoder, FecDecoder, FEC_HDR
+from adr import AdrLink
+from bond import BondLink
+from pep import TcpPep
+from lzss import LzCompressor, LzDecompressor
+from kiss import KissDecoder, KissEncoder, kiss_encode
+from kisscmd import Persist, parse_hw, HW_RADIO, KISS_SETHW
+from telemetry import Telemetry, Heap, ticks_us
+from route import Peer, RouteTable, AirtimeDrr
 import board, busio
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
 
-# ========= PER-DEVICE ADDRESSES (Side A) =========
+# ========= PER-DEVICE SETTINGS (Side A) =========
+# code_A.py and code_B.py differ only in this block (and the header comment);
+# tests/test_scripts.py fails if the rest of the two drifts apart.
+SIDE       = "A"
 MY_ADDR_RX = 3            # A-RX (listens)
 MY_ADDR_TX = 2            # A-TX (sends)
-PEER_TX_ADDR_DEFAULT = 1  # default send target = B-RX
+BAND_RX_HZ = 915_000_000  # A-RX listens here (B-TX transmits here)
+BAND_TX_HZ = 916_000_000  # A-TX transmits here (B-RX listens here)
 
-# Optional per-destination routing by IP (expand if needed)
-IP_TO_ADDR = { "10.10.10.1": 1, "10.10.10.2": 2, "10.10.10.3": 3, "10.10.10.4": 4 }
+# Remote bridges: (address of its RX radio = our AT+SEND target, address its TX radio sends from).
+# PEERS[0] is the default route; list more to serve several remote endpoints from this one.
+PEERS = ((1, 4),)         # B-RX / B-TX
+# IPv4 prefix -> PEERS index, or a tuple of indices that all reach it (the best heard link wins)
+ROUTES = (("10.10.10.2/32", 0),)   # host B (tnc0)
+PEER_DEAD_S = 120.0       # a peer not heard from for this long loses shared routes to one that is
+AIRTIME_QUANTUM_S = 2.0   # TX airtime each backlogged peer gets per scheduling round
 
 # ========= RADIO / PHY (freq-split FD) =========
 NETWORK_ID = 18
-BAND_RX_HZ = 915_000_000  # A-RX listens here (B-TX transmits here)
-BAND_TX_HZ = 916_000_000  # A-TX transmits here (B-RX listens here)
 TX_DBM     = 10
 PARAM_SF   = 10
 PARAM_BW   = 125
 PARAM_CR   = 4
 PARAM_PRE  = 16
+CFG_TIMEOUT_S = 2.0       # bound on the boot-time radio configuration (both radios together)
 
 # ========= TX pacing (optional) =========
-TX_MIN_GAP_S = 1.30
+TX_AIRTIME_PACING = True   # send as soon as the radio reports the last AT+SEND done (+OK / time-on-air)
+TX_GUARD_S   = 0.05        # idle time after a TX completes, airtime pacing only
+TX_MIN_GAP_S = 1.30        # fixed send-to-send gap when TX_AIRTIME_PACING is off
+KISS_CMD     = True        # take KISS commands from the host: TXDELAY (= TX_GUARD_S), P, SLOTTIME, FULLDUPLEX, SETHW
+KISS_FULLDUPLEX = True     # send whenever the radio is free; False: p-persistence, for peers sharing a band
+KISS_PERSIST = 63          # ...a send opportunity is taken with probability (P+1)/256
+KISS_SLOT_S  = 0.10        # ...and the next try comes this much later
 
 # ========= FRAME SIZE LIMITS =========
-KISS_MTU_BYTES      = 156
+KISS_MTU_BYTES      = 576     # largest host packet; frames over one AT+SEND are fragmented
 MAX_RF_ASCII_BYTES  = 220
-B64_PREFIX          = "B:"
+RF_CODEC            = "b91"   # TX encoding: "b64" (B: prefix) or "b91" (Z: prefix); RX accepts both
+HC_ENABLE           = True    # TCP/IP header compression on TX; RX always decodes it
+AGG_ENABLE          = True    # pack several queued frames into one AT+SEND
+ACK_THIN            = True    # a newer cumulative ACK replaces the flow's queued one
+LZ_ENABLE           = False   # LZSS-compress frames that shrink; RX always decompresses
+LZ_PRESET           = True    # prime the window with common HTTP/JSON/shell text (both ends have it)
+FRAG_ENABLE         = True    # split frames longer than one AT+SEND; RX always reassembles
+FRAG_SLOTS          = 4       # packets being reassembled at once
+FRAG_TIMEOUT_S      = 20.0    # drop a half-received packet after this long
+ARQ_ENABLE          = False   # sequence RF frames and re-send lost ones; RX always ACKs
+ARQ_WINDOW          = 8       # unacknowledged frames in flight (max 8)
+ARQ_TRIES           = 4       # sends per frame before giving up on it
+ARQ_HOLD_S          = 8.0     # longest the peer holds in-order frames behind a gap
+ARQ_INORDER         = (DATA,) # queue tiers (ACK, DATA, LO) the peer must deliver in order
+FEC_ENABLE          = False   # parity frames let the peer rebuild lost frames without a re-send; RX always decodes
+FEC_K               = (4, 8, 4)  # frames per parity group for ACK, DATA, LO
+FEC_M               = (1, 1, 0)  # parity frames per group (0 = no FEC for that class, max 3)
+FEC_FLUSH_S         = 2.0     # send parity for a partial group after this long
+ADR_ENABLE          = False   # pick SF/BW/CR per direction from the SNR/RSSI the peer reports; both ends must enable it
+ADR_PROFILES        = ((PARAM_SF, PARAM_BW, PARAM_CR, PARAM_PRE),   # (sf, bw kHz, cr, preamble), robust first
+                       (9, 125, 1, 12), (8, 125, 1, 12), (7, 125, 1, 12), (7, 250, 1, 12))
+ADR_MARGIN_DB       = 10.0    # SNR kept above what the SF needs
+ADR_REPORT_S        = 5.0     # link-quality report interval
+ADR_FALLBACK_S      = 30.0    # back to ADR_PROFILES[0] after this long without hearing the peer
+BOND_ENABLE         = False   # borrow the peer's TX band while we are backlogged and it has nothing to send; both ends must enable it
+BOND_BACKLOG        = 4       # frames queued before asking for a loan
+BOND_LOAN_FRAMES    = 3       # loan length, in full-size AT+SENDs on the lent band
+PEP_ENABLE          = False   # ACK the host's TCP data here and see it across ourselves (split-ACK proxy)
+PEP_FLOWS           = 4       # TCP connections tracked at once; later ones pass through untouched
+PEP_BUF_BYTES       = 4096    # per flow: bytes ACKed to the host but not yet by the far end
+PEP_RTO_S           = 10.0    # shortest re-send timeout for data the far end hasn't ACKed
+PEP_TRIES           = 5       # re-sends without progress before both ends get an RST
+
+# ========= SCHEDULING =========
+USE_ASYNCIO   = True      # one task per stage when the asyncio library is installed; else the poll loop
+HOST_READ_MAX = 512       # bytes per USB read
+TX_POLL_S     = 0.01      # how often a busy TX radio is checked for +OK
+POLL_S        = 0.005     # wait between polls for a port without stream support
+ARQ_TICK_S    = 0.1       # timer resolution for ARQ re-sends while TX is otherwise idle
+GC_COLLECT_S  = 1.0       # timed gc.collect() this often, so pauses stay short and regular (0 = when the heap fills)
+FQ_ENABLE     = True      # DATA and ICMP share per-flow queues served round robin (FQ-CoDel); else DATA > ICMP lists
+FQ_FLOWS      = 16        # flow buckets
+FQ_QUANTUM    = 256       # bytes a flow sends per round
+FQ_TARGET_S   = 2.0       # CoDel: queueing delay a flow may keep standing...
+FQ_INTERVAL_S = 10.0      # ...and for how long before its oldest packets are dropped
 
 # ========= DEBUG =========
 PRINT_BLOCKS  = True
-ENQUEUE_DEBUG = True
-
-# ========= Minimal base64 =========
-_ALPH = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
-_IDX  = {c: i for i, c in enumerate(_ALPH)}
-def b64encode(data):
-    out=[]; n=len(data); i=0
-    while i<n:
-        rem=n-i
-        if rem>=3: b0,b1,b2=data[i],data[i+1],data[i+2]; i+=3; pad=0
-        elif rem==2: b0,b1,b2=data[i],data[i+1],0; i+=2; pad=1
-        else: b0,b1,b2=data[i],0,0; i+=1; pad=2
-        triple=(b0<<16)|(b1<<8)|b2
-        out.append(_ALPH[(triple>>18)&0x3F]); out.append(_ALPH[(triple>>12)&0x3F])
-        out.append(_ALPH[(triple>>6)&0x3F] if pad<2 else '=')
-        out.append(_ALPH[triple&0x3F]      if pad<1 else '=')
-    return "".join(out)
-def b64decode(s):
-    s="".join(ch for ch in s if ch not in "\r\n\t "); out=bytearray(); i=0; L=len(s)
-    while i<L:
-        c0=s[i] if i<L else 'A'; i+=1; c1=s[i] if i<L else 'A'; i+=1
-        c2=s[i] if i<L else 'A'; i+=1; c3=s[i] if i<L else 'A'; i+=1
-        pad=0
-        if c2=='=': pad=2; c2='A'; c3='A'
-        elif c3=='=': pad=1; c3='A'
-        n=(_IDX.get(c0,0)<<18)|(_IDX.get(c1,0)<<12)|(_IDX.get(c2,0)<<6)|_IDX.get(c3,0)
-        out.append((n>>16)&0xFF)
-        if pad<2: out.append((n>>8)&0xFF)
-        if pad<1: out.append(n&0xFF)
-    return bytes(out)
-def raw_limit_for_rf(max_ascii=MAX_RF_ASCII_BYTES, prefix_len=len(B64_PREFIX)):
-    return ((max_ascii - prefix_len) * 3) // 4
-RAW_LIMIT = min(KISS_MTU_BYTES + 4, raw_limit_for_rf())
+ENQUEUE_DEBUG = False     # one console line per queued packet
+RX_DEBUG      = False     # one console line (with header dump) per received packet
+TLM_INTERVAL_S = 10.0     # JSON telemetry snapshot period (0 = off)
+TLM_PORT      = None      # None: "TLM {...}" on the console; 1-15: KISS frames on that port of the data CDC
+
+# ========= RF codec =========
+codec = CODECS[RF_CODEC]
+RF_RAW_MAX = (codec.raw_limit(MAX_RF_ASCII_BYTES) - (ARQ_HDR if ARQ_ENABLE else 0)
+              - (FEC_HDR if FEC_ENABLE else 0))  # link-frame bytes per AT+SEND
+RAW_LIMIT = min(KISS_MTU_BYTES + 4, frag_capacity(RF_RAW_MAX) if FRAG_ENABLE else RF_RAW_MAX)
+lz_tx = LzCompressor(use_dict=LZ_PRESET)
+lz_rx = LzDecompressor(limit=RAW_LIMIT + 32)
+frag_tx = Fragmenter()
+frag_rx = Reassembler(slots=FRAG_SLOTS, max_bytes=RAW_LIMIT + 32, timeout_s=FRAG_TIMEOUT_S)
+INORDER_MASK = sum(1 << t for t in ARQ_INORDER)
+fec_tx = FecEncoder(FEC_K, FEC_M, max_frame=codec.raw_limit(MAX_RF_ASCII_BYTES), flush_s=FEC_FLUSH_S)
+fec_rx = FecDecoder()
 
 # ========= Stats =========
-tx_frames=0; tx_bytes=0; rx_frames=0; rx_bytes=0
-host_to_kiss_bytes=0; kiss_to_host_frames=0; last_stats=time.monotonic()
+tx_frames=0; tx_bytes=0; tx_pkts=0; rx_frames=0; rx_bytes=0; acks_thinned=0; dropped=0; rx_unknown=0
+host_to_kiss_bytes=0; kiss_to_host_frames=0; last_stats=time.monotonic(); last_tlm=last_stats; last_gc=last_stats
+tlm = Telemetry()
+heap = Heap(tlm.gc)
 
 # ========= KISS =========
-FEND=0xC0; FESC=0xDB; TFEND=0xDC; TFESC=0xDD; KISS_PORT_DATA=0x00
-_k_in=False; _esc=False; _port=False; _buf=bytearray()
-def kiss_encode(payload):
-    out=bytearray([FEND, KISS_PORT_DATA])
-    for b in payload:
-        if b==FEND: out.extend([FESC,TFEND])
-        elif b==FESC: out.extend([FESC,TFESC])
-        else: out.append(b)
-    out.append(FEND); return bytes(out)
-def kiss_feed(stream):
-    global _k_in,_esc,_port,_buf
-    frames=[]
-    for b in stream:
-        if not _k_in:
-            if b==FEND: _k_in=True; _esc=False; _port=False; _buf=bytearray()
-            continue
-        if b==FEND:
-            if len(_buf)>=1 and _buf[0]==KISS_PORT_DATA: frames.append(bytes(_buf[1:]))
-            _k_in=False; _esc=False; _port=False; _buf=bytearray(); continue
-        if not _port: _buf.append(b); _port=True; continue
-        if _esc:
-            if b==TFEND: _buf.append(FEND)
-            elif b==TFESC: _buf.append(FESC)
-            else: _buf.append(b)
-            _esc=False
-        elif b==FESC: _esc=True
-        else: _buf.append(b)
-    return frames
-
-# ========= IP/TCP helpers =========
-def ip_header_peek(pkt):
-    off=0
-    if len(pkt)>=4 and pkt[0:2]==b"\x00\x00" and pkt[2:4] in (b"\x08\x00", b"\x86\xDD"): off=4
-    if len(pkt)<off+20: return "short", off
-    vihl=pkt[off]; v=(vihl>>4)&0xF; ihl=(vihl&0xF)*4
-    tot=(pkt[off+2]<<8)|pkt[off+3]; proto=pkt[off+9]
-    src=".".join(str(b) for b in pkt[off+12:off+16])
-    dst=".".join(str(b) for b in pkt[off+16:off+20])
-    return "v%d ihl=%d tot=%d proto=%d %s->%s"%(v,ihl,tot,proto,src,dst), off
-def ip_dst_addr(pkt):
-    info, off = ip_header_peek(pkt)
-    if info.startswith("short"): return ""
-    return ".".join(str(b) for b in pkt[off+16:off+20])
-def ip_peek(pkt):
-    off=0
-    if len(pkt)>=4 and pkt[0:2]==b"\x00\x00" and pkt[2:4] in (b"\x08\x00", b"\x86\xDD"): off=4
-    if len(pkt)<off+20: return None,0,0,off
-    vihl=pkt[off]; ihl=(vihl&0x0F)*4; tot=(pkt[off+2]<<8)|pkt[off+3]; proto=pkt[off+9]
-    return proto, tot, ihl, off
-def tcp_peek(pkt, off, ihl):
-    if len(pkt) < off+ihl+20: return None,None,None
-    doff=((pkt[off+ihl]>>4)&0xF)*4
-    if len(pkt) < off+ihl+doff: return None,None,None
-    flags=pkt[off+ihl+13]; tot=(pkt[off+2]<<8)|pkt[off+3]
-    data_len=tot - ihl - doff
-    if data_len<0: data_len=0
-    return flags, doff, data_len
-def is_pure_tcp_ack(pkt):
-    proto, tot, ihl, off = ip_peek(pkt)
-    if proto != 6: return False
-    flags, doff, data_len = tcp_peek(pkt, off, ihl)
-    if flags is None: return False
-    return (flags & 0x10) and (data_len == 0)
+kiss_rx = KissDecoder(max_frame=KISS_MTU_BYTES + 64)
+kiss_tx = KissEncoder(max_frame=KISS_MTU_BYTES + 64)
+rf_buf = bytearray(MAX_RF_ASCII_BYTES + 8)     # AT+SEND payload, encoded in place
+persist = Persist(KISS_PERSIST, KISS_SLOT_S, KISS_FULLDUPLEX)
 
 # ========= Hardware: two radios =========
-uart0 = busio.UART(tx=board.GP0, rx=board.GP1, baudrate=115200, timeout=0.01)  # RX radio
+uart0 = busio.UART(tx=board.GP0, rx=board.GP1, baudrate=115200, timeout=0.01,
+                   receiver_buffer_size=1024)  # RX radio: room for ~4 +RCV lines between polls
 rx_radio = RYLR998(uart=uart0, baud=115200)
-uart1 = busio.UART(tx=board.GP4, rx=board.GP5, baudrate=115200, timeout=0.01)  # TX radio
+uart1 = busio.UART(tx=board.GP4, rx=board.GP5, baudrate=115200, timeout=0.01, receiver_buffer_size=1024)  # TX radio (receives while lending its band)
 tx_radio = RYLR998(uart=uart1, baud=115200)
+adr = AdrLink(ADR_PROFILES, tx_radio.set_params_nb, rx_radio.set_params_nb,
+              margin_db=ADR_MARGIN_DB, report_s=ADR_REPORT_S, fallback_s=ADR_FALLBACK_S)
+if ADR_ENABLE and len(PEERS) > 1:
+    print("ADR retunes the one TX radio for every peer: off with %d peers" % len(PEERS))
+    ADR_ENABLE = False
+bond = BondLink(backlog=BOND_BACKLOG)
+if BOND_ENABLE and len(PEERS) > 1:
+    print("BOND lends a band to one peer: off with %d peers" % len(PEERS))
+    BOND_ENABLE = False
 
 def cfg_radio(r, addr, band_hz):
-    for fn,arg in (("set_network",NETWORK_ID),
-                   ("set_band",band_hz),
-                   ("set_power",TX_DBM),
-                   ("set_address",addr)):
-        try: getattr(r, fn)(arg)
-        except: pass
-    try: r.set_params(sf=PARAM_SF,bw=PARAM_BW,cr=PARAM_CR,preamble=PARAM_PRE)
-    except: pass
+    # only settings the module doesn't already hold are written (see configure)
+    r.cfg_start((("NETWORKID", NETWORK_ID),
+                 ("BAND", band_hz),
+                 ("CRFOP", TX_DBM),
+                 ("ADDRESS", addr),
+                 ("PARAMETER", (PARAM_SF, PARAM_BW, PARAM_CR, PARAM_PRE))))
 
-# Apply split frequencies
-cfg_radio(rx_radio, MY_ADDR_RX, BAND_RX_HZ)  # listens 915.000 MHz
-cfg_radio(tx_radio, MY_ADDR_TX, BAND_TX_HZ)  # sends   916.000 MHz
+# Apply split frequencies, both radios at once
+t_cfg = time.monotonic()
+cfg_radio(rx_radio, MY_ADDR_RX, BAND_RX_HZ)  # listens
+cfg_radio(tx_radio, MY_ADDR_TX, BAND_TX_HZ)  # sends
+cfg_ok = configure((rx_radio, tx_radio), timeout_s=CFG_TIMEOUT_S)
+print("CFG %s in %.2fs" % ("ok" if cfg_ok else "INCOMPLETE", time.monotonic() - t_cfg))
+print("CFG RX", rx_radio.cfg_report())
+print("CFG TX", tx_radio.cfg_report())
 
 # ========= USB/KISS =========
 ser = usb_cdc.data
 try: ser.timeout = 0
 except: pass
 
-print("FD up (Side A). RXaddr=%d@%d Hz  TXaddr=%d@%d Hz RAW_LIMIT=%dB"
-      % (MY_ADDR_RX, BAND_RX_HZ, MY_ADDR_TX, BAND_TX_HZ, RAW_LIMIT))
+print("FD up (Side %s). RXaddr=%d@%d Hz  TXaddr=%d@%d Hz RAW_LIMIT=%dB codec=%s"
+      % (SIDE, MY_ADDR_RX, BAND_RX_HZ, MY_ADDR_TX, BAND_TX_HZ, RAW_LIMIT, codec.name))
 
-# ========= Queues =========
+# ========= Peers and queues =========
 ACK_MAX, DATA_MAX, LO_MAX = 12, 16, 4
-q_ack, q_data, q_lo = [], [], []
+
+def make_peer(i, addr, src):
+    p = Peer(i, addr, src)
+    p.pq = PrioQueue(ACK_MAX, DATA_MAX, LO_MAX)
+    p.q_ack, p.q_data, p.q_lo = p.pq.tiers
+    p.fq = FlowQueue(DATA_MAX + LO_MAX, FQ_FLOWS, FQ_QUANTUM, FQ_TARGET_S, FQ_INTERVAL_S)  # replaces q_data/q_lo when FQ_ENABLE
+    p.tx_ready = Ring(FRAG_MAX)   # fragments of the packet being sent
+    p.carry = None                # frame popped and compressed but left out of the last bundle
+    p.arq = ArqLink(window=ARQ_WINDOW, max_tries=ARQ_TRIES, hold_s=ARQ_HOLD_S)
+    p.hc_tx = HeaderCompressor(max_frame=RF_RAW_MAX)
+    p.hc_rx = HeaderDecompressor()
+    return p
+
+peers = [make_peer(i, a, s) for i, (a, s) in enumerate(PEERS)]
+routes = RouteTable(peers, ROUTES, dead_s=PEER_DEAD_S)
+sched = AirtimeDrr(peers, AIRTIME_QUANTUM_S)
 last_rf_tx = 0.0
 _block = {"empty":0}
 
+def psum(f):
+    n = 0
+    for p in peers: n += f(p)
+    return n
+
+def queued(p):
+    return len(p.q_ack) + len(p.tx_ready) + len(p.fq) + len(p.q_data) + len(p.q_lo) + (p.carry is not None)
+
+def can_send(p):
+    return queued(p) and (not ARQ_ENABLE or p.arq.can_send())
+
 def classify_for_queue(payload):
     proto, tot, ihl, off = ip_peek(payload)
     if proto == 1: return 'lo'
@@ -180,103 +225,518 @@ def classify_for_queue(payload):
     return 'data'
 
 def enqueue(payload):
+    global acks_thinned, dropped
     if len(payload) > RAW_LIMIT:
-        print("DROP oversize", len(payload)); return
-    dst_ip = ip_dst_addr(payload)
-    dest_addr = IP_TO_ADDR.get(dst_ip, PEER_TX_ADDR_DEFAULT)
-    ascii_frame = B64_PREFIX + b64encode(payload)
-    if len(ascii_frame) > MAX_RF_ASCII_BYTES:
-        print("DROP ascii too long", len(ascii_frame)); return
-    raw_len = (len(ascii_frame) - len(B64_PREFIX)) * 3 // 4
+        print("DROP oversize", len(payload)); dropped += 1; return
+    now = time.monotonic()
+    p = routes.lookup(payload, ip_peek(payload)[3], now)
+    dest_addr = p.addr
+    raw_len = len(payload)
     cls = classify_for_queue(payload)
     if cls == 'ack':
-        if len(q_ack) < ACK_MAX:
-            q_ack.append((dest_addr, ascii_frame, raw_len))
+        key = tcp_ack_key(payload) if ACK_THIN else None
+        j = superseded_ack(p.q_ack, key) if key else -1
+        if j >= 0:
+            p.q_ack.put_at(j, dest_addr, payload, raw_len); acks_thinned += 1
+            if ENQUEUE_DEBUG: print("ENQACK thin len=%d" % len(payload))
+            return
+        if p.q_ack.push(dest_addr, payload, raw_len, now):
             if ENQUEUE_DEBUG: print("ENQACK len=%d" % len(payload))
         else:
-            if q_data: q_data.pop(0)
+            (p.fq if FQ_ENABLE else p.q_data).drop_oldest(); dropped += 1
+        return
+    if FQ_ENABLE:
+        if not p.fq.push(flow_hash(payload), dest_addr, payload, raw_len, now, DATA if cls == 'data' else LO):
+            dropped += 1
+        if ENQUEUE_DEBUG: print("ENQFQ len=%d flows=%d peer=%d" % (len(payload), p.fq.flows(), dest_addr))
         return
     if cls == 'data':
-        if len(q_data) < DATA_MAX:
-            q_data.append((dest_addr, ascii_frame, raw_len))
+        if p.q_data.push(dest_addr, payload, raw_len, now):
             if ENQUEUE_DEBUG: print("ENQHI len=%d" % len(payload))
         else:
-            print("DROP hi full")
+            print("DROP hi full"); dropped += 1
         return
-    if len(q_lo) < LO_MAX:
-        q_lo.append((dest_addr, ascii_frame, raw_len))
+    if p.q_lo.push(dest_addr, payload, raw_len, now):
         if ENQUEUE_DEBUG: print("ENQLO len=%d" % len(payload))
+    else:
+        dropped += 1
 
-def read_host_kiss_frames():
+def next_frame(p):
+    """Peer p's next link frame: carry, ACKs, pending fragments, then DATA/ICMP (flow queues or DATA > ICMP)."""
+    global dropped
+    if p.carry:
+        item = p.carry; p.carry = None; return item
+    if p.q_ack: q = p.q_ack; tier = ACK
+    elif p.tx_ready:
+        d, frame, raw_len = p.tx_ready.pop(); return d, frame, raw_len, DATA
+    elif p.fq: q = p.fq
+    elif p.q_data: q = p.q_data; tier = DATA
+    else: q = p.q_lo; tier = LO
+    now = time.monotonic()
+    if q is p.fq:
+        k = q.n_codel; item = q.pop(now); tier = q.last_tier
+        dropped += q.n_codel - k
+    else: item = q.pop()
+    if item is None: return None
+    tlm.sojourn.add(int((now - q.last_t) * 1000))
+    d, payload, raw_len = item
+    frame = p.hc_tx.compress(payload) if HC_ENABLE else payload
+    if LZ_ENABLE: frame = lz_tx.compress(frame)
+    if len(frame) <= RF_RAW_MAX: return d, frame, raw_len, tier
+    parts = frag_tx.split(frame, RF_RAW_MAX)
+    if parts is None:
+        print("DROP unfragmentable", len(frame)); dropped += 1; return next_frame(p)
+    for f in parts[1:]: p.tx_ready.push(d, f, 0)
+    return d, parts[0], raw_len, DATA
+
+def build_bundle(p):
+    """Pop peer p's link frames (ACK > fragments > DATA > ICMP) until one AT+SEND is full."""
+    frames=[]; dest=None; raw=0; nbytes=0; tiers=0
+    while True:
+        item = next_frame(p)
+        if item is None: break
+        d, frame, raw_len, tier = item
+        if frames and (d != dest or bundle_size(len(frames)+1, nbytes+len(frame)) > RF_RAW_MAX):
+            p.carry = item; break
+        frames.append(frame); dest=d; raw+=raw_len; nbytes+=len(frame)
+        tiers |= 1 << tier
+        if not AGG_ENABLE: break
+    if not frames: return None
+    if len(frames) == 1: return dest, frames[0], raw, 1, tiers
+    return dest, bundle(frames), raw, len(frames), tiers
+
+def host_ingest(data):
     global host_to_kiss_bytes
+    host_to_kiss_bytes += len(data)
+    for payload in kiss_rx.feed(data):
+        if PEP_ENABLE and not pep.from_host(payload, time.monotonic()): continue
+        enqueue(payload)
+
+def read_host_kiss_frames():
     n = getattr(ser, "in_waiting", 0)
     if not n: return
     data = ser.read(n)
-    if not data: return
-    host_to_kiss_bytes += len(data)
-    for payload in kiss_feed(data):
-        enqueue(payload)
+    if data: host_ingest(data)
 
 def send_to_host(pkt):
     global kiss_to_host_frames
-    ser.write(kiss_encode(pkt))
+    ser.write(kiss_tx.encode(pkt))
     try: ser.flush()
     except: pass
     kiss_to_host_frames += 1
 
+pep = TcpPep(send_to_host, enqueue, flows=PEP_FLOWS, buf_bytes=PEP_BUF_BYTES,
+             rto_s=PEP_RTO_S, max_tries=PEP_TRIES)
+
+# ========= KISS commands (lib/kisscmd.py) =========
+def kiss_cmd(port, cmd, data):
+    """A command frame from the host; port 0 is the only radio port."""
+    global TX_GUARD_S
+    if port or not KISS_CMD:
+        kiss_rx.n_other += 1; return
+    if cmd == KISS_SETHW:
+        set_hardware(data); return
+    d = persist.command(cmd, data)
+    if d is not None: TX_GUARD_S = d
+
+def hw_reply(text):
+    ser.write(kiss_encode(text.encode(), KISS_SETHW))
+
+def hw_report():
+    q = peers[0]
+    return ("sf=%d bw=%d cr=%d pre=%d pwr=%d gap=%.2f txdelay=%d persist=%d slot=%d duplex=%d ack=%d data=%d lo=%d"
+            % (PARAM_SF, PARAM_BW, PARAM_CR, PARAM_PRE, TX_DBM, TX_MIN_GAP_S, round(TX_GUARD_S * 100),
+               persist.p, round(persist.slot_s * 100), persist.full_duplex,
+               q.q_ack.limit, q.q_data.limit, q.q_lo.limit))
+
+def set_hardware(data):
+    """SETHW: apply timing and queue limits now, queue the AT commands on
+    both radios, and answer once the modules have replied."""
+    global TX_MIN_GAP_S
+    try: kv = parse_hw(data)
+    except ValueError as e:
+        hw_reply("ERR %s" % e); return
+    radio = [k for k in HW_RADIO if k in kv]
+    if radio and ADR_ENABLE:
+        hw_reply("ERR %s set by ADR" % "/".join(radio)); return
+    if radio and not kv.get("both"):
+        # only this end is retuned; the peer has to be changed by its own host
+        hw_reply("ERR %s retunes this end only: set the peer too and add both=1" % "/".join(radio)); return
+    if "gap" in kv: TX_MIN_GAP_S = kv["gap"]
+    for p in peers:
+        if "ack" in kv: p.q_ack.set_limit(kv["ack"])
+        if "data" in kv: p.q_data.set_limit(kv["data"])
+        if "lo" in kv: p.q_lo.set_limit(kv["lo"])
+        p.fq.set_limit(p.q_data.limit + p.q_lo.limit)
+    prof = (kv.get("sf", PARAM_SF), kv.get("bw", PARAM_BW), kv.get("cr", PARAM_CR), kv.get("pre", PARAM_PRE))
+    pwr = kv.get("pwr", TX_DBM)
+    cmds = []
+    def done(c):
+        global PARAM_SF, PARAM_BW, PARAM_CR, PARAM_PRE, TX_DBM
+        if not all(x.done for x in cmds): return
+        bad = [x for x in cmds if not x.ok]
+        if bad:
+            hw_reply("ERR %s: %s" % (bad[0].cmd.decode().strip(), " ".join(bad[0].lines) or "timeout")); return
+        if radio: PARAM_SF, PARAM_BW, PARAM_CR, PARAM_PRE = prof
+        TX_DBM = pwr
+        hw_reply("OK " + hw_report())
+    for r in (tx_radio, rx_radio):
+        if radio: cmds.append(r.set_params_nb(*prof, cb=done))
+        if "pwr" in kv: cmds.append(r.at("AT+CRFOP=%d" % pwr, done))
+    if not cmds: hw_reply("OK " + hw_report())
+
+kiss_rx.on_cmd = kiss_cmd
+
 def stats_tick():
+    """Every 5 s one STATS line: the core counters, then a short group for
+    each subsystem that is on here or that the peer's frames exercise."""
     global last_stats
     now = time.monotonic()
-    if now - last_stats >= 5:
-        print("[t+%.1fs] STATS: TX %d/%d RX %d/%d HOST %d KISS %d QACK=%d QDAT=%d QLO=%d BLK(empty=%d)"
-              % (now, tx_frames, tx_bytes, rx_frames, rx_bytes,
-                 host_to_kiss_bytes, kiss_to_host_frames,
-                 len(q_ack), len(q_data), len(q_lo), _block.get("empty",0)))
-        last_stats = now
-
-# ========= Main loop =========
-while True:
-    # 1) Host -> queues
-    read_host_kiss_frames()
-
-    # 2) TX path (A-TX @ 916 MHz)
+    if now - last_stats < 5: return
+    last_stats = now
+    g = ["[t+%.1fs] STATS: TX %d/%d RX %d/%d HOST %d KISS %d QACK=%d QDAT=%d QLO=%d DROP=%d BLK(empty=%d) UNK=%d THIN=%d"
+         % (now, tx_frames, tx_bytes, rx_frames, rx_bytes, host_to_kiss_bytes, kiss_to_host_frames,
+            psum(lambda p: len(p.q_ack)), psum(lambda p: len(p.q_data)), psum(lambda p: len(p.q_lo)),
+            dropped, _block.get("empty",0), rx_unknown, acks_thinned),
+         " AIR(%.1fs ok=%d err=%d to=%d)" % (tx_radio.tx_airtime, tx_radio.tx_ok, tx_radio.tx_err, tx_radio.tx_timeouts)]
+    if FQ_ENABLE:
+        g.append(" FQ(n=%d flows=%d codel=%d)"
+                 % (psum(lambda p: len(p.fq)), psum(lambda p: p.fq.flows()), psum(lambda p: p.fq.n_codel)))
+    if HC_ENABLE or psum(lambda p: p.hc_rx.n_full):
+        g.append(" HC(full=%d comp=%d saved=%dB miss=%d)"
+                 % (psum(lambda p: p.hc_tx.n_full), psum(lambda p: p.hc_tx.n_comp), psum(lambda p: p.hc_tx.saved),
+                    psum(lambda p: p.hc_rx.n_miss)))
+    if AGG_ENABLE: g.append(" AGG=%.2f" % ((tx_pkts / tx_frames) if tx_frames else 0.0))
+    if FRAG_ENABLE or frag_rx.n_done or frag_rx.n_lost:
+        g.append(" FRAG(tx=%d rx=%d lost=%d)" % (frag_tx.n_pkts, frag_rx.n_done, frag_rx.n_lost))
+    if ARQ_ENABLE or any(p.arq.started for p in peers):
+        g.append(" ARQ(retx=%d giveup=%d dup=%d ooo=%d skip=%d rto=%.1fs)"
+                 % (psum(lambda p: p.arq.n_retx), psum(lambda p: p.arq.n_giveup), psum(lambda p: p.arq.n_dup),
+                    psum(lambda p: p.arq.n_ooo), psum(lambda p: p.arq.n_skip), peers[0].arq.rto))
+    if FEC_ENABLE or fec_rx.n_recovered:
+        g.append(" FEC(par=%d rec=%d)" % (fec_tx.n_parity, fec_rx.n_recovered))
+    if LZ_ENABLE or lz_rx.n_frames:
+        g.append(" LZ(x%.2f skip=%d tx=%dus rx=%dus)"
+                 % (lz_tx.ratio(), lz_tx.n_skip, lz_tx.us_per_frame(), lz_rx.us_per_frame()))
+    if ADR_ENABLE:
+        g.append(" ADR(tx=%d rx=%d snr=%.1f peer=%.1f sw=%d fb=%d)"
+                 % (adr.tx_prof, adr.rx_prof, adr.snr_avg(), adr.peer_snr, adr.n_switch, adr.n_fallback))
+    if BOND_ENABLE:
+        g.append(" BOND(req=%d grant=%d loan=%d tx=%d)" % (bond.n_req, bond.n_grant, bond.n_loan, bond.n_tx))
+    if PEP_ENABLE:
+        g.append(" PEP(flows=%d ack=%d sup=%d retx=%d drop=%d rst=%d buf=%dB)"
+                 % (len(pep.flows), pep.n_ack, pep.n_sup, pep.n_retx, pep.n_drop, pep.n_abort, pep.buffered()))
+    g.append(" MEM(free=%d low=%d alloc=%dB/pkt gc=%dus max=%dus)"
+             % (heap.free, heap.low, heap.per_pkt(tx_pkts + rx_frames), tlm.gc.mean(), heap.max_us))
+    if len(peers) > 1: g.append(peer_stats())
+    print("".join(g))
+
+def gc_tick():
+    """Collect every GC_COLLECT_S, while the heap is still mostly free, so a
+    pause never lands on a full UART because an allocation ran out of room."""
+    global last_gc
+    now = time.monotonic()
+    if GC_COLLECT_S and now - last_gc >= GC_COLLECT_S:
+        last_gc = now; heap.collect()
+
+def peer_stats():
+    return "".join(" PEER(%d snr=%.1f rssi=%.0f air=%.1fs tx=%d rx=%d q=%d rto=%.1fs)"
+                   % (p.addr, p.snr, p.rssi, p.airtime, p.n_tx, p.n_rx, queued(p), p.arq.rto) for p in peers)
+
+def tlm_tick():
+    global last_tlm
+    now = time.monotonic()
+    if not TLM_INTERVAL_S or now - last_tlm < TLM_INTERVAL_S: return
+    last_tlm = now
+    line = tlm.snapshot(now, {
+        "tx_frames": tx_frames, "tx_bytes": tx_bytes, "tx_pkts": tx_pkts,
+        "rx_frames": rx_frames, "rx_bytes": rx_bytes,
+        "host_bytes": host_to_kiss_bytes, "host_frames": kiss_to_host_frames,
+        "q_ack": psum(lambda p: len(p.q_ack)), "q_data": psum(lambda p: len(p.q_data)),
+        "q_lo": psum(lambda p: len(p.q_lo)), "q_fq": psum(lambda p: len(p.fq)),
+        "fq_flows": psum(lambda p: p.fq.flows()), "fq_codel": psum(lambda p: p.fq.n_codel),
+        "fq_overflow": psum(lambda p: p.fq.n_overflow),
+        "drop": dropped, "thin": acks_thinned, "blk_empty": _block.get("empty",0), "rx_unknown": rx_unknown,
+        "hc_full": psum(lambda p: p.hc_tx.n_full), "hc_comp": psum(lambda p: p.hc_tx.n_comp),
+        "hc_miss": psum(lambda p: p.hc_rx.n_miss),
+        "frag_tx": frag_tx.n_pkts, "frag_rx": frag_rx.n_done, "frag_lost": frag_rx.n_lost,
+        "air_ms": int(tx_radio.tx_airtime * 1000), "air_ok": tx_radio.tx_ok,
+        "air_err": tx_radio.tx_err, "air_to": tx_radio.tx_timeouts, "rx_overrun": rx_radio.rx_overruns,
+        "at_to": tx_radio.at_timeouts + rx_radio.at_timeouts, "err_codes": tx_radio.err_codes,
+        "arq_retx": psum(lambda p: p.arq.n_retx), "arq_giveup": psum(lambda p: p.arq.n_giveup),
+        "arq_dup": psum(lambda p: p.arq.n_dup),
+        "fec_par": fec_tx.n_parity, "fec_rec": fec_rx.n_recovered,
+        "lz_in": lz_tx.bytes_in, "lz_out": lz_tx.bytes_out, "lz_skip": lz_tx.n_skip,
+        "adr_tx": adr.tx_prof, "adr_rx": adr.rx_prof,
+        "bond_loan": bond.n_loan, "bond_grant": bond.n_grant, "bond_tx": bond.n_tx,
+        "pep_flows": len(pep.flows), "pep_retx": pep.n_retx, "pep_rst": pep.n_abort, "pep_buf": pep.buffered(),
+        "mem_free": heap.free, "mem_low": heap.low, "mem_alloc": heap.alloc, "gc_n": heap.n, "gc_max_us": heap.max_us,
+        "kiss_cmd": kiss_rx.n_cmd, "csma_defer": persist.n_defer,
+        "peers": [{"addr": p.addr, "snr": round(p.snr, 1), "rssi": round(p.rssi), "air_ms": int(p.airtime * 1000),
+                   "tx": p.n_tx, "rx": p.n_rx, "q": queued(p)} for p in peers]})
+    if TLM_PORT: ser.write(kiss_encode(line.encode(), TLM_PORT << 4))
+    else: print("TLM", line)
+
+# ========= TX / RX steps =========
+def tx_gate_open():
+    if BOND_ENABLE and bond.lending(time.monotonic()): return False
+    if TX_AIRTIME_PACING: ok = tx_radio.tx_idle(TX_GUARD_S)
+    else: ok = (time.monotonic() - last_rf_tx) >= TX_MIN_GAP_S and (not tx_radio.at_busy() or tx_radio.tx_idle())
+    return ok and persist.clear(time.monotonic())
+
+def rf_send(dest_addr, frame, peer=None, radio=None):
+    """AT+SEND one link frame (on the TX radio unless told otherwise); its
+    airtime is charged to peer (looked up by address if not given)."""
+    global last_rf_tx
+    radio = radio or tx_radio
+    try:
+        n = codec.encode_into(frame, rf_buf)
+        if n > MAX_RF_ASCII_BYTES:
+            print("DROP ascii too long", n); return False
+        radio.send_ascii(dest_addr, rf_buf, n)
+        if radio is tx_radio: last_rf_tx = time.monotonic()
+        tlm.airtime.add(int(radio.tx_last_toa * 1000))
+        peer = peer or routes.by_addr.get(dest_addr)
+        if peer: sched.charge(peer, radio.tx_last_toa)
+        return True
+    except Exception as e:
+        print("send_ascii failed:", e)
+        return False
+
+def tx_send_next():
+    """Put the next frame on the air; False when there was nothing to send.
+
+    Order: ADR reports/requests (and retuning, while TX is idle), a bond
+    request, ARQ re-sends, FEC parity, a new bundle for the peer the
+    airtime scheduler picks (among those with queued packets and ARQ
+    window room), then a bond grant or a standalone ACK for any peer owed one.
+    """
+    global tx_frames, tx_bytes, tx_pkts
     now = time.monotonic()
-    if (now - last_rf_tx) >= TX_MIN_GAP_S:
-        item=None
-        if   q_ack:  item=q_ack.pop(0)
-        elif q_data: item=q_data.pop(0)
-        elif q_lo:   item=q_lo.pop(0)
+    if ADR_ENABLE:
+        rx_radio.at_poll()        # an RX retune times out even with nothing heard
+        c = adr.tick(now)
+        if c:
+            rf_send(peers[0].addr, c); return True
+    if BOND_ENABLE:
+        c = bond.request(queued(peers[0]), now)
+        if c:
+            rf_send(peers[0].addr, c); return True
+    for p in peers:
+        if ARQ_ENABLE:
+            r = p.arq.retx(now)
+            if r:
+                rf_send(p.addr, r[1], p); return True     # on this band even if first sent on a lent one
         else:
-            if PRINT_BLOCKS: _block["empty"] = _block.get("empty",0) + 1
-        if item:
-            dest_addr, ascii_frame, raw_len = item
-            try:
-                tx_radio.send_ascii(dest_addr, ascii_frame)
-                last_rf_tx = time.monotonic()
-                tx_frames += 1; tx_bytes += raw_len
-            except Exception as e:
-                print("send_ascii failed:", e)
-
-    # 3) RX path (A-RX @ 915 MHz)
-    for r in rx_radio.poll():
-        data = r.get("data", "")
-        if isinstance(data, bytes):
-            try: data = data.decode()
-            except: data = ""
-        if data.startswith(B64_PREFIX):
-            b64 = data[len(B64_PREFIX):]
-            try: pkt = b64decode(b64)
-            except Exception as e:
-                print("bad b64:", e); continue
-            rx_frames += 1; rx_bytes += len(pkt)
+            a = p.arq.ack_frame()     # nothing to piggyback on: ACK the peer right away
+            if a:
+                rf_send(p.addr, a, p); return True
+    if FEC_ENABLE:
+        fec_tx.tick(now)
+        f = fec_tx.pop()
+        if f:
+            rf_send(f[0], f[1]); return True
+    p = sched.pick(can_send)
+    item = build_bundle(p) if p else None
+    if item is None:
+        if BOND_ENABLE and bond.grant_due(now):
+            p = peers[0]
+            g = bond.grant(BOND_LOAN_FRAMES * tx_radio.airtime_s(MAX_RF_ASCII_BYTES), p.arq.ack_frame())
+            if rf_send(p.addr, g, p): bond.lent(time.monotonic() + tx_radio.tx_last_toa, g)
+            return True
+        for p in peers:
+            a = p.arq.ack_frame()
+            if a:
+                rf_send(p.addr, a, p); return True
+        if PRINT_BLOCKS: _block["empty"] = _block.get("empty",0) + 1
+        return False
+    dest_addr, frame, raw_len, npkts, tiers = item
+    if ARQ_ENABLE: frame = p.arq.wrap(dest_addr, frame, tiers & INORDER_MASK, now)
+    if FEC_ENABLE: frame = fec_tx.wrap(ACK if tiers & 1 else DATA if tiers & 2 else LO, dest_addr, frame, now)
+    if rf_send(dest_addr, frame, p):
+        tx_frames += 1; tx_bytes += raw_len; tx_pkts += npkts
+    return True
+
+def tx_send_bonded():
+    """While borrowing: a new bundle on the lent band, from our RX radio to the peer's TX radio."""
+    global tx_frames, tx_bytes, tx_pkts
+    p = peers[0]; now = time.monotonic()
+    if not can_send(p) or not bond.borrowing(now + rx_radio.airtime_s(MAX_RF_ASCII_BYTES)): return False
+    item = build_bundle(p)
+    if item is None: return False
+    dest_addr, frame, raw_len, npkts, tiers = item
+    if ARQ_ENABLE: frame = p.arq.wrap(p.src, frame, tiers & INORDER_MASK, now)
+    if rf_send(p.src, frame, p, rx_radio):
+        tx_frames += 1; tx_bytes += raw_len; tx_pkts += npkts; bond.n_tx += 1
+    return True
+
+def bond_tick():
+    """Lending: take in what the peer sends on our band. Borrowing: keep the lent band busy.
+    True while either lasts."""
+    now = time.monotonic()
+    if bond.lending(now):
+        rx_handle(tx_radio.poll(), True); return True
+    if bond.borrowing(now):
+        if rx_radio.tx_idle(TX_GUARD_S, read=False): tx_send_bonded()
+        return True
+    return False
+
+def arq_tick():
+    now = time.monotonic()
+    for p in peers:
+        for src, frame in p.arq.expire(now):
+            rx_link(p, src, frame)
+
+def arq_pending():
+    for p in peers:
+        if p.arq.pending(): return True
+    return False
+
+def rx_link(p, frm, frame):
+    """One link frame from peer p: unbundle, reassemble, decompress, hand to the host."""
+    global rx_frames, rx_bytes
+    for sub in unbundle(frame):
+        sub = frag_rx.feed(frm, sub, time.monotonic())
+        if sub is None: continue
+        sub = lz_rx.decompress(sub)
+        if sub is None:
+            print("RX lz bad from %s" % str(frm)); continue
+        pkt = p.hc_rx.decompress(sub)
+        if pkt is None:
+            print("RX hc miss from %s" % str(frm)); continue
+        rx_frames += 1; rx_bytes += len(pkt)
+        if RX_DEBUG:
             info, _ = ip_header_peek(pkt)
-            frm = r.get("from")
             head20 = binascii.hexlify(pkt[:20]).decode()
             print("[%.1fs] RX %dB from %s ip=%s head20=%s"
                   % (time.monotonic(), len(pkt), str(frm), info, head20))
-            send_to_host(pkt)
+        if PEP_ENABLE and not pep.from_peer(pkt, time.monotonic()): continue   # ACKed locally already
+        send_to_host(pkt)
+
+def rx_handle(frames, lent=False):
+    """Frames from the RX radio, or from the TX radio while its band is lent (lent=True)."""
+    global rx_unknown
+    by = routes.by_addr if lent else routes.by_src
+    for r in frames:
+        tlm.rssi.add(r.rssi); tlm.snr.add(r.snr)
+        p = by.get(r.frm)
+        if p is None:
+            rx_unknown += 1; continue
+        p.on_rx(r.snr, r.rssi, time.monotonic())
+        data = r.data   # memoryview into the driver buffer, valid until the next poll
+        rc = codec_for(data)
+        if rc:
+            try: frame = rc.decode(data)
+            except Exception as e:
+                print("bad %s:" % rc.name, e); continue
+            if ADR_ENABLE and not lent:
+                adr.on_rx(r.snr, r.rssi, time.monotonic())
+                if frame and frame[0] == T_ADR:
+                    adr.input(frame, time.monotonic()); continue
+            if BOND_ENABLE and frame and frame[0] == T_BOND:
+                frame = bond.input(frame, time.monotonic())    # a grant's ACK goes on to ARQ
+                if bond.borrowing(time.monotonic()): p.arq.hold(bond.borrow_until + bond.guard_s)
+                if not frame: continue
+            for f in fec_rx.input(p.src, frame, time.monotonic()):     # one source for both bands
+                for src, g in p.arq.input(p.src, f, time.monotonic()):
+                    rx_link(p, src, g)
+        else:
+            print("RX text:", bytes(data))
+
+# ========= Main loop (polling) =========
+def run_polling():
+    while True:
+        t0 = ticks_us()
+        read_host_kiss_frames()          # 1) Host -> queues
+        if BOND_ENABLE: bond_tick()
+        if tx_gate_open(): tx_send_next()  # 2) TX path (TX radio @ BAND_TX_HZ)
+        rx_handle(rx_radio.poll())       # 3) RX path (RX radio @ BAND_RX_HZ)
+        arq_tick()
+        if PEP_ENABLE: pep.tick(time.monotonic())
+        stats_tick(); tlm_tick(); gc_tick()
+        tlm.loop.add(ticks_us() - t0)
+        time.sleep(0.001)
+
+# ========= Main loop (asyncio) =========
+# Each stage waits on its own event: USB and the RX UART through asyncio
+# streams, TX on the radio's completion or on new packets, stats on a
+# timer. Ports whose objects can't be wrapped in a stream fall back to
+# polling at POLL_S inside their task.
+tx_wake = None
+
+def _stream(port):
+    try: return asyncio.StreamReader(port)
+    except Exception: return None
+
+async def host_task():
+    rd = _stream(ser)
+    while True:
+        if rd:
+            try: data = await rd.read(HOST_READ_MAX)
+            except Exception as e:
+                print("host stream:", e); rd = None; continue
+            if data: host_ingest(data)
+        else:
+            read_host_kiss_frames()
+            await asyncio.sleep(POLL_S)
+        if tx_radio.at_busy(): tx_wake.set()   # a SETHW retune: replies are read by the TX gate
+        for p in peers:
+            if queued(p): tx_wake.set(); break
+
+async def tx_task():
+    while True:
+        t0 = ticks_us()
+        arq_tick()
+        if PEP_ENABLE: pep.tick(time.monotonic())
+        bonding = BOND_ENABLE and bond_tick()
+        if not tx_gate_open():
+            await asyncio.sleep(POLL_S if bonding else TX_POLL_S)
+            continue
+        sent = tx_send_next()
+        tlm.loop.add(ticks_us() - t0)
+        if not sent:
+            if bonding:
+                await asyncio.sleep(TX_POLL_S)
+            elif (arq_pending() or fec_tx.busy() or ADR_ENABLE or BOND_ENABLE or (PEP_ENABLE and pep.busy())
+                  or tx_radio.at_busy()):   # timers running
+                await asyncio.sleep(ARQ_TICK_S)
+            else:
+                tx_wake.clear()
+                await tx_wake.wait()
+
+async def rx_task():
+    rd = _stream(uart0)
+    while True:
+        first = None
+        if rd:
+            try: first = await rd.read(1)    # wakes on the first byte; poll() drains the rest
+            except Exception as e:
+                print("rx stream:", e); rd = None
         else:
-            print("RX text:", data)
+            await asyncio.sleep(POLL_S)
+        t0 = ticks_us()
+        frames = rx_radio.poll(first)
+        rx_handle(frames)
+        tlm.loop.add(ticks_us() - t0)
+        while len(frames) == rx_radio.rx_slots:
+            await asyncio.sleep(0)
+            frames = rx_radio.poll()
+            rx_handle(frames)
+        for p in peers:
+            if p.arq.ack_due: tx_wake.set(); break
+        if BOND_ENABLE and (bond.wanted or bond.borrowing(time.monotonic())): tx_wake.set()
+
+async def stats_task():
+    while True:
+        stats_tick(); tlm_tick(); gc_tick()
+        await asyncio.sleep(1)
+
+async def main():
+    global tx_wake
+    tx_wake = asyncio.Event()
+    await asyncio.gather(host_task(), tx_task(), rx_task(), stats_task())
 
-    stats_tick()
-    time.sleep(0.001)
+if USE_ASYNCIO and asyncio:
+    asyncio.run(main())
+else:
+    run_polling()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# fake_rylr998.py — emulated RYLR998 modules on PTYs, in real time
+#
+# Serves the behavioural emulator from sim/rylr998_emu.py on pseudo
+# terminals so host/hostbridge.py (or a terminal program) can talk to
+# "radios" without hardware. All modules share one emulated Air: frames
+# sent by one are heard, after their LoRa time-on-air, by every module on
+# the same band, network ID and modulation. Each module's PTY is
+# symlinked at <prefix>_<name>:
+#
+#   python3 host/fake_rylr998.py --prefix /tmp/rylr          # a_rx a_tx b_rx b_tx
+#   python3 host/hostbridge.py code_A.py --rx /tmp/rylr_a_rx --tx /tmp/rylr_a_tx --pty /tmp/kiss_a
+#   python3 host/hostbridge.py code_B.py --rx /tmp/rylr_b_rx --tx /tmp/rylr_b_tx --pty /tmp/kiss_b
+#
+# --loss drops that fraction of frames at random.
+
+import argparse, heapq, itertools, os, pty, select, signal, sys, termios, time, tty
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "sim"))
+
+from rylr998_emu import Air, RYLR998Emu
+
+
+class WallClock:
+    """The emulator's clock interface (now, call_at, call_later) in real time."""
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self._heap = []; self._seq = itertools.count()
+
+    @property
+    def now(self):
+        return time.monotonic() - self.t0
+
+    def call_at(self, t, fn):
+        heapq.heappush(self._heap, (t, next(self._seq), fn))
+
+    def call_later(self, dt, fn):
+        self.call_at(self.now + dt, fn)
+
+    def run_due(self):
+        """Run the timers that are due; seconds until the next one (at most 0.05)."""
+        while self._heap and self._heap[0][0] <= self.now:
+            heapq.heappop(self._heap)[2]()
+        return min(0.05, max(0.0, self._heap[0][0] - self.now)) if self._heap else 0.05
+
+
+class PtyModule:
+    """One emulated module behind a PTY master."""
+
+    def __init__(self, air, name, link):
+        self.emu = RYLR998Emu(air, name)
+        self.fd, self._slave = pty.openpty()       # slave kept open: no EIO between clients
+        tty.setraw(self._slave, termios.TCSANOW)
+        os.set_blocking(self.fd, False)
+        self.link = link
+        if os.path.islink(link): os.unlink(link)
+        os.symlink(os.ttyname(self._slave), link)
+
+    def pump_in(self):
+        try: data = os.read(self.fd, 4096)
+        except (BlockingIOError, OSError): return
+        if data: self.emu.feed(data)
+
+    def pump_out(self):
+        out = self.emu.out
+        if not out: return
+        try: n = os.write(self.fd, bytes(out))
+        except BlockingIOError: n = len(out)       # nobody reading: the module's UART overruns
+        del out[:n]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Emulated RYLR998 modules on PTYs")
+    ap.add_argument("--prefix", default="/tmp/rylr", help="symlink prefix for the PTYs")
+    ap.add_argument("--names", default="a_rx,a_tx,b_rx,b_tx", help="comma-separated module names")
+    ap.add_argument("--loss", type=float, default=0.0, help="fraction of frames lost on the air")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+    clock = WallClock()
+    air = Air(clock, loss=a.loss, seed=a.seed)
+    mods = [PtyModule(air, n, "%s_%s" % (a.prefix, n)) for n in a.names.split(",")]
+    for m in mods: print("%s -> %s" % (m.link, os.readlink(m.link)))
+    by_fd = {m.fd: m for m in mods}
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            r, _, _ = select.select(list(by_fd), [], [], clock.run_due())
+            for fd in r: by_fd[fd].pump_in()
+            clock.run_due()
+            for m in mods: m.pump_out()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for m in mods:
+            if os.path.islink(m.link): os.unlink(m.link)
+        print("air:", air.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# hostbridge.py — run code_A.py / code_B.py under CPython on a Linux host
+#
+# For setups where the two RYLR998 modules hang off USB-UART adapters on
+# the Linux box itself. The bridge script and everything under lib/ run
+# unchanged: this file supplies the CircuitPython modules they import,
+# backed by the host instead of a Pico:
+#   busio.UART    a pyserial port per radio, picked by the script's pin pair
+#                 (--rx is GP0/GP1, --tx is GP4/GP5, --uart for anything else);
+#                 any pyserial URL works, e.g. loop:// or socket://host:port
+#   usb_cdc.data  a KISS PTY for tncattach (--pty), or a TUN interface (--tun)
+#                 whose IP packets go straight into the bridge's queues
+#   board, digitalio  pin names only; a reset pin is not available here
+# asyncio is hidden from the script, so it runs its polling loop. Site
+# settings (addresses, bands, features) stay in the script, as on the Pico.
+# Needs pyserial (fake_rylr998.py does not):
+#
+#   pip install pyserial
+#
+#   python3 host/hostbridge.py code_A.py --rx /dev/ttyUSB0 --tx /dev/ttyUSB1 --pty /tmp/kiss_a
+#   tncattach /tmp/kiss_a 115200 -d -e -n tnc0 -m 576 -i 10.10.10.1/24
+#
+#   sudo python3 host/hostbridge.py code_B.py --rx /dev/ttyUSB2 --tx /dev/ttyUSB3 \
+#        --tun tnc0 --tun-addr 10.10.10.2/24
+#
+# host/fake_rylr998.py serves emulated modules on PTYs for trying this
+# without radios.
+
+import argparse, fcntl, os, pty, runpy, signal, struct, subprocess, sys, termios, tty, types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+LIB = os.path.join(ROOT, "lib")
+sys.path.insert(0, LIB)
+
+from kiss import KissDecoder, kiss_encode
+
+
+class SerialUART:
+    """The busio.UART surface the driver uses, on a pyserial port (nonblocking)."""
+
+    def __init__(self, url, baudrate=115200):
+        import serial                     # pyserial, only needed for real ports
+        self.s = serial.serial_for_url(url, baudrate=baudrate, timeout=0, write_timeout=1.0)
+        self.baudrate = baudrate
+        self.timeout = 0
+
+    @property
+    def in_waiting(self):
+        return self.s.in_waiting
+
+    def read(self, n=None):
+        data = self.s.read(n if n is not None else self.s.in_waiting)
+        return data or None
+
+    def readinto(self, buf, nbytes=None):
+        data = self.s.read(len(buf) if nbytes is None else nbytes)
+        if not data: return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def write(self, data):
+        return self.s.write(bytes(data))
+
+    def reset_input_buffer(self):
+        self.s.reset_input_buffer()
+
+    def deinit(self):
+        self.s.close()
+
+
+class PtyKiss:
+    """usb_cdc.data on the master side of a PTY; tncattach opens the slave.
+
+    The slave is kept open here as well, so the master never reads EIO
+    while no client is attached. Bytes for a client that isn't reading are
+    dropped once the PTY buffer is full, as USB CDC does.
+    """
+
+    def __init__(self, link=None):
+        self.fd, self._slave = pty.openpty()
+        tty.setraw(self._slave, termios.TCSANOW)
+        os.set_blocking(self.fd, False)
+        self.name = os.ttyname(self._slave)
+        if link:
+            if os.path.islink(link): os.unlink(link)
+            os.symlink(self.name, link)
+        self.timeout = 0
+        self.n_dropped = 0
+
+    @property
+    def in_waiting(self):
+        return struct.unpack("i", fcntl.ioctl(self.fd, termios.FIONREAD, b"\0\0\0\0"))[0]
+
+    def read(self, n=None):
+        try: return os.read(self.fd, n or 4096) or None
+        except (BlockingIOError, OSError): return None
+
+    def write(self, data):
+        mv = memoryview(data); i = 0
+        while i < len(mv):
+            try: i += os.write(self.fd, mv[i:])
+            except BlockingIOError:
+                self.n_dropped += len(mv) - i; break
+        return len(mv)
+
+    def flush(self):
+        pass
+
+
+IFF_TUN = 0x0001; IFF_NO_PI = 0x1000; TUNSETIFF = 0x400454CA
+
+class TunKiss:
+    """usb_cdc.data on a TUN interface: each IP packet is one KISS data frame."""
+
+    def __init__(self, name, mtu=576, addr=None):
+        self.fd = os.open("/dev/net/tun", os.O_RDWR | os.O_NONBLOCK)
+        fcntl.ioctl(self.fd, TUNSETIFF, struct.pack("16sH", name.encode(), IFF_TUN | IFF_NO_PI))
+        self.mtu = mtu
+        self.dec = KissDecoder(mtu + 64)
+        self.pending = bytearray()
+        self.timeout = 0
+        if addr:
+            subprocess.check_call(["ip", "addr", "add", addr, "dev", name])
+        subprocess.check_call(["ip", "link", "set", name, "up", "mtu", str(mtu)])
+
+    def _pull(self):
+        while len(self.pending) < 4096:
+            try: pkt = os.read(self.fd, self.mtu + 64)
+            except BlockingIOError: return
+            if not pkt: return
+            self.pending += kiss_encode(pkt)
+
+    @property
+    def in_waiting(self):
+        self._pull()
+        return len(self.pending)
+
+    def read(self, n=None):
+        self._pull()
+        if not self.pending: return None
+        n = len(self.pending) if n is None else min(n, len(self.pending))
+        data = bytes(self.pending[:n]); del self.pending[:n]
+        return data
+
+    def write(self, data):
+        for pkt in self.dec.feed(bytes(data)):      # other ports (telemetry, SETHW answers) are dropped
+            try: os.write(self.fd, pkt)
+            except OSError: pass
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+# ---------- the CircuitPython modules ----------
+class Pin:
+    def __init__(self, name): self.name = name
+    def __repr__(self): return "board.%s" % self.name
+
+def make_board():
+    m = types.ModuleType("board")
+    for i in range(29):
+        setattr(m, "GP%d" % i, Pin("GP%d" % i))
+    return m
+
+def make_busio(uarts):
+    m = types.ModuleType("busio")
+    def UART(tx=None, rx=None, baudrate=9600, timeout=1.0, receiver_buffer_size=64, **kw):
+        key = "%s:%s" % (tx.name, rx.name)
+        if key not in uarts:
+            raise ValueError("no serial port for UART on %s (use --uart %s=PORT)" % (key, key))
+        return SerialUART(uarts[key], baudrate)
+    m.UART = UART
+    return m
+
+def make_digitalio():
+    m = types.ModuleType("digitalio")
+    class Direction: INPUT = 0; OUTPUT = 1
+    class Pull: UP = 1; DOWN = 2
+    class DigitalInOut:
+        def __init__(self, pin):
+            raise NotImplementedError("no GPIO on the host: leave rst_pin unset")
+    m.Direction = Direction; m.Pull = Pull; m.DigitalInOut = DigitalInOut
+    return m
+
+def make_usb_cdc(data):
+    m = types.ModuleType("usb_cdc")
+    m.data = data; m.console = None
+    return m
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a bridge script on the host against USB-UART radios")
+    ap.add_argument("script", help="code_A.py or code_B.py (or a copy with site settings)")
+    ap.add_argument("--rx", help="serial port of the RX radio (the script's GP0/GP1 UART)")
+    ap.add_argument("--tx", help="serial port of the TX radio (the script's GP4/GP5 UART)")
+    ap.add_argument("--uart", action="append", default=[], metavar="TXPIN:RXPIN=PORT",
+                    help="serial port for another UART, e.g. GP8:GP9=/dev/ttyUSB2")
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--pty", metavar="LINK", help="KISS on a PTY, symlinked at LINK for tncattach")
+    g.add_argument("--tun", metavar="IFNAME", help="IP packets on a TUN interface (needs CAP_NET_ADMIN)")
+    ap.add_argument("--tun-addr", help="address/prefix to give the TUN interface, e.g. 10.10.10.1/24")
+    ap.add_argument("--mtu", type=int, default=576, help="TUN MTU; match the script's KISS_MTU_BYTES")
+    a = ap.parse_args()
+
+    uarts = {}
+    if a.rx: uarts["GP0:GP1"] = a.rx
+    if a.tx: uarts["GP4:GP5"] = a.tx
+    for u in a.uart:
+        pins, _, port = u.partition("=")
+        uarts[pins] = port
+    if a.pty:
+        cdc = PtyKiss(a.pty)
+        print("KISS on %s (%s)" % (a.pty, cdc.name))
+    else:
+        cdc = TunKiss(a.tun, a.mtu, a.tun_addr)
+        print("IP on %s" % a.tun)
+
+    sys.modules["board"] = make_board()
+    sys.modules["busio"] = make_busio(uarts)
+    sys.modules["digitalio"] = make_digitalio()
+    sys.modules["usb_cdc"] = make_usb_cdc(cdc)
+    sys.modules["asyncio"] = None                   # ImportError: the script takes its polling loop
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        runpy.run_path(a.script, run_name="__main__")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if a.pty and os.path.islink(a.pty): os.unlink(a.pty)
+
+
+if __name__ == "__main__":
+    main()
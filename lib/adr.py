@@ -0,0 +1,171 @@
+# adr.py — adaptive data rate for the RF hop
+#
+# Each direction of the link runs its own PHY profile (SF/BW/CR/preamble).
+# The bridge at the receiving end of a direction measures it: it keeps the
+# SNR/RSSI of the last `window` frames heard and reports them every
+# report_s over its own TX radio. The sending end decides: if the reports
+# leave room for a faster profile (or no longer cover the current one) it
+# sends a switch request (twice) and retunes its TX radio as soon as that is
+# on the air; the receiver retunes its RX radio on receipt and reports at
+# once. Waiting for the report first would deadlock when both directions
+# switch together, since each report travels on the other direction.
+#   report: [type][1][rx profile][snr * 4][rssi][frames in window][epoch]
+#   switch: [type][2][profile][epoch]
+# epoch counts the sender's requests and is echoed in reports: the sender
+# follows whatever profile a current report names, and a report still
+# carrying an older epoch hold_s after a request means the request was lost,
+# so the sender goes back to where the peer still listens.
+# Profiles are listed from the most robust (0) to the fastest. The receiver
+# falls back to profile 0 after fallback_s without hearing the peer, and
+# the sender after twice that without a report: a dead link always ends up
+# where both ends started.
+
+from rf_codec import T_ADR
+
+ADR_REPORT = 1
+ADR_SWITCH = 2
+
+# SNR (dB) the demodulator needs per SF, and noise bandwidth over 125 kHz
+SNR_FLOOR = {5: -2.5, 6: -5.0, 7: -7.5, 8: -10.0, 9: -12.5, 10: -15.0, 11: -17.5, 12: -20.0}
+_BW_DB = {125: 0.0, 250: 3.0, 500: 6.0, 7: 0.0, 8: 3.0, 9: 6.0}
+_NOISE_125K = -117.0   # thermal noise in 125 kHz plus a 6 dB noise figure, dBm
+
+
+def _s8(v):
+    return v - 256 if v > 127 else v
+
+
+def _q8(v):
+    return max(-128, min(127, int(round(v)))) & 0xFF
+
+
+def _result(c):
+    """Outcome of a retune: True/False, or None while the radio hasn't answered."""
+    if c is True or c is False: return c
+    return c.ok if c.done else None
+
+
+class AdrLink:
+    """set_tx / set_rx(sf, bw, cr, preamble) retune a radio and return True on
+    success, or a handle with .done/.ok (RYLR998.set_params_nb's AtCmd) that is
+    checked on later ticks."""
+
+    def __init__(self, profiles, set_tx, set_rx, window=16, min_samples=6, margin_db=10.0,
+                 up_db=3.0, report_s=5.0, hold_s=10.0, fallback_s=30.0):
+        self.profiles = profiles
+        self.set_tx = set_tx; self.set_rx = set_rx
+        self.min_samples = min_samples
+        self.margin_db = margin_db; self.up_db = up_db
+        self.report_s = report_s; self.hold_s = hold_s; self.fallback_s = fallback_s
+        # RX side: the direction the peer sends on
+        self.rx_prof = 0; self.rx_want = -1; self.rx_epoch = 0
+        self.snr = [0] * window; self.rssi = [0] * window; self.n = 0; self.i = 0
+        self.last_rx = 0.0; self.next_report = 0.0; self.report_due = True
+        # TX side: the direction we send on
+        self.tx_prof = 0; self.tx_want = -1
+        self.ask = -1; self.ask_n = 0; self.ask_t = -hold_s; self.epoch = 0
+        self.last_report = 0.0
+        self.peer_snr = 0.0; self.peer_rssi = 0; self.peer_n = 0
+        self.n_switch = 0; self.n_fallback = 0
+        self.rx_pend = None; self.tx_pend = None   # (retune in flight, profile)
+
+    # ---- RX side ----
+    def on_rx(self, snr, rssi, now):
+        """Link quality of one frame heard from the peer."""
+        w = len(self.snr)
+        self.snr[self.i] = snr; self.rssi[self.i] = rssi
+        self.i = (self.i + 1) % w
+        if self.n < w: self.n += 1
+        self.last_rx = now
+
+    def snr_avg(self):
+        return sum(self.snr[:self.n]) / self.n if self.n else 0.0
+
+    def _report(self):
+        n = self.n
+        rssi = sum(self.rssi[:n]) / n if n else 0
+        return bytes((T_ADR, ADR_REPORT, self.rx_prof, _q8(self.snr_avg() * 4), _q8(rssi),
+                      min(n, 255), self.rx_epoch))
+
+    # ---- TX side ----
+    def _fits(self, p, snr, rssi, extra):
+        # snr was measured on the current profile; a wider channel lets in more noise
+        sf, bw = self.profiles[p][0], self.profiles[p][1]
+        bw_db = _BW_DB.get(bw, 0.0)
+        need = SNR_FLOOR.get(sf, -20.0) + self.margin_db + extra
+        d = bw_db - _BW_DB.get(self.profiles[self.tx_prof][1], 0.0)
+        return snr - d >= need and rssi >= _NOISE_125K + bw_db + need
+
+    def _pick(self, snr, rssi):
+        """Fastest profile the peer's numbers support; going up needs up_db more."""
+        cur = self.tx_prof
+        for p in range(len(self.profiles) - 1, cur, -1):
+            if self._fits(p, snr, rssi, self.up_db): return p
+        for p in range(cur, 0, -1):
+            if self._fits(p, snr, rssi, 0.0): return p
+        return 0
+
+    def input(self, frame, now):
+        """Handle one T_ADR frame from the peer."""
+        if len(frame) < 3: return
+        p = frame[2]
+        if p >= len(self.profiles): return
+        if frame[1] == ADR_SWITCH and len(frame) >= 4:
+            self.rx_want = p; self.rx_epoch = frame[3]
+        elif frame[1] == ADR_REPORT and len(frame) >= 7:
+            self.last_report = now
+            self.peer_snr = _s8(frame[3]) / 4; self.peer_rssi = _s8(frame[4]); self.peer_n = frame[5]
+            if frame[6] != self.epoch:
+                if now - self.ask_t < self.hold_s: return    # sent before our request got there
+                self.epoch = frame[6]                          # the request was lost
+            if p != self.tx_prof:
+                self.tx_want = p          # the peer listens elsewhere: follow it
+            elif self.peer_n >= self.min_samples and now - self.ask_t >= self.hold_s:
+                t = self._pick(self.peer_snr, self.peer_rssi)
+                if t != p:
+                    self.epoch = (self.epoch + 1) & 0xFF
+                    self.ask = t; self.ask_n = 2; self.ask_t = now
+
+    # ---- both ----
+    def _settle(self, now):
+        if self.rx_pend:
+            ok = _result(self.rx_pend[0])
+            if ok is not None:
+                if ok:
+                    self.rx_prof = self.rx_pend[1]; self.n = 0; self.i = 0; self.last_rx = now; self.n_switch += 1
+                self.rx_pend = None
+                self.report_due = True     # say where we listen, changed or not
+        if self.tx_pend:
+            ok = _result(self.tx_pend[0])
+            if ok is not None:
+                if ok: self.tx_prof = self.tx_pend[1]; self.last_report = now; self.n_switch += 1
+                self.tx_pend = None
+
+    def tick(self, now):
+        """Apply pending profile changes; returns a T_ADR frame to send, or None.
+
+        Call it only while the TX radio is idle. A retune the radio hasn't
+        answered yet is picked up on a later tick.
+        """
+        if self.rx_prof and now - self.last_rx >= self.fallback_s:
+            self.rx_want = 0; self.last_rx = now; self.n_fallback += 1
+        if self.tx_prof and now - self.last_report >= 2 * self.fallback_s:
+            self.tx_want = 0; self.last_report = now; self.n_fallback += 1
+        self._settle(now)
+        if self.rx_want >= 0 and not self.rx_pend:
+            p = self.rx_want; self.rx_want = -1
+            if p != self.rx_prof: self.rx_pend = (self.set_rx(*self.profiles[p]), p)
+            else: self.report_due = True
+        if self.tx_want >= 0 and not self.tx_pend:
+            p = self.tx_want; self.tx_want = -1
+            self.tx_pend = (self.set_tx(*self.profiles[p]), p)
+        self._settle(now)
+        if self.ask >= 0:
+            p = self.ask; self.ask_n -= 1
+            if not self.ask_n:
+                self.ask = -1; self.tx_want = p     # retune once the last copy is on the air
+            return bytes((T_ADR, ADR_SWITCH, p, self.epoch))
+        if self.report_due or now >= self.next_report:
+            self.report_due = False; self.next_report = now + self.report_s
+            return self._report()
+        return None
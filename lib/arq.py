@@ -0,0 +1,190 @@
+# arq.py — selective-repeat ARQ for the RF hop
+#
+# Each bridge sends on one radio and receives on the other, so the two
+# directions never contend: ACKs for what we receive ride on whatever our TX
+# radio sends next, or go out on their own when it has nothing else to say.
+#   T_ARQ:     [type][io<<7 | seq][0x80 | cum][bitmap] + link frame
+#   T_ARQ_ACK: [type][0x80 | cum][bitmap]
+# seq is 7 bits. cum is the next sequence number the receiver is missing;
+# bit i of bitmap says cum+1+i has arrived. An ack byte without 0x80 means
+# "nothing received yet". io asks the receiver to deliver the frame in
+# sequence order; other frames are handed on the moment they arrive.
+#
+# The sender keeps up to `window` (<= 8) unacknowledged frames in fixed
+# slots and re-sends the oldest one whose RTO has run out, giving up after
+# max_tries. The receiver holds in-order frames that arrive behind a gap
+# for at most hold_s, then skips the gap.
+
+from rf_codec import T_ARQ, T_ARQ_ACK
+
+ARQ_HDR = 4
+_W = 8          # slots / bitmap bits
+
+
+def _d(a, b):
+    return (a - b) & 0x7F
+
+
+class ArqLink:
+    def __init__(self, window=8, max_tries=4, hold_s=8.0, rto_s=3.0, rto_min=0.8, rto_max=20.0):
+        self.window = min(window, _W)
+        self.max_tries = max_tries
+        self.hold_s = hold_s
+        self.rto = rto_s; self.rto_min = rto_min; self.rto_max = rto_max
+        self.srtt = 0.0; self.rttvar = 0.0
+        self.t_hold = 0.0
+        # sender
+        self.base = 0; self.next = 0
+        self.frame = [None] * _W; self.dest = [0] * _W; self.io = [0] * _W
+        self.t_sent = [0.0] * _W; self.tries = [0] * _W
+        # receiver
+        self.started = False; self.cum = 0; self.bm = 0
+        self.held = [None] * _W; self.held_src = [0] * _W
+        self.gap_t = 0.0
+        self.ack_due = False
+        self._out = []
+        self.n_sent = 0; self.n_retx = 0; self.n_giveup = 0
+        self.n_dup = 0; self.n_ooo = 0; self.n_skip = 0
+
+    # ---- sender ----
+    def outstanding(self):
+        return _d(self.next, self.base)
+
+    def pending(self):
+        """True while frames await an ACK or in-order frames wait behind a gap."""
+        return self.next != self.base or self.bm != 0
+
+    def can_send(self):
+        return self.outstanding() < self.window
+
+    def _ack_bytes(self):
+        self.ack_due = False
+        if not self.started: return b"\x00\x00"
+        return bytes((0x80 | self.cum, self.bm))
+
+    def _wire(self, seq):
+        k = seq & 7
+        return bytes((T_ARQ, (self.io[k] << 7) | seq)) + self._ack_bytes() + self.frame[k]
+
+    def wrap(self, dest, frame, io, now):
+        """Assign the next sequence number to frame; return the bytes to send."""
+        seq = self.next; k = seq & 7
+        self.frame[k] = frame; self.dest[k] = dest; self.io[k] = 1 if io else 0
+        self.t_sent[k] = now; self.tries[k] = 1
+        self.next = (seq + 1) & 0x7F
+        self.n_sent += 1
+        return self._wire(seq)
+
+    def hold(self, t):
+        """The peer can't ACK before t: no re-send is due until an RTO after it,
+        and frames sent until then give no RTT sample."""
+        if t > self.t_hold: self.t_hold = t
+
+    def retx(self, now):
+        """(dest, bytes) for the oldest frame whose RTO expired, or None."""
+        s = self.base
+        while s != self.next:
+            k = s & 7
+            if self.frame[k] is not None and now - max(self.t_sent[k], self.t_hold) >= self.rto * self.tries[k]:
+                if self.tries[k] >= self.max_tries:
+                    self.frame[k] = None; self.n_giveup += 1
+                else:
+                    self.tries[k] += 1; self.t_sent[k] = now; self.n_retx += 1
+                    return self.dest[k], self._wire(s)
+            s = (s + 1) & 0x7F
+        self._slide()
+        return None
+
+    def _slide(self):
+        while self.base != self.next and self.frame[self.base & 7] is None:
+            self.base = (self.base + 1) & 0x7F
+
+    def _rtt(self, r):
+        if not self.srtt: self.srtt = r; self.rttvar = r / 2
+        else:
+            self.rttvar += (abs(self.srtt - r) - self.rttvar) / 4
+            self.srtt += (r - self.srtt) / 8
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.rto_min), self.rto_max)
+
+    def _on_ack(self, a0, bm, now):
+        if not a0 & 0x80: return
+        cum = a0 & 0x7F
+        if _d(self.next, cum) > self.outstanding() + _W: return   # not from this window
+        s = self.base
+        while s != self.next:
+            k = s & 7; r = _d(s, cum)
+            if self.frame[k] is not None and (r >= 64 or (0 < r <= _W and bm >> (r - 1) & 1)):
+                if self.tries[k] == 1 and self.t_sent[k] >= self.t_hold: self._rtt(now - self.t_sent[k])
+                self.frame[k] = None
+            s = (s + 1) & 0x7F
+        self._slide()
+
+    # ---- receiver ----
+    def ack_frame(self):
+        """Standalone T_ARQ_ACK if one is owed, else None."""
+        if not self.ack_due: return None
+        return bytes((T_ARQ_ACK,)) + self._ack_bytes()
+
+    def _advance(self, out):
+        # cum has just been received (or skipped): move past every frame
+        # already in, releasing held in-order frames on the way
+        while True:
+            self.cum = (self.cum + 1) & 0x7F
+            got = self.bm & 1; self.bm >>= 1
+            if not got: break
+            k = self.cum & 7
+            if self.held[k] is not None:
+                out.append((self.held_src[k], self.held[k])); self.held[k] = None
+
+    def _flush(self, out):
+        for k in range(_W):
+            if self.held[k] is not None:
+                out.append((self.held_src[k], self.held[k])); self.held[k] = None
+        self.bm = 0
+
+    def input(self, src, frame, now):
+        """Feed one decoded RF frame; return the list of (src, link frame) to process now.
+
+        The list is reused on the next call. Non-ARQ frames pass straight through.
+        """
+        out = self._out; out.clear()
+        t = frame[0] if frame else 0
+        if t == T_ARQ_ACK:
+            if len(frame) >= 3: self._on_ack(frame[1], frame[2], now)
+            return out
+        if t != T_ARQ:
+            out.append((src, frame)); return out
+        if len(frame) < ARQ_HDR: return out
+        self._on_ack(frame[2], frame[3], now)
+        seq = frame[1] & 0x7F; io = frame[1] >> 7; body = frame[ARQ_HDR:]
+        self.ack_due = True
+        d = _d(seq, self.cum)
+        if not self.started or _W < d < 128 - _W:      # first frame, or the peer restarted
+            self._flush(out)
+            self.started = True; self.cum = seq; d = 0
+        if d >= 128 - _W:
+            self.n_dup += 1; return out
+        had_gap = self.bm != 0
+        if d == 0:
+            out.append((src, body)); self._advance(out)
+        else:
+            bit = 1 << (d - 1)
+            if self.bm & bit:
+                self.n_dup += 1; return out
+            self.bm |= bit; self.n_ooo += 1
+            if io:
+                k = seq & 7; self.held[k] = body; self.held_src[k] = src
+            else:
+                out.append((src, body))
+        if not self.bm: self.gap_t = 0.0
+        elif not had_gap or d == 0: self.gap_t = now
+        return out
+
+    def expire(self, now):
+        """Skip a gap that has held up in-order frames for hold_s; returns released frames."""
+        out = self._out; out.clear()
+        if self.bm and now - self.gap_t >= self.hold_s:
+            self.n_skip += 1
+            self._advance(out)
+            self.gap_t = now if self.bm else 0.0
+        return out
@@ -0,0 +1,74 @@
+# bond.py — lend the quiet direction's band to the busy one
+#
+# Each bridge sends on one band and listens on the other, so during a
+# one-way transfer one band carries a full queue while the other carries a
+# trickle of ACKs. Bonding lets the busy side borrow the quiet band for a
+# while: its RX radio, already tuned there, sends overflow frames to the
+# peer's TX radio, which listens on its own band while it keeps quiet.
+#   request: [type][1][frames queued]
+#   grant:   [type][2][loan in 0.1 s] + optional T_ARQ_ACK frame
+# The busy side asks once it has `backlog` frames queued, again as soon as
+# a grant arrives (so the next loan is lined up while this one runs), and
+# otherwise every req_s while it stays backlogged. The quiet side grants a
+# request only when it has nothing else to send. The grant carries its ACK
+# of what it has heard so far, since it can't send another until the loan
+# is over; it goes quiet once the grant is on the air and listens on its
+# TX radio until the loan runs out. The borrower stops starting sends
+# guard_s before its end. Frames on either band share one ARQ sequence
+# space, so the receiver's in-order delivery puts them back in order. A
+# lost grant costs one loan of the quiet side's airtime and nothing else.
+
+from rf_codec import T_BOND
+
+BOND_REQ = 1
+BOND_GRANT = 2
+
+
+class BondLink:
+    def __init__(self, backlog=4, req_s=10.0, stale_s=30.0, guard_s=0.2):
+        self.backlog = backlog; self.req_s = req_s; self.stale_s = stale_s; self.guard_s = guard_s
+        # borrower: we are backlogged
+        self.borrow_until = 0.0; self.asked = False; self.ask_t = 0.0
+        # lender: the peer is
+        self.lend_until = 0.0; self.wanted = False; self.want_t = 0.0
+        self.n_req = 0; self.n_grant = 0; self.n_loan = 0; self.n_tx = 0
+
+    def borrowing(self, now):
+        return now < self.borrow_until
+
+    def lending(self, now):
+        return now < self.lend_until
+
+    def request(self, queued, now):
+        """T_BOND request to send if we are backlogged and haven't asked lately, else None."""
+        if queued < self.backlog or self.lending(now): return None
+        if self.asked and now - self.ask_t < self.req_s: return None
+        self.asked = True; self.ask_t = now; self.n_req += 1
+        return bytes((T_BOND, BOND_REQ, min(queued, 255)))
+
+    def grant_due(self, now):
+        """True if the peer wants a loan; ask only when there is nothing else to send."""
+        if not self.wanted or self.borrowing(now) or self.lending(now): return False
+        if now - self.want_t >= self.stale_s:
+            self.wanted = False; return False
+        return True
+
+    def grant(self, loan_s, ack):
+        """T_BOND grant of loan_s (at most 25.5 s) carrying our ARQ ACK frame, if any."""
+        self.wanted = False; self.n_grant += 1
+        return bytes((T_BOND, BOND_GRANT, max(1, min(int(loan_s * 10), 255)))) + (ack or b"")
+
+    def lent(self, t_on_air, frame):
+        """The grant frame has gone out and is off the air at t_on_air: start the loan."""
+        self.lend_until = t_on_air + frame[2] / 10
+
+    def input(self, frame, now):
+        """Handle one T_BOND frame from the peer; returns an ARQ ACK frame it carried, or None."""
+        if len(frame) < 3: return None
+        if frame[1] == BOND_REQ:
+            self.wanted = True; self.want_t = now
+        elif frame[1] == BOND_GRANT:
+            self.borrow_until = now + frame[2] / 10 - self.guard_s
+            self.asked = False; self.n_loan += 1
+            if len(frame) > 3: return frame[3:]
+        return None
@@ -0,0 +1,214 @@
+# fec.py — forward erasure correction across RF frames
+#
+# Frames of one queue class are grouped k at a time. Each goes out as-is
+# with a 3-byte header and is handed on by the receiver as soon as it
+# arrives; after the k-th (or when the group has been open for flush_s) the
+# sender adds m parity frames. Any m lost frames of a group can be rebuilt
+# from the rest without a round trip.
+#   T_FEC:   [type][gid][idx] + frame
+#   T_FEC_P: [type][gid][k<<4 | j] + parity
+# Parity j is sum_i alpha^(j*i) * S_i over GF(2^8), where S_i is frame i
+# prefixed with its 2-byte length and zero-padded; parity 0 is plain XOR.
+# Multiplication goes through exp/log tables, plus a 256-byte product table
+# per coefficient, built the first time that coefficient is used.
+
+from rf_codec import T_FEC, T_FEC_P
+
+FEC_K_MAX = 15   # frames per group (4-bit k)
+FEC_M_MAX = 3    # parity frames per group
+FEC_HDR = 5      # parity header + length prefix: the per-frame budget a group costs
+
+_EXP = bytearray(512); _LOG = bytearray(256)
+_x = 1
+for _i in range(255):
+    _EXP[_i] = _x; _LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100: _x ^= 0x11D
+for _i in range(255, 512): _EXP[_i] = _EXP[_i - 255]
+
+def gf_mul(a, b):
+    if not a or not b: return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+def gf_inv(a):
+    return _EXP[255 - _LOG[a]]
+
+def _coef(j, i):
+    return _EXP[(j * i) % 255]
+
+_TABLES = {}
+
+def _mul_table(c):
+    # built once per coefficient actually used
+    if c == 1: return None
+    t = _TABLES.get(c)
+    if t is None:
+        lc = _LOG[c]; t = bytearray(256)
+        for v in range(1, 256): t[v] = _EXP[lc + _LOG[v]]
+        _TABLES[c] = t
+    return t
+
+def _axpy(dst, c, src, n):
+    """dst[:n] ^= c * src[:n]"""
+    t = _mul_table(c)
+    if t is None:
+        for i in range(n): dst[i] ^= src[i]
+    else:
+        for i in range(n): dst[i] ^= t[src[i]]
+
+
+class FecEncoder:
+    """TX side. k[c] / m[c] give the group size and parity count for class c (m=0: off)."""
+
+    def __init__(self, k=(4, 8, 4), m=(1, 1, 0), max_frame=256, flush_s=2.0):
+        self.k = [min(x, FEC_K_MAX) for x in k]
+        self.m = [min(x, FEC_M_MAX) for x in m]
+        self.flush_s = flush_s
+        nc = len(self.k)
+        self.n = [0] * nc; self.gid = [0] * nc; self.dest = [0] * nc
+        self.t0 = [0.0] * nc; self.size = [0] * nc
+        self.acc = [[bytearray(max_frame + 2) for _ in range(self.m[c])] for c in range(nc)]
+        self._sym = bytearray(max_frame + 2)
+        self._gid = 0
+        self.pending = []               # (dest, parity frame) ready to send
+        self.n_groups = 0; self.n_parity = 0
+
+    def wrap(self, cls, dest, frame, now):
+        """Frame as it goes on the air; parity is queued once the group is full."""
+        if not self.m[cls]: return frame
+        if self.n[cls] and self.dest[cls] != dest: self._close(cls)
+        i = self.n[cls]
+        if not i:
+            self._gid = (self._gid + 1) & 0xFF
+            self.gid[cls] = self._gid; self.dest[cls] = dest; self.t0[cls] = now; self.size[cls] = 0
+            for a in self.acc[cls]:
+                for t in range(len(a)): a[t] = 0
+        n = len(frame); L = n + 2
+        s = self._sym; s[0] = n >> 8; s[1] = n & 0xFF; s[2:L] = frame
+        for j in range(self.m[cls]):
+            _axpy(self.acc[cls][j], _coef(j, i), s, L)
+        if L > self.size[cls]: self.size[cls] = L
+        self.n[cls] = i + 1
+        out = bytes((T_FEC, self.gid[cls], i)) + frame
+        if self.n[cls] >= self.k[cls]: self._close(cls)
+        return out
+
+    def _close(self, cls):
+        k = self.n[cls]
+        for j in range(self.m[cls]):
+            self.pending.append((self.dest[cls], bytes((T_FEC_P, self.gid[cls], (k << 4) | j)) +
+                                 bytes(self.acc[cls][j][:self.size[cls]])))
+            self.n_parity += 1
+        self.n[cls] = 0; self.n_groups += 1
+
+    def tick(self, now):
+        """Close groups that have waited flush_s for their k-th frame."""
+        for c in range(len(self.n)):
+            if self.n[c] and now - self.t0[c] >= self.flush_s:
+                self._close(c)
+
+    def pop(self):
+        return self.pending.pop(0) if self.pending else None
+
+    def busy(self):
+        """True while a group is open or parity is waiting to go out."""
+        return bool(self.pending) or any(self.n)
+
+
+class _Group:
+    def __init__(self):
+        self.key = None; self.k = 0; self.done = False; self.t = 0.0
+        self.data = [None] * FEC_K_MAX
+        self.par = [None] * FEC_M_MAX
+
+
+class FecDecoder:
+    """RX side: passes frames on as they arrive and rebuilds lost ones from parity."""
+
+    def __init__(self, slots=4):
+        self.groups = [_Group() for _ in range(slots)]
+        self._out = []
+        self.n_recovered = 0; self.n_failed = 0
+
+    def _group(self, key, now):
+        old = self.groups[0]
+        for g in self.groups:
+            if g.key == key: return g
+            if g.t < old.t: old = g
+        old.key = key; old.k = 0; old.done = False; old.t = now
+        for i in range(FEC_K_MAX): old.data[i] = None
+        for j in range(FEC_M_MAX): old.par[j] = None
+        return old
+
+    def input(self, src, frame, now):
+        """Feed one decoded RF frame; returns the list of frames to process (reused)."""
+        out = self._out; out.clear()
+        t = frame[0] if frame else 0
+        if t != T_FEC and t != T_FEC_P:
+            out.append(frame); return out
+        if len(frame) < 3: return out
+        g = self._group((src, frame[1]), now)
+        if t == T_FEC:
+            i = frame[2]; body = frame[3:]
+            if i < FEC_K_MAX and g.data[i] is None:
+                g.data[i] = body; out.append(body)
+        else:
+            j = frame[2] & 0x0F
+            if j < FEC_M_MAX:
+                g.k = frame[2] >> 4; g.par[j] = frame[3:]
+        if g.k and not g.done: self._recover(g, out)
+        return out
+
+    def _recover(self, g, out):
+        k = g.k
+        miss = [i for i in range(k) if g.data[i] is None]
+        if not miss:
+            g.done = True; return
+        rows = [j for j in range(FEC_M_MAX) if g.par[j] is not None]
+        e = len(miss)
+        if len(rows) < e: return
+        rows = rows[:e]
+        L = len(g.par[rows[0]])
+        # syndromes: parity minus the contribution of every frame that arrived
+        syn = []
+        for j in rows:
+            s = bytearray(L); p = g.par[j]; s[0:len(p)] = p
+            for i in range(k):
+                d = g.data[i]
+                if d is None: continue
+                n = len(d) + 2
+                if n > L: self.n_failed += 1; g.done = True; return
+                sym = bytearray(n); sym[0] = (n - 2) >> 8; sym[1] = (n - 2) & 0xFF; sym[2:] = d
+                _axpy(s, _coef(j, i), sym, n)
+            syn.append(s)
+        inv = _invert([[_coef(j, i) for i in miss] for j in rows])
+        if inv is None:
+            self.n_failed += 1; g.done = True; return
+        for c, i in enumerate(miss):
+            x = bytearray(L)
+            for r in range(e):
+                if inv[c][r]: _axpy(x, inv[c][r], syn[r], L)
+            n = (x[0] << 8) | x[1]
+            if n + 2 > L:
+                self.n_failed += 1; continue
+            g.data[i] = bytes(x[2:2 + n]); out.append(g.data[i])
+            self.n_recovered += 1
+        g.done = True
+
+
+def _invert(a):
+    """Inverse of a small square matrix over GF(2^8), or None if singular."""
+    n = len(a)
+    m = [row[:] + [1 if r == c else 0 for c in range(n)] for r, row in enumerate(a)]
+    for c in range(n):
+        p = c
+        while p < n and not m[p][c]: p += 1
+        if p == n: return None
+        m[c], m[p] = m[p], m[c]
+        iv = gf_inv(m[c][c])
+        m[c] = [gf_mul(iv, v) for v in m[c]]
+        for r in range(n):
+            if r != c and m[r][c]:
+                f = m[r][c]
+                m[r] = [v ^ gf_mul(f, w) for v, w in zip(m[r], m[c])]
+    return [row[n:] for row in m]
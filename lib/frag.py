@@ -0,0 +1,98 @@
+# frag.py — link-layer fragmentation so host packets can exceed one AT+SEND
+#
+# A link frame longer than the codec's per-send limit is cut into up to
+# FRAG_MAX pieces of `chunk` bytes (the last one shorter):
+#   T_FRAG: [type][id][idx<<4 | last_idx][chunk] + data
+# The receiver copies piece idx to offset idx*chunk of a preallocated slot
+# buffer and hands the frame on once every piece has arrived. Slots are
+# fixed-size and few; an incomplete packet is dropped after timeout_s or
+# when its slot is needed by a newer packet, so reassembly can never grow
+# the heap.
+
+from rf_codec import T_FRAG
+
+FRAG_MAX = 16   # pieces per packet (4-bit index)
+FRAG_HDR = 4
+
+def frag_capacity(max_frame):
+    """Largest frame that split() can carry for a given per-send limit."""
+    return FRAG_MAX * min(max_frame - FRAG_HDR, 255)
+
+
+class Fragmenter:
+    def __init__(self):
+        self._id = 0
+        self.n_pkts = 0; self.n_frags = 0
+
+    def split(self, frame, max_frame):
+        """Cut frame into T_FRAG pieces of at most max_frame bytes; None if too big."""
+        chunk = min(max_frame - FRAG_HDR, 255)
+        n = (len(frame) + chunk - 1) // chunk
+        if n > FRAG_MAX:
+            return None
+        self._id = (self._id + 1) & 0xFF
+        out = []
+        for i in range(n):
+            out.append(bytes((T_FRAG, self._id, (i << 4) | (n - 1), chunk)) +
+                       frame[i*chunk:(i+1)*chunk])
+        self.n_pkts += 1; self.n_frags += n
+        return out
+
+
+class Reassembler:
+    def __init__(self, slots=4, max_bytes=1600, timeout_s=20.0):
+        self.bufs = [bytearray(max_bytes) for _ in range(slots)]
+        self.max_bytes = max_bytes
+        self.timeout_s = timeout_s
+        self.key  = [None] * slots      # (src, id) being rebuilt
+        self.got  = [0] * slots         # bitmap of pieces received
+        self.need = [0] * slots         # bitmap when complete
+        self.size = [0] * slots         # total length, known once the last piece lands
+        self.t0   = [0.0] * slots
+        self.n_done = 0; self.n_lost = 0; self.n_bad = 0
+
+    def _slot(self, key, now):
+        free = -1; oldest = 0
+        for i in range(len(self.key)):
+            k = self.key[i]
+            if k == key:
+                return i
+            if k is not None and now - self.t0[i] > self.timeout_s:
+                self.key[i] = None; self.n_lost += 1; k = None
+            if k is None:
+                if free < 0: free = i
+            elif self.t0[i] < self.t0[oldest] or self.key[oldest] is None:
+                oldest = i
+        if free < 0:
+            free = oldest; self.n_lost += 1
+        self.key[free] = key; self.got[free] = 0; self.need[free] = 0
+        self.size[free] = 0; self.t0[free] = now
+        return free
+
+    def feed(self, src, frame, now):
+        """Non-T_FRAG frames pass through; pieces return the whole frame once complete, else None."""
+        if not frame or frame[0] != T_FRAG:
+            return frame
+        if len(frame) < FRAG_HDR + 1:
+            self.n_bad += 1; return None
+        idx = frame[2] >> 4; last = frame[2] & 0x0F; chunk = frame[3]
+        n = len(frame) - FRAG_HDR
+        off = idx * chunk
+        if idx > last or chunk == 0 or off + n > self.max_bytes or (idx < last and n != chunk):
+            self.n_bad += 1; return None
+        i = self._slot((src, frame[1]), now)
+        need = (1 << (last + 1)) - 1
+        if self.need[i] != need:
+            if self.need[i]:            # id reused with another shape: start over
+                self.n_lost += 1; self.got[i] = 0; self.size[i] = 0; self.t0[i] = now
+            self.need[i] = need
+        self.bufs[i][off:off + n] = frame[FRAG_HDR:]
+        self.got[i] |= 1 << idx
+        if idx == last:
+            self.size[i] = off + n
+        if self.got[i] != need:
+            return None
+        out = bytes(self.bufs[i][:self.size[i]])
+        self.key[i] = None
+        self.n_done += 1
+        return out
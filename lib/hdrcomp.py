@@ -0,0 +1,254 @@
+# hdrcomp.py — Van Jacobson style TCP/IPv4 header compression for the RF hop
+#
+# Each bridge keeps up to HC_SLOTS per-flow contexts. A context is seeded by
+# a full packet (T_HC_FULL); later packets of the same flow go out as
+# T_HC_COMP frames that carry only the IP ID, SEQ, ACK, window and TCP
+# timestamps, each as the fewest low-order bytes (0-4) that the receiver
+# can complete from the last header it decoded (W-LSB, as in ROHC). The
+# sender keeps the last HC_WINDOW headers it sent and picks the size that
+# decodes right against every one of them, so a small step costs one or two
+# bytes and up to HC_WINDOW-1 frames in a row can be lost without harm. A
+# 4-bit frame counter lets the receiver notice a longer gap; it then drops
+# the flow's frames until the next full packet instead of misreading them.
+# The context is reseeded under a new 4-bit generation when static fields
+# change, every HC_REFRESH packets, and on TCP retransmissions / duplicate
+# ACKs, which is how the link heals after a long gap or a lost reseed. The first HC_REPEAT packets after a reseed go out
+# full (same generation), and so does any packet whose compressed form
+# would not be smaller.
+#
+# T_HC_FULL: [type][cid<<4|gen][k][original packet]
+# T_HC_COMP: [type][cid<<4|gen][sizes: ipid seq ack win, 2 bits each][sizes: tsval tsecr, 2 bits each | k]
+#            [tcp flags][tcp csum:2][low-order field bytes][payload]
+# Size codes are 0, 1, 2 bytes for 16-bit fields and 0, 2, 3, 4 bytes for
+# 32-bit ones; 0 means the field equals the receiver's reference.
+
+from pkt_peek import ip_peek, tcp_peek
+from rf_codec import T_HC_FULL, T_HC_COMP
+
+HC_SLOTS   = 16     # contexts per direction (cid is 4 bits)
+HC_REFRESH = 32     # re-send the full header at least this often per flow
+HC_REPEAT  = 2      # full packets per reseed
+HC_WINDOW  = 8      # sent headers the receiver's reference may be any of (max 15)
+
+_TCP_NOCOMP = 0x01 | 0x02 | 0x04 | 0x20   # FIN SYN RST URG travel uncompressed
+_SZ16 = (0, 1, 2)
+_SZ32 = (0, 2, 3, 4)
+
+def _u16(b, i): return (b[i]<<8)|b[i+1]
+def _u32(b, i): return (b[i]<<24)|(b[i+1]<<16)|(b[i+2]<<8)|b[i+3]
+def _put16(b, i, v): b[i]=(v>>8)&0xFF; b[i+1]=v&0xFF
+def _put32(b, i, v): b[i]=(v>>24)&0xFF; b[i+1]=(v>>16)&0xFF; b[i+2]=(v>>8)&0xFF; b[i+3]=v&0xFF
+
+def _sdelta(a, ref, bits):
+    """Signed wrap-around difference a-ref on a bits-wide field."""
+    m=1<<bits; d=(a-ref)&(m-1)
+    return d-m if d>=(m>>1) else d
+
+def _ts_offset(pkt, start, end):
+    """Offset of the TSval inside the TCP options, or -1."""
+    i=start
+    while i<end:
+        k=pkt[i]
+        if k==0: break
+        if k==1: i+=1; continue
+        if i+1>=end: break
+        L=pkt[i+1]
+        if L<2: break
+        if k==8 and L==10 and i+10<=end: return i+2
+        i+=L
+    return -1
+
+def ip_checksum(h, ihl):
+    s=0
+    for i in range(0, ihl, 2): s+=(h[i]<<8)|h[i+1]
+    while s>>16: s=(s&0xFFFF)+(s>>16)
+    return (~s)&0xFFFF
+
+
+def _lsb_size(v, refs, bits, sizes):
+    """Index into sizes of the fewest low bytes of v that decode right against every ref."""
+    mask=(1<<bits)-1
+    if all(r==v for r in refs): return 0
+    for code in range(1, len(sizes)):
+        k=sizes[code]*8
+        if k>=bits: return code
+        m=1<<k; lo=m>>2
+        if all(-lo<=_sdelta(v, r, bits)<m-lo for r in refs): return code
+    return len(sizes)-1
+
+def _lsb_decode(x, ref, k, bits):
+    """The value with low k bits x closest to ref (interval [ref-2^k/4, ref+3*2^k/4))."""
+    if k>=bits: return x
+    m=1<<k; base=(ref-(m>>2))&((1<<bits)-1)
+    return (base+((x-base)&(m-1)))&((1<<bits)-1)
+
+# (ipid, seq, ack, win, tsval, tsecr) of a header
+def _fields(h, ihl, ts):
+    t=ihl
+    return (_u16(h, 4), _u32(h, t+4), _u32(h, t+8), _u16(h, t+14),
+            _u32(h, ts) if ts>=0 else 0, _u32(h, ts+4) if ts>=0 else 0)
+
+_BITS = (16, 32, 32, 16, 32, 32)
+
+
+class _Ctx:
+    def __init__(self, cid):
+        self.cid=cid; self.key=None; self.gen=0; self.ref=None
+        self.ihl=0; self.hlen=0; self.ts=-1; self.count=0; self.used=0
+        self.seq_hi=0; self.last_ack=-1; self.last_win=-1; self.reps=0
+        self.k=0; self.win=[]      # frame counter; fields of the last HC_WINDOW headers sent
+
+
+class HeaderCompressor:
+    """TX side: turns TCP/IPv4 packets into T_HC_FULL / T_HC_COMP frames."""
+
+    def __init__(self, slots=HC_SLOTS, refresh=HC_REFRESH, repeat=HC_REPEAT, max_frame=None,
+                 window=HC_WINDOW):
+        self.ctx=[_Ctx(i) for i in range(min(slots, 16))]
+        self.refresh=refresh
+        self.repeat=repeat
+        self.max_frame=max_frame
+        self.window=max(1, min(window, 15))
+        self._tick=0
+        self.n_full=0; self.n_comp=0; self.n_raw=0; self.saved=0
+
+    def _lookup(self, key):
+        lru=self.ctx[0]
+        for c in self.ctx:
+            if c.key==key: return c
+            if c.used<lru.used: lru=c
+        return lru
+
+    def compress(self, pkt):
+        """Return the frame to put on the air for pkt (may be pkt itself)."""
+        proto, tot, ihl, off = ip_peek(pkt)
+        if proto!=6 or off or tot!=len(pkt) or (pkt[0]>>4)!=4 or ihl<20 or (pkt[6]&0x3F) or pkt[7]:
+            self.n_raw+=1; return pkt
+        flags, doff, dlen = tcp_peek(pkt, off, ihl)
+        if flags is None or doff<20 or (flags & _TCP_NOCOMP):
+            self.n_raw+=1; return pkt
+        key=bytes(pkt[12:20])+bytes(pkt[ihl:ihl+4])
+        c=self._lookup(key)
+        self._tick+=1; c.used=self._tick
+        hlen=ihl+doff
+        seq=_u32(pkt, ihl+4); ack=_u32(pkt, ihl+8); win=_u16(pkt, ihl+14)
+        frame=None; reseed=True
+        if c.key==key and c.count<self.refresh and hlen==c.hlen and self._static_ok(c, pkt, ihl, hlen):
+            if dlen and _sdelta(seq, c.seq_hi, 32)<0: pass          # retransmission
+            elif not dlen and ack==c.last_ack and win==c.last_win: pass  # duplicate ACK
+            else:
+                reseed=False
+                if c.reps: c.reps-=1
+                else: frame=self._comp(c, pkt, ihl, hlen)
+        if frame is None:
+            frame=self._full(c, key, pkt, ihl, hlen, reseed)
+            if frame is None:
+                self.n_raw+=1; return pkt
+            if reseed: c.seq_hi=seq
+        c.count+=1
+        c.win.append(_fields(pkt, ihl, c.ts))
+        if len(c.win)>self.window: c.win.pop(0)
+        end=(seq+dlen)&0xFFFFFFFF
+        if _sdelta(end, c.seq_hi, 32)>0: c.seq_hi=end
+        c.last_ack=ack; c.last_win=win
+        self.saved+=len(pkt)-len(frame)
+        return frame
+
+    def _static_ok(self, c, pkt, ihl, hlen):
+        r=c.ref
+        if pkt[0:2]!=r[0:2] or pkt[6:10]!=r[6:10] or pkt[20:ihl]!=r[20:ihl]: return False
+        t=ihl
+        if pkt[t+12]!=r[t+12] or pkt[t+18:t+20]!=r[t+18:t+20]: return False
+        ts=c.ts
+        if ts<0: return pkt[t+20:hlen]==r[t+20:hlen]
+        return pkt[t+20:ts]==r[t+20:ts] and pkt[ts+8:hlen]==r[ts+8:hlen]
+
+    def _too_long(self, pkt, n):
+        # never push a packet that fits in one frame over the limit; packets
+        # that are fragmented anyway are always worth compressing
+        m=self.max_frame
+        return m is not None and len(pkt)<=m<n
+
+    def _full(self, c, key, pkt, ihl, hlen, reseed):
+        if self._too_long(pkt, len(pkt)+3): return None
+        if reseed or c.key!=key:
+            c.key=key; c.gen=(c.gen+1)&0x0F; c.ref=bytes(pkt[:hlen])
+            c.ihl=ihl; c.hlen=hlen; c.ts=_ts_offset(pkt, ihl+20, hlen); c.count=0
+            c.reps=self.repeat-1; c.win=[]
+        c.k=(c.k+1)&0x0F
+        self.n_full+=1
+        return bytes((T_HC_FULL, (c.cid<<4)|c.gen, c.k))+bytes(pkt)
+
+    def _comp(self, c, pkt, ihl, hlen):
+        t=ihl; k=(c.k+1)&0x0F
+        vals=_fields(pkt, ihl, c.ts)
+        out=bytearray((T_HC_COMP, (c.cid<<4)|c.gen, 0, k, pkt[t+13], pkt[t+16], pkt[t+17]))
+        codes=0
+        for f in range(6):
+            bits=_BITS[f]; sizes=_SZ16 if bits==16 else _SZ32
+            v=vals[f]
+            code=_lsb_size(v, [w[f] for w in c.win], bits, sizes)
+            codes=(codes<<2)|code
+            for j in range(sizes[code]-1, -1, -1): out.append((v>>(8*j))&0xFF)
+        out[2]=codes>>4; out[3]=((codes&0x0F)<<4)|k
+        out+=pkt[hlen:]
+        if len(out)>=len(pkt)+3 or self._too_long(pkt, len(out)): return None
+        c.k=k
+        self.n_comp+=1
+        return bytes(out)
+
+
+class HeaderDecompressor:
+    """RX side: rebuilds packets from T_HC_FULL / T_HC_COMP frames."""
+
+    def __init__(self, slots=HC_SLOTS, window=HC_WINDOW):
+        n=min(slots, 16)
+        self.window=max(1, min(window, 15))
+        self.ref=[None]*n; self.gen=[0]*n; self.ihl=[0]*n; self.hlen=[0]*n; self.ts=[-1]*n
+        self.k=[0]*n
+        self.n_full=0; self.n_comp=0; self.n_miss=0
+
+    def decompress(self, frame):
+        """Return the original packet, frame itself if uncompressed, or None."""
+        if len(frame)<3: return frame
+        t=frame[0]
+        if t==T_HC_FULL:
+            cid=frame[1]>>4; pkt=bytes(frame[3:])
+            proto, tot, ihl, off = ip_peek(pkt)
+            flags, doff, dlen = tcp_peek(pkt, off, ihl) if proto==6 else (None, 0, 0)
+            if flags is not None and cid<len(self.ref):
+                hlen=ihl+doff
+                self.ref[cid]=pkt[:hlen]; self.gen[cid]=frame[1]&0x0F; self.k[cid]=frame[2]&0x0F
+                self.ihl[cid]=ihl; self.hlen[cid]=hlen; self.ts[cid]=_ts_offset(pkt, ihl+20, hlen)
+                self.n_full+=1
+            return pkt
+        if t!=T_HC_COMP: return frame
+        if len(frame)<7: self.n_miss+=1; return None
+        cid=frame[1]>>4; n=len(frame); k=frame[3]&0x0F
+        if cid>=len(self.ref) or self.ref[cid] is None or self.gen[cid]!=(frame[1]&0x0F):
+            self.n_miss+=1; return None
+        if not 1<=((k-self.k[cid])&0x0F)<=self.window:
+            self.ref[cid]=None                  # too many lost to decode: wait for a full packet
+            self.n_miss+=1; return None
+        ihl=self.ihl[cid]; hlen=self.hlen[cid]; ts=self.ts[cid]; t=ihl
+        h=bytearray(self.ref[cid])
+        h[t+13]=frame[4]; h[t+16]=frame[5]; h[t+17]=frame[6]
+        codes=(frame[2]<<4)|(frame[3]>>4); i=7
+        for f, pos in enumerate((4, t+4, t+8, t+14, ts, ts+4)):
+            code=(codes>>(10-2*f))&3
+            if not code: continue
+            bits=_BITS[f]; sizes=_SZ16 if bits==16 else _SZ32
+            if code>=len(sizes) or pos<0: self.n_miss+=1; return None
+            nb=sizes[code]
+            if i+nb>n: self.n_miss+=1; return None
+            x=0
+            for j in range(nb): x=(x<<8)|frame[i+j]
+            i+=nb
+            if bits==16: _put16(h, pos, _lsb_decode(x, _u16(h, pos), 8*nb, 16))
+            else: _put32(h, pos, _lsb_decode(x, _u32(h, pos), 8*nb, 32))
+        _put16(h, 2, hlen+n-i)
+        h[10]=0; h[11]=0
+        _put16(h, 10, ip_checksum(h, ihl))
+        self.ref[cid]=bytes(h); self.k[cid]=k
+        self.n_comp+=1
+        return bytes(h)+bytes(frame[i:])
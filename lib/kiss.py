@@ -0,0 +1,130 @@
+# kiss.py — KISS framing for the host side of the bridge
+#
+# Frames are FEND <type> <data> FEND with FEND/FESC in the data escaped as
+# FESC TFEND / FESC TFESC. Both directions work on whole runs of bytes:
+# kiss_encode() leans on bytes.replace(), while KissEncoder and the decoder
+# find() the next FEND or FESC and copy everything in between with one
+# slice assignment into a buffer allocated once, so the interpreter only
+# touches the bytes that actually need escaping.
+
+FEND = 0xC0; FESC = 0xDB; TFEND = 0xDC; TFESC = 0xDD
+KISS_PORT_DATA = 0x00
+
+_FEND_B = b"\xc0"; _FESC_B = b"\xdb"
+
+
+def kiss_encode(payload, port=KISS_PORT_DATA):
+    """payload -> one complete KISS frame (bytes)."""
+    p = bytes(payload)
+    if _FESC_B in p: p = p.replace(_FESC_B, b"\xdb\xdd")
+    if _FEND_B in p: p = p.replace(_FEND_B, b"\xdb\xdc")
+    return bytes((FEND, port)) + p + _FEND_B
+
+
+class KissEncoder:
+    """kiss_encode() into a buffer allocated once, for the per-packet path.
+
+    encode() returns a memoryview of the frame that stays valid until the
+    next call, so it should go straight to the port. Payloads too long for
+    the buffer fall back to kiss_encode().
+    """
+
+    def __init__(self, max_frame=2048):
+        self.buf = bytearray(2 * max_frame + 3)   # every byte escaped, + FEND type .. FEND
+        self._mv = memoryview(self.buf)
+
+    def encode(self, payload, port=KISS_PORT_DATA):
+        n = len(payload)
+        if 2 * n + 3 > len(self.buf): return kiss_encode(payload, port)
+        if not isinstance(payload, (bytes, bytearray)): payload = bytes(payload)
+        b = self.buf; mv = self._mv; src = memoryview(payload)
+        b[0] = FEND; b[1] = port; o = 2; i = 0
+        e = payload.find(_FEND_B); x = payload.find(_FESC_B)
+        while i < n:
+            j = e if x < 0 or 0 <= e < x else x
+            if j < 0: j = n
+            mv[o:o + j - i] = src[i:j]; o += j - i
+            if j == n: break
+            b[o] = FESC; b[o + 1] = TFEND if j == e else TFESC; o += 2; i = j + 1
+            if j == e: e = payload.find(_FEND_B, i)
+            else: x = payload.find(_FESC_B, i)
+        b[o] = FEND
+        return mv[:o + 1]
+
+
+class KissDecoder:
+    """Stateful KISS deframer: feed() it whatever the serial port returned.
+
+    Partial frames (and a FESC split across two reads) are carried over in a
+    buffer allocated once. Only data frames on port 0 are returned; any
+    other frame goes to on_cmd(port, command, data) if given and is counted
+    in n_other if not. Frames longer than max_frame are dropped and counted
+    in n_oversize.
+    """
+
+    def __init__(self, max_frame=2048, on_cmd=None):
+        self.buf = bytearray(max_frame + 1)   # + the type byte
+        self._mv = memoryview(self.buf)
+        self.n = 0
+        self.inside = False
+        self.esc = False
+        self.over = False
+        self.on_cmd = on_cmd
+        self.n_frames = 0; self.n_oversize = 0; self.n_other = 0; self.n_cmd = 0
+        self._out = []
+
+    def _put(self, mv, i, j):
+        n = self.n; m = n + j - i
+        if m > len(self.buf):
+            self.over = True; return
+        self._mv[n:m] = mv[i:j]; self.n = m
+
+    def _put_esc(self, b):
+        # byte after a FESC; anything but TFEND/TFESC is kept as-is
+        if self.n >= len(self.buf):
+            self.over = True; return
+        self.buf[self.n] = FEND if b == TFEND else FESC if b == TFESC else b
+        self.n += 1
+
+    def _end(self, out):
+        n = self.n
+        if self.over: self.n_oversize += 1
+        elif n and self.buf[0] == KISS_PORT_DATA:
+            out.append(bytes(self._mv[1:n])); self.n_frames += 1
+        elif n and self.on_cmd:
+            t = self.buf[0]; self.n_cmd += 1
+            self.on_cmd(t >> 4, t & 15, bytes(self._mv[1:n]))
+        elif n: self.n_other += 1
+        self.n = 0; self.esc = False; self.over = False
+
+    def feed(self, data):
+        """Consume a chunk of serial bytes; return the list of completed data frames.
+
+        The list is reused by the next call; the frames in it are the caller's.
+        """
+        out = self._out
+        out.clear()
+        mv = memoryview(data); end = len(data); i = 0
+        if not self.inside:
+            i = data.find(_FEND_B)
+            if i < 0: return out
+            i += 1; self.inside = True
+        while i < end:
+            j = data.find(_FEND_B, i)
+            stop = end if j < 0 else j
+            if self.esc and i < stop:          # FESC was the last byte of the previous run
+                self._put_esc(data[i]); i += 1
+                self.esc = False
+            while i < stop:
+                k = data.find(_FESC_B, i, stop)
+                if k < 0:
+                    self._put(mv, i, stop); i = stop; break
+                self._put(mv, i, k)
+                if k + 1 < stop:
+                    self._put_esc(data[k + 1]); i = k + 2
+                else:
+                    self.esc = True; i = stop
+            if j < 0: break
+            self._end(out)    # a FEND both closes this frame and opens the next
+            i = j + 1
+        return out
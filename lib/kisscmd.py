@@ -0,0 +1,85 @@
+# kisscmd.py — KISS command frames from the host: TNC parameters and SetHardware
+#
+# A KISS frame's type byte is (port << 4) | command; command 0 is data and
+# the bridge has one radio port, 0. The standard commands carry one byte:
+#   1 TXDELAY     n * 10 ms the TX radio stays idle after a send (TX_GUARD_S)
+#   2 P           persistence: a send opportunity is taken with probability (n+1)/256
+#   3 SLOTTIME    n * 10 ms before the next try after one is passed up
+#   4 TXTAIL      obsolete; accepted and ignored
+#   5 FULLDUPLEX  nonzero: send whenever the radio is free, ignoring P and SLOTTIME
+#   0xFF RETURN   (port 15, command 15) ignored; the bridge never leaves KISS mode
+# Each direction has a band of its own, so full duplex is the default. P
+# and SLOTTIME matter when several remote bridges share one band, e.g. the
+# spokes of a multi-peer hub: the RYLR998 reports no carrier, so it is
+# p-persistence without carrier sense, a random back-off that keeps spokes
+# from keying up in lockstep.
+#
+#   6 SETHW       ASCII "key=value ..." separated by spaces or commas:
+#       sf bw cr pre  AT+PARAMETER of both radios (bw in kHz or as the 7/8/9 code)
+#       pwr           AT+CRFOP, dBm
+#       gap           TX_MIN_GAP_S, seconds
+#       ack data lo   queue limits, packets (at most the size allocated at boot)
+#       both=1        required with sf/bw/cr/pre, see below
+# The radio commands are queued behind any AT+SEND in progress, so nothing
+# on the air or in the queues is lost locally. They retune only this
+# bridge: nothing is sent to the peer, whose radios must be given the same
+# sf/bw/cr/pre out-of-band (through its own host), or the link drops in
+# both directions. SETHW refuses those keys unless "both=1" is given to
+# confirm it. An empty frame or "?" changes nothing. Every
+# SETHW frame is answered with one SETHW frame on the same port: "OK " and
+# every setting in force, or "ERR " and the reason.
+
+try:
+    from random import getrandbits
+except ImportError:
+    getrandbits = None
+
+KISS_TXDELAY = 1; KISS_P = 2; KISS_SLOTTIME = 3; KISS_TXTAIL = 4
+KISS_FULLDUPLEX = 5; KISS_SETHW = 6
+
+HW_INT = ("sf", "bw", "cr", "pre", "pwr", "ack", "data", "lo", "both")
+HW_FLOAT = ("gap",)
+HW_RADIO = ("sf", "bw", "cr", "pre")
+
+
+def parse_hw(data):
+    """SETHW payload -> {key: value}; ValueError names the first bad field."""
+    kv = {}
+    for f in bytes(data).decode("ascii").replace(",", " ").split():
+        if f == "?": continue
+        k, _, v = f.partition("=")
+        k = k.lower()
+        try:
+            if k in HW_INT: kv[k] = int(v)
+            elif k in HW_FLOAT: kv[k] = float(v)
+            else: raise ValueError
+        except ValueError:
+            raise ValueError("bad setting " + f)
+        if kv[k] < 0: raise ValueError("bad setting " + f)
+    return kv
+
+
+class Persist:
+    """p-persistence: clear() says whether to take this send opportunity."""
+
+    def __init__(self, p=63, slot_s=0.1, full_duplex=True):
+        self.p = p; self.slot_s = slot_s; self.full_duplex = full_duplex
+        self.wait_until = 0.0
+        self.n_defer = 0
+
+    def clear(self, now):
+        if self.full_duplex or self.p >= 255 or not getrandbits: return True
+        if now < self.wait_until: return False
+        if getrandbits(8) <= self.p: return True
+        self.wait_until = now + self.slot_s; self.n_defer += 1
+        return False
+
+    def command(self, cmd, data):
+        """Apply a one-byte TXDELAY..FULLDUPLEX command; returns TXDELAY in seconds, else None."""
+        if not data: return None
+        v = data[0]
+        if cmd == KISS_P: self.p = v
+        elif cmd == KISS_SLOTTIME: self.slot_s = v / 100
+        elif cmd == KISS_FULLDUPLEX: self.full_duplex = v != 0
+        elif cmd == KISS_TXDELAY: return v / 100
+        return None
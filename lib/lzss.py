@@ -0,0 +1,149 @@
+# lzss.py — per-frame LZSS compression for the RF hop
+#
+# Every frame is compressed on its own, so a lost frame never affects the
+# next one and no window state is kept between frames: the "window" is the
+# frame itself, optionally preceded by a preset dictionary of common
+# protocol text that both ends know. Output is byte-aligned so neither side
+# does bit twiddling in Python:
+#   [flags] then 8 tokens, flag bit i (LSB first) set = match
+#   literal: one byte
+#   match:   [(off-1)>>8 << 4 | n][(off-1) & 0xFF] (+ [len-18] when n == 15)
+#            len = n + 3; off 1..4096 bytes back, may overlap the output
+# The encoder looks for matches with rfind() on a 3-byte key, nearest
+# first, so the search runs in C and only candidates are compared in Python.
+#
+# T_LZ:   [type] + compressed frame
+# T_LZ_D: [type] + compressed frame, with LZ_DICT in front of the window
+
+from rf_codec import T_LZ, T_LZ_D
+try:
+    from time import monotonic_ns as _ns
+except ImportError:
+    from time import monotonic as _mono
+    def _ns(): return int(_mono() * 1e9)
+
+_MIN = 3; _MAX = 18 + 255; _WIN = 4096
+_CAND = 8           # match candidates tried per position
+_PROBE = 256        # input bytes after which a frame that has not shrunk is abandoned
+
+LZ_DICT = (b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: "
+           b"GET / HTTP/1.1\r\nHost: \r\nUser-Agent: curl/\r\nAccept: */*\r\n"
+           b"Accept-Encoding: gzip, deflate\r\nConnection: keep-alive\r\n"
+           b"Cache-Control: no-cache\r\nServer: nginx\r\nDate: Mon, 01 Jan 2024 00:00:00 GMT\r\n"
+           b"Content-Type: text/html; charset=utf-8\r\nTransfer-Encoding: chunked\r\n\r\n"
+           b"<!DOCTYPE html><html><head><title></title></head><body><div class=\"\"></div></body></html>"
+           b"{\"id\": , \"name\": \"\", \"type\": \"\", \"value\": , \"status\": \"ok\", \"data\": [{\"\": null, true, false}]}"
+           b"root@localhost:~# ls -la\r\ndrwxr-xr-x  2 root root 4096 -rw-r--r--  1 root root "
+           b"PING 64 bytes from : icmp_seq= ttl=64 time= ms\r\n")
+
+
+def lz_compress(data, dictionary=b"", limit=None):
+    """data -> LZSS stream (bytes); dictionary is an implied prefix of the window.
+
+    With a limit, returns None as soon as the output reaches limit bytes, or
+    when the first _PROBE bytes did not shrink (encrypted or already
+    compressed data), so incompressible frames cost little CPU.
+    """
+    d = len(dictionary)
+    buf = bytes(dictionary) + bytes(data) if d else bytes(data)
+    n = len(buf); out = bytearray(); i = d
+    while i < n:
+        if limit is not None and (len(out) >= limit or (i - d >= _PROBE and len(out) >= i - d)):
+            return None
+        fpos = len(out); out.append(0); flags = 0
+        for bit in range(8):
+            if i >= n: break
+            best = 0; boff = 0
+            if i + _MIN <= n:
+                key = buf[i:i + _MIN]; lo = i - _WIN if i > _WIN else 0
+                lim = n - i if n - i < _MAX else _MAX
+                p = buf.rfind(key, lo, i + _MIN - 1); c = 0
+                while p >= 0 and c < _CAND:
+                    if best < lim and buf[p + best] == buf[i + best]:
+                        L = _MIN
+                        while L < lim and buf[p + L] == buf[i + L]: L += 1
+                        if L > best:
+                            best = L; boff = i - p
+                            if L == lim: break
+                    p = buf.rfind(key, lo, p + _MIN - 1); c += 1
+            if best:
+                flags |= 1 << bit; o = boff - 1; k = best - _MIN
+                if k < 15: out.append((o >> 8) << 4 | k); out.append(o & 0xFF)
+                else: out.append((o >> 8) << 4 | 15); out.append(o & 0xFF); out.append(best - 18)
+                i += best
+            else:
+                out.append(buf[i]); i += 1
+        out[fpos] = flags
+    return bytes(out)
+
+
+def lz_decompress(data, dictionary=b"", limit=4096):
+    """LZSS stream -> bytes, or None if it is malformed or expands past limit."""
+    d = len(dictionary)
+    out = bytearray(dictionary); i = 0; n = len(data)
+    while i < n:
+        flags = data[i]; i += 1
+        for bit in range(8):
+            if i >= n: break
+            if flags >> bit & 1:
+                if i + 1 >= n: return None
+                b0 = data[i]; off = ((b0 >> 4) << 8 | data[i + 1]) + 1; L = (b0 & 15) + _MIN; i += 2
+                if L == 18:
+                    if i >= n: return None
+                    L += data[i]; i += 1
+                s = len(out) - off
+                if s < 0 or len(out) + L - d > limit: return None
+                if off >= L: out += out[s:s + L]
+                else:
+                    for j in range(L): out.append(out[s + j])
+            else:
+                out.append(data[i]); i += 1
+    return bytes(out[d:])
+
+
+class LzCompressor:
+    """TX side: frames that don't shrink by at least one byte go out unchanged."""
+
+    def __init__(self, use_dict=True, min_len=24):
+        self.dict = LZ_DICT if use_dict else b""
+        self.type = T_LZ_D if use_dict else T_LZ
+        self.min_len = min_len
+        self.n_comp = 0; self.n_skip = 0; self.bytes_in = 0; self.bytes_out = 0; self.t_ns = 0
+
+    def compress(self, frame):
+        if len(frame) < self.min_len: return frame
+        t0 = _ns()
+        z = lz_compress(frame, self.dict, len(frame) - 2)
+        self.t_ns += _ns() - t0
+        if z is None or len(z) + 1 >= len(frame):
+            self.n_skip += 1; return frame
+        self.n_comp += 1; self.bytes_in += len(frame); self.bytes_out += len(z) + 1
+        return bytes((self.type,)) + z
+
+    def ratio(self):
+        return self.bytes_in / self.bytes_out if self.bytes_out else 1.0
+
+    def us_per_frame(self):
+        n = self.n_comp + self.n_skip
+        return self.t_ns // 1000 // n if n else 0
+
+
+class LzDecompressor:
+    """RX side: T_LZ / T_LZ_D frames are expanded, anything else passes through."""
+
+    def __init__(self, limit=4096):
+        self.limit = limit
+        self.n_frames = 0; self.n_bad = 0; self.t_ns = 0
+
+    def decompress(self, frame):
+        t = frame[0] if frame else 0
+        if t != T_LZ and t != T_LZ_D: return frame
+        t0 = _ns()
+        out = lz_decompress(memoryview(frame)[1:], LZ_DICT if t == T_LZ_D else b"", self.limit)
+        self.t_ns += _ns() - t0
+        if out is None: self.n_bad += 1
+        else: self.n_frames += 1
+        return out
+
+    def us_per_frame(self):
+        return self.t_ns // 1000 // self.n_frames if self.n_frames else 0
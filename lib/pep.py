@@ -0,0 +1,303 @@
+# pep.py — split-ACK TCP performance-enhancing proxy on the host side of the bridge
+#
+# Over tnc0 the host's TCP sees round trips of many seconds: it keeps its
+# window small, times out and re-sends segments that were only queued. With
+# the proxy the bridge ACKs the host's data itself, as soon as the segment
+# is queued for the air, and becomes the one responsible for getting it to
+# the far end. The host then sees a short, steady RTT and a window that
+# is simply the free space of a bounded per-flow buffer, so it keeps the
+# radio queue full instead of waiting on the link.
+#
+# Only connections whose SYN/SYN-ACK passed through are tracked (window
+# scale and timestamps are learned from them); everything else passes
+# untouched. Per flow:
+#   - in-order data (and the FIN) from the host is copied into the buffer,
+#     forwarded, and ACKed locally; a segment behind a gap or past the
+#     buffer is dropped and answered with a duplicate ACK;
+#   - the far end's ACKs free the buffer and are swallowed, except ones
+#     beyond what was ACKed locally; data, SYN, FIN and RST always pass;
+#   - a segment the far end doesn't ACK within the RTO (learned from the
+#     buffer's own round trips) is re-sent, as is the next one after a
+#     partial ACK or on the third duplicate ACK (NewReno);
+#   - after `max_tries` re-sends without progress both ends get an RST,
+#     since the host already believes the data was delivered.
+# A flow ends on RST, once its FIN has been ACKed by the far end, or after
+# idle_s without traffic.
+
+from pkt_peek import ip_peek, tcp_peek
+
+_FIN = 0x01; _SYN = 0x02; _RST = 0x04; _ACK = 0x10
+_M32 = 0xFFFFFFFF
+
+
+def _u16(b, i): return (b[i] << 8) | b[i + 1]
+def _u32(b, i): return (b[i] << 24) | (b[i + 1] << 16) | (b[i + 2] << 8) | b[i + 3]
+def _put16(b, i, v): b[i] = (v >> 8) & 0xFF; b[i + 1] = v & 0xFF
+def _put32(b, i, v): b[i] = (v >> 24) & 0xFF; b[i + 1] = (v >> 16) & 0xFF; b[i + 2] = (v >> 8) & 0xFF; b[i + 3] = v & 0xFF
+
+
+def _after(a, b):
+    """Sequence number a is later than b."""
+    return 0 < ((a - b) & _M32) < 0x80000000
+
+
+def _csum(b, i, j, s=0):
+    for k in range(i, j - 1, 2): s += (b[k] << 8) | b[k + 1]
+    if (j - i) & 1: s += b[j - 1] << 8
+    while s >> 16: s = (s & 0xFFFF) + (s >> 16)
+    return ~s & 0xFFFF
+
+
+def _opts(pkt, t, doff):
+    """(window scale or -1, TSval or None) from the TCP options at pkt[t+20:t+doff]."""
+    ws = -1; tsv = None
+    i = t + 20; end = t + doff
+    while i < end:
+        k = pkt[i]
+        if k == 0: break
+        if k == 1: i += 1; continue
+        if i + 1 >= end or pkt[i + 1] < 2: break
+        if k == 3 and pkt[i + 1] == 3: ws = min(pkt[i + 2], 14)
+        elif k == 8 and pkt[i + 1] == 10 and i + 10 <= end:
+            tsv = _u32(pkt, i + 2)
+        i += pkt[i + 1]
+    return ws, tsv
+
+
+class _Flow:
+    def __init__(self, key, now):
+        self.key = key; self.hdr = b""   # host addr, far addr, host port, far port / tun header
+        self.t_last = now
+        self.h_nxt = None; self.h_ws = -1; self.h_ts = None   # host side: next seq, options, last TSval
+        self.r_syn = False; self.r_ws = -1; self.r_ts = None  # far end: SYN seen, options, last TSval
+        self.r_seq = 0                # far end's next seq as the host has ACKed it (our ACKs' seq)
+        self.r_una = 0; self.r_wnd = 0; self.r_dup = 0
+        self.shift = 0; self.ts_ok = False
+        self.tmpl = None; self.ip_id = 0
+        self.buf = []                 # [seq, end, pkt, t accepted, re-sent] in sequence order
+        self.nbuf = 0; self.fin = False; self.adv = 0
+        self.mss = 0; self.cwnd = 0; self.ssthresh = 0    # window offered to the host, AIMD on our re-sends
+        self.rto = 0.0; self.t_prog = now; self.tries = 0; self.recover = None
+
+
+class TcpPep:
+    """to_host(pkt) hands a packet to the host; to_peer(pkt) queues one for the air."""
+
+    def __init__(self, to_host, to_peer, flows=4, buf_bytes=4096, rto_s=10.0, rto_max=120.0,
+                 max_tries=5, idle_s=300.0):
+        self.to_host = to_host; self.to_peer = to_peer
+        self.max_flows = flows; self.buf_max = buf_bytes
+        self.rto_min = rto_s; self.rto_max = rto_max; self.max_tries = max_tries; self.idle_s = idle_s
+        self.flows = {}
+        self.srtt = 0.0
+        self.n_flows = 0; self.n_ack = 0; self.n_sup = 0; self.n_retx = 0
+        self.n_drop = 0; self.n_abort = 0; self.n_untracked = 0
+
+    def buffered(self):
+        n = 0
+        for f in self.flows.values(): n += f.nbuf
+        return n
+
+    def busy(self):
+        """True while some flow holds data the far end hasn't ACKed (its timers are running)."""
+        for f in self.flows.values():
+            if f.buf: return True
+        return False
+
+    # ---- host -> air ----
+    def from_host(self, pkt, now):
+        """A packet from the host; False if the proxy consumed it and it must not be queued."""
+        proto, tot, ihl, off = ip_peek(pkt)
+        if proto != 6: return True
+        flags, doff, dlen = tcp_peek(pkt, off, ihl)
+        if flags is None: return True
+        t = off + ihl
+        key = bytes(pkt[off + 12:off + 20]) + bytes(pkt[t:t + 4])
+        f = self.flows.get(key)
+        if flags & _SYN:
+            if not flags & _ACK:                       # host opens: (re)start tracking
+                if f is None and len(self.flows) >= self.max_flows:
+                    self._expire(now)
+                    if len(self.flows) >= self.max_flows:
+                        self.n_untracked += 1; return True
+                f = self.flows[key] = _Flow(key, now); self.n_flows += 1
+            elif f is None: return True
+            f.h_nxt = f.r_una = (_u32(pkt, t + 4) + 1) & _M32
+            f.h_ws, f.h_ts = _opts(pkt, t, doff)
+            f.hdr = bytes(pkt[:off])
+            return True
+        if f is None: return True
+        f.t_last = now
+        if flags & _RST:
+            del self.flows[key]; return True
+        if flags & _ACK: f.r_seq = _u32(pkt, t + 8)
+        if f.ts_ok or f.tmpl is None:
+            tsv = _opts(pkt, t, doff)[1]
+            if tsv is not None: f.h_ts = tsv
+        if not dlen and not flags & _FIN: return True
+        if f.tmpl is None:
+            if f.h_nxt is None or not f.r_syn: return True
+            self._establish(f)
+        seq = _u32(pkt, t + 4)
+        end = (seq + dlen + (flags & _FIN)) & _M32
+        if f.fin or not _after(end, f.h_nxt):          # already ACKed (or after our FIN)
+            self._ack(f); return False
+        if seq != f.h_nxt or dlen > self.buf_max - f.nbuf:
+            self.n_drop += 1; self._ack(f); return False    # behind a gap / past the buffer
+        if dlen > f.mss:
+            f.mss = dlen
+            if not f.cwnd: f.cwnd = min(2 * dlen, self.buf_max); f.ssthresh = self.buf_max
+        if not f.buf: f.t_prog = now
+        f.buf.append([seq, end, pkt, now, False]); f.nbuf += (end - seq) & _M32
+        f.h_nxt = end
+        if flags & _FIN: f.fin = True
+        self._ack(f)
+        return True
+
+    # ---- air -> host ----
+    def from_peer(self, pkt, now):
+        """A packet from the far end; False if it is an ACK the proxy has already given the host."""
+        proto, tot, ihl, off = ip_peek(pkt)
+        if proto != 6: return True
+        flags, doff, dlen = tcp_peek(pkt, off, ihl)
+        if flags is None: return True
+        t = off + ihl
+        key = bytes(pkt[off + 16:off + 20]) + bytes(pkt[off + 12:off + 16]) + bytes(pkt[t + 2:t + 4]) + bytes(pkt[t:t + 2])
+        f = self.flows.get(key)
+        if flags & _SYN:
+            if not flags & _ACK:                       # far end opens toward the host
+                if f is None and len(self.flows) >= self.max_flows:
+                    self._expire(now)
+                    if len(self.flows) >= self.max_flows:
+                        self.n_untracked += 1; return True
+                f = self.flows[key] = _Flow(key, now); self.n_flows += 1
+            elif f is None: return True
+            f.r_syn = True
+            f.r_ws, f.r_ts = _opts(pkt, t, doff)
+            f.r_seq = (_u32(pkt, t + 4) + 1) & _M32
+            f.r_wnd = _u16(pkt, t + 14)             # never scaled on a SYN
+            return True
+        if f is None: return True
+        f.t_last = now
+        if flags & _RST:
+            del self.flows[key]; return True
+        if f.tmpl is None: return True
+        if f.ts_ok:
+            tsv = _opts(pkt, t, doff)[1]
+            if tsv is not None and (f.r_ts is None or not _after(f.r_ts, tsv)): f.r_ts = tsv
+        if not flags & _ACK: return True
+        ack = _u32(pkt, t + 8); wnd = _u16(pkt, t + 14) << f.shift
+        if _after(ack, f.r_una):
+            self._acked(f, ack, now)
+        elif ack == f.r_una and f.buf and not dlen and not flags & _FIN and wnd == f.r_wnd:
+            f.r_dup += 1
+            if f.r_dup == 3: self._resend(f, now)
+        f.r_wnd = wnd
+        if not f.fin and self._room(f) >= f.adv + max(f.mss, 1):
+            self._ack(f)                               # window update, a segment or more at a time
+        if not f.buf and f.fin:
+            del self.flows[key]                        # our FIN is through: nothing left to do
+        if dlen or flags & _FIN or _after(ack, f.h_nxt): return True
+        self.n_sup += 1
+        return False
+
+    def _acked(self, f, ack, now):
+        f.r_una = ack; f.r_dup = 0; f.tries = 0; f.t_prog = now
+        last = None; n = f.nbuf
+        while f.buf and not _after(f.buf[0][1], ack):
+            e = f.buf.pop(0); f.nbuf -= (e[1] - e[0]) & _M32
+            last = e
+        if f.buf and f.buf[0][0] != ack and _after(ack, f.buf[0][0]):
+            # partial segment ACKed: keep the rest, counted from the new edge
+            e = f.buf[0]; f.nbuf -= (ack - e[0]) & _M32; e[0] = ack
+        n -= f.nbuf
+        if f.recover is None and f.cwnd:
+            f.cwnd += n if f.cwnd < f.ssthresh else max(1, f.mss * n // f.cwnd)
+            if f.cwnd > self.buf_max: f.cwnd = self.buf_max
+        if last and not last[4]:
+            s = now - last[3]
+            self.srtt = s if not self.srtt else self.srtt + (s - self.srtt) / 8
+        f.rto = 0.0
+        if f.recover is not None:
+            if f.buf and _after(f.recover, ack): self._resend(f, now)   # partial ACK: next hole
+            else: f.recover = None
+
+    def _room(self, f):
+        """Bytes the host may still send: what our window leaves of the buffer, within the far end's."""
+        w = (f.cwnd or self.buf_max) - f.nbuf
+        r = (f.r_una + f.r_wnd - f.h_nxt) & _M32
+        if r >= 0x80000000: r = 0
+        return max(0, min(w, r))
+
+    # ---- timers ----
+    def tick(self, now):
+        """Re-send what the far end hasn't ACKed in time; drop idle flows."""
+        for f in list(self.flows.values()):
+            if f.buf and now - f.t_prog >= self._rto(f):
+                if f.tries >= self.max_tries: self._abort(f)
+                else:
+                    f.rto = min(self._rto(f) * 2, self.rto_max); f.recover = None
+                    self._resend(f, now)
+        self._expire(now)
+
+    def _rto(self, f):
+        return f.rto or max(self.rto_min, min(2 * self.srtt, self.rto_max))
+
+    def _expire(self, now):
+        for k in [k for k, f in self.flows.items() if now - f.t_last >= self.idle_s]:
+            del self.flows[k]
+
+    def _resend(self, f, now):
+        e = f.buf[0]; e[4] = True
+        f.tries += 1; f.t_prog = now
+        if f.recover is None:                          # a loss: halve what the host may keep queued
+            f.recover = f.h_nxt
+            f.ssthresh = f.cwnd = max(2 * f.mss, f.nbuf // 2)
+        self.n_retx += 1
+        self.to_peer(e[2])
+
+    def _abort(self, f):
+        self.n_abort += 1
+        self.to_host(self._seg(f, f.r_seq, f.h_nxt, _RST | _ACK, 0))
+        self.to_peer(self._seg(f, f.r_una, f.r_seq, _RST | _ACK, 0, True))
+        self.flows.pop(f.key, None)
+
+    # ---- segments we make up ----
+    def _establish(self, f):
+        """Both SYNs seen: settle the options and build the template of our ACKs to the host."""
+        f.shift = f.r_ws if f.h_ws >= 0 and f.r_ws >= 0 else 0
+        f.ts_ok = f.h_ts is not None and f.r_ts is not None
+        o = len(f.hdr); ipl = 20 + (32 if f.ts_ok else 20)
+        b = bytearray(o + ipl); b[:o] = f.hdr
+        k = f.key     # host addr, far addr, host port, far port
+        b[o] = 0x45; _put16(b, o + 2, ipl); b[o + 6] = 0x40; b[o + 8] = 64; b[o + 9] = 6
+        b[o + 12:o + 16] = k[4:8]; b[o + 16:o + 20] = k[0:4]
+        t = o + 20
+        b[t:t + 2] = k[10:12]; b[t + 2:t + 4] = k[8:10]
+        b[t + 12] = (ipl - 20) << 2
+        if f.ts_ok: b[t + 20:t + 24] = b"\x01\x01\x08\x0a"
+        f.tmpl = b
+
+    def _seg(self, f, seq, ack, flags, wnd, to_peer=False):
+        b = f.tmpl
+        if to_peer:
+            b = bytearray(b); o = len(f.hdr); t = o + 20
+            b[o + 12:o + 16], b[o + 16:o + 20] = b[o + 16:o + 20], b[o + 12:o + 16]
+            b[t:t + 2], b[t + 2:t + 4] = b[t + 2:t + 4], b[t:t + 2]
+        o = len(f.hdr); t = o + 20
+        f.ip_id = (f.ip_id + 1) & 0xFFFF
+        _put16(b, o + 4, f.ip_id); _put16(b, o + 10, 0); _put16(b, o + 10, _csum(b, o, t))
+        _put32(b, t + 4, seq); _put32(b, t + 8, ack); b[t + 13] = flags
+        _put16(b, t + 14, min(wnd >> f.shift, 0xFFFF)); _put16(b, t + 16, 0)
+        if f.ts_ok:
+            _put32(b, t + 24, (f.h_ts if to_peer else f.r_ts) or 0)
+            _put32(b, t + 28, (f.r_ts if to_peer else f.h_ts) or 0)
+        n = len(b) - t
+        s = _csum(b, o + 12, o + 20, 6 + n) ^ 0xFFFF           # pseudo header, not yet folded
+        _put16(b, t + 16, _csum(b, t, len(b), s))
+        return bytes(b)
+
+    def _ack(self, f):
+        f.adv = self._room(f)
+        self.n_ack += 1
+        self.to_host(self._seg(f, f.r_seq, f.h_nxt, _ACK, f.adv))
@@ -0,0 +1,82 @@
+# pkt_peek.py — cheap IPv4/TCP header peeks shared by the bridges and lib/ modules
+# Packets may carry a 4-byte tun header (00 00 08 00 / 00 00 86 DD); every
+# helper returns or accepts the offset of the IP header inside pkt.
+
+def ip_header_peek(pkt):
+    off=0
+    if len(pkt)>=4 and pkt[0:2]==b"\x00\x00" and pkt[2:4] in (b"\x08\x00", b"\x86\xDD"): off=4
+    if len(pkt)<off+20: return "short", off
+    vihl=pkt[off]; v=(vihl>>4)&0xF; ihl=(vihl&0xF)*4
+    tot=(pkt[off+2]<<8)|pkt[off+3]; proto=pkt[off+9]
+    src=".".join(str(b) for b in pkt[off+12:off+16])
+    dst=".".join(str(b) for b in pkt[off+16:off+20])
+    return "v%d ihl=%d tot=%d proto=%d %s->%s"%(v,ihl,tot,proto,src,dst), off
+def ip_dst_addr(pkt):
+    info, off = ip_header_peek(pkt)
+    if info.startswith("short"): return ""
+    return ".".join(str(b) for b in pkt[off+16:off+20])
+def ip_peek(pkt):
+    off=0
+    if len(pkt)>=4 and pkt[0:2]==b"\x00\x00" and pkt[2:4] in (b"\x08\x00", b"\x86\xDD"): off=4
+    if len(pkt)<off+20: return None,0,0,off
+    vihl=pkt[off]; ihl=(vihl&0x0F)*4; tot=(pkt[off+2]<<8)|pkt[off+3]; proto=pkt[off+9]
+    return proto, tot, ihl, off
+def tcp_peek(pkt, off, ihl):
+    if len(pkt) < off+ihl+20: return None,None,None
+    doff=((pkt[off+ihl+12]>>4)&0xF)*4
+    if len(pkt) < off+ihl+doff: return None,None,None
+    flags=pkt[off+ihl+13]; tot=(pkt[off+2]<<8)|pkt[off+3]
+    data_len=tot - ihl - doff
+    if data_len<0: data_len=0
+    return flags, doff, data_len
+def flow_hash(pkt):
+    """FNV-1a over addresses, protocol and ports (ICMP: echo id); 0 if not IP."""
+    proto, tot, ihl, off = ip_peek(pkt)
+    if proto is None: return 0
+    t=off+ihl
+    if proto in (6, 17): a, b = t, t+4
+    elif proto == 1: a, b = t+4, t+6
+    else: a = b = t
+    if len(pkt) < b: a = b = t
+    h=(2166136261 ^ proto) * 16777619 & 0xFFFFFFFF
+    for i in range(off+12, off+20): h=(h ^ pkt[i]) * 16777619 & 0xFFFFFFFF
+    for i in range(a, b): h=(h ^ pkt[i]) * 16777619 & 0xFFFFFFFF
+    return h
+def is_pure_tcp_ack(pkt):
+    proto, tot, ihl, off = ip_peek(pkt)
+    if proto != 6: return False
+    flags, doff, data_len = tcp_peek(pkt, off, ihl)
+    if flags is None: return False
+    return (flags & 0x10) and (data_len == 0)
+
+def tcp_ack_key(pkt):
+    """(flow, ack) for a plain ACK a later cumulative ACK may replace, else None.
+    Anything with SYN/FIN/RST/PSH/ECN flags, a payload or SACK blocks returns None."""
+    proto, tot, ihl, off = ip_peek(pkt)
+    if proto != 6: return None
+    flags, doff, data_len = tcp_peek(pkt, off, ihl)
+    if flags != 0x10 or data_len: return None
+    t=off+ihl; i=t+20; end=t+doff
+    while i<end:
+        k=pkt[i]
+        if k==0: break
+        if k==1: i+=1; continue
+        if k==5 or i+1>=end: return None
+        if pkt[i+1]<2: break
+        i+=pkt[i+1]
+    ack=(pkt[t+8]<<24)|(pkt[t+9]<<16)|(pkt[t+10]<<8)|pkt[t+11]
+    return bytes(pkt[off+12:off+20])+bytes(pkt[t:t+4]), ack
+def superseded_ack(q, key):
+    """Position in ring q (pktqueue.Ring) of the queued ACK that the ACK with
+    this key makes redundant, or -1. Only the flow's newest queued ACK is
+    considered, and never one that repeats the ACK before it: duplicate ACKs
+    all go out so the sender's fast retransmit still works."""
+    flow, ack = key; j=-1; last=0
+    for i in range(len(q)-1, -1, -1):
+        k=tcp_ack_key(q.pkt_at(i))
+        if k is None or k[0]!=flow: continue
+        if j<0: j=i; last=k[1]; continue
+        if k[1]==last: return -1
+        break
+    if j<0 or not 0<((ack-last)&0xFFFFFFFF)<0x80000000: return -1
+    return j
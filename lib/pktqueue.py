@@ -0,0 +1,233 @@
+# pktqueue.py — fixed-capacity ring buffers for the TX priority queues
+#
+# Every slot is allocated once at startup; push/pop/drop are O(1) and never
+# resize anything. Items are (dest_addr, payload, raw_len) with the payload
+# kept exactly as it came from the host — compression and the ASCII codec
+# run only when a frame is actually handed to the radio. Each slot also
+# remembers when it was pushed; pop() leaves that in last_t. A queue's
+# limit can be lowered below its capacity while running: packets already
+# queued stay, new ones are refused (or displace others) until it drains.
+
+import math
+
+ACK, DATA, LO = 0, 1, 2
+
+
+class Ring:
+    def __init__(self, cap):
+        self.cap = cap; self.limit = cap
+        self.dest = [0] * cap
+        self.pkt = [None] * cap
+        self.raw = [0] * cap
+        self.t = [0.0] * cap
+        self.last_t = 0.0
+        self.head = 0
+        self.n = 0
+        self.n_drop = 0
+
+    def __len__(self):
+        return self.n
+
+    def full(self):
+        return self.n >= self.limit
+
+    def set_limit(self, n):
+        """Hold at most n items (1..cap); returns the limit in force."""
+        self.limit = max(1, min(n, self.cap))
+        return self.limit
+
+    def push(self, dest, pkt, raw_len, t=0.0):
+        """Append at the tail; False (and nothing stored) when full."""
+        if self.n >= self.limit:
+            return False
+        i = self.head + self.n
+        if i >= self.cap: i -= self.cap
+        self.dest[i] = dest; self.pkt[i] = pkt; self.raw[i] = raw_len; self.t[i] = t
+        self.n += 1
+        return True
+
+    def pop(self):
+        """Remove and return the oldest item as (dest, pkt, raw_len), or None."""
+        if not self.n:
+            return None
+        i = self.head
+        item = (self.dest[i], self.pkt[i], self.raw[i])
+        self.last_t = self.t[i]
+        self.pkt[i] = None
+        self.head = i + 1 if i + 1 < self.cap else 0
+        self.n -= 1
+        return item
+
+    def drop_oldest(self):
+        if self.pop() is not None:
+            self.n_drop += 1
+
+    def _slot(self, k):
+        i = self.head + k
+        return i - self.cap if i >= self.cap else i
+
+    def pkt_at(self, k):
+        """Payload of the k-th oldest item (0 = next to pop)."""
+        return self.pkt[self._slot(k)]
+
+    def put_at(self, k, dest, pkt, raw_len):
+        """Overwrite the k-th oldest item in place (it keeps its push time)."""
+        i = self._slot(k)
+        self.dest[i] = dest; self.pkt[i] = pkt; self.raw[i] = raw_len
+
+
+class PrioQueue:
+    """Strict-priority set of rings: ACK > DATA > LO."""
+
+    def __init__(self, ack_max=12, data_max=16, lo_max=4):
+        self.tiers = (Ring(ack_max), Ring(data_max), Ring(lo_max))
+        self.ack, self.data, self.lo = self.tiers
+
+    def __len__(self):
+        return self.ack.n + self.data.n + self.lo.n
+
+    def push(self, tier, dest, pkt, raw_len, t=0.0):
+        return self.tiers[tier].push(dest, pkt, raw_len, t)
+
+    def pop(self, first=ACK):
+        """Pop from the highest-priority non-empty tier at or below `first`."""
+        for t in range(first, 3):
+            if self.tiers[t].n:
+                return self.tiers[t].pop()
+        return None
+
+
+class FlowQueue:
+    """Flow-fair tier in the style of FQ-CoDel (RFC 8290).
+
+    Packets are spread over `buckets` flow queues by a flow hash supplied by
+    the caller and served deficit round robin, `quantum` bytes per turn; a
+    flow that was idle goes to the front (new flows) for its first quantum,
+    so a keystroke or a ping doesn't wait behind a bulk transfer. Each flow
+    runs CoDel on its sojourn time: once packets have waited longer than
+    target_s for a whole interval_s, the head is dropped, then at
+    interval_s / sqrt(n) spacing until the queue drains below target.
+    When all cap slots are in use, the head of the longest flow is dropped
+    to make room; under a lowered limit, new packets are refused instead,
+    as Ring does, so nothing already queued is lost.
+    All slots live in one preallocated pool linked per flow.
+    """
+
+    def __init__(self, cap=20, buckets=16, quantum=256, target_s=2.0, interval_s=10.0):
+        self.cap = cap; self.limit = cap; self.nb = buckets; self.quantum = quantum
+        self.target = target_s; self.interval = interval_s
+        self.dest = [0] * cap; self.pkt = [None] * cap; self.raw = [0] * cap
+        self.t = [0.0] * cap; self.tier = [DATA] * cap
+        self.nxt = list(range(1, cap)) + [-1]; self.free = 0
+        self.head = [-1] * buckets; self.tail = [-1] * buckets; self.qlen = [0] * buckets
+        self.deficit = [0] * buckets
+        self.state = [0] * buckets          # 0 idle, 1 in new_flows, 2 in old_flows
+        self.new_flows = []; self.old_flows = []
+        # CoDel, per flow
+        self.first_above = [0.0] * buckets; self.dropping = [False] * buckets
+        self.drop_next = [0.0] * buckets; self.count = [0] * buckets; self.lastcount = [0] * buckets
+        self.n = 0; self.last_t = 0.0; self.last_tier = DATA
+        self.n_overflow = 0; self.n_codel = 0
+
+    def __len__(self):
+        return self.n
+
+    def flows(self):
+        return len(self.new_flows) + len(self.old_flows)
+
+    def set_limit(self, n):
+        """Hold at most n packets (1..cap); returns the limit in force."""
+        self.limit = max(1, min(n, self.cap))
+        return self.limit
+
+    def push(self, flow, dest, pkt, raw_len, t=0.0, tier=DATA):
+        """Queue one packet; False if it was refused or another was dropped to make room."""
+        ok = True
+        if self.free < 0:
+            self.drop_oldest(); ok = False
+        elif self.n >= self.limit:
+            return False
+        i = self.free; self.free = self.nxt[i]; self.nxt[i] = -1
+        self.dest[i] = dest; self.pkt[i] = pkt; self.raw[i] = raw_len; self.t[i] = t; self.tier[i] = tier
+        b = flow % self.nb
+        if self.tail[b] < 0: self.head[b] = i
+        else: self.nxt[self.tail[b]] = i
+        self.tail[b] = i; self.qlen[b] += 1; self.n += 1
+        if not self.state[b]:
+            self.state[b] = 1; self.deficit[b] = self.quantum; self.new_flows.append(b)
+        return ok
+
+    def _take(self, b):
+        i = self.head[b]
+        self.head[b] = self.nxt[i]
+        if self.head[b] < 0: self.tail[b] = -1
+        item = (self.dest[i], self.pkt[i], self.raw[i])
+        self.last_t = self.t[i]; self.last_tier = self.tier[i]
+        self.pkt[i] = None; self.nxt[i] = self.free; self.free = i
+        self.qlen[b] -= 1; self.n -= 1
+        return item
+
+    def drop_oldest(self):
+        """Drop the head of the longest flow."""
+        b = 0
+        for j in range(1, self.nb):
+            if self.qlen[j] > self.qlen[b]: b = j
+        if self.qlen[b]:
+            self._take(b); self.n_overflow += 1
+
+    def _dq(self, b, now):
+        """Head of flow b and whether CoDel wants it dropped; (None, False) if empty."""
+        if self.head[b] < 0:
+            self.first_above[b] = 0.0; return None, False
+        sojourn = now - self.t[self.head[b]]
+        item = self._take(b)
+        if sojourn < self.target or not self.qlen[b]:     # never drop a flow's last packet
+            self.first_above[b] = 0.0; return item, False
+        if not self.first_above[b]:
+            self.first_above[b] = now + self.interval; return item, False
+        return item, now >= self.first_above[b]
+
+    def _codel(self, b, now):
+        item, drop = self._dq(b, now)
+        if item is None:
+            self.dropping[b] = False; return None
+        if self.dropping[b]:
+            if not drop:
+                self.dropping[b] = False
+            while self.dropping[b] and now >= self.drop_next[b]:
+                self.n_codel += 1; self.count[b] += 1
+                item, drop = self._dq(b, now)
+                if item is None or not drop: self.dropping[b] = False
+                else: self.drop_next[b] += self.interval / math.sqrt(self.count[b])
+        elif drop:
+            self.n_codel += 1
+            item, drop = self._dq(b, now)
+            self.dropping[b] = True
+            c = self.count[b] - self.lastcount[b]
+            c = c if c > 1 and now - self.drop_next[b] < 16 * self.interval else 1
+            self.count[b] = c; self.lastcount[b] = c
+            self.drop_next[b] = now + self.interval / math.sqrt(c)
+        return item
+
+    def pop(self, now):
+        """Next packet as (dest, pkt, raw_len), or None; last_t / last_tier describe it."""
+        while True:
+            fl = self.new_flows if self.new_flows else self.old_flows
+            if not fl:
+                return None
+            b = fl[0]
+            if self.deficit[b] <= 0:
+                self.deficit[b] += self.quantum
+                fl.pop(0); self.old_flows.append(b); self.state[b] = 2
+                continue
+            item = self._codel(b, now)
+            if item is None:
+                fl.pop(0)
+                if self.state[b] == 1 and self.old_flows:
+                    self.old_flows.append(b); self.state[b] = 2   # keeps a flow from gaming new_flows
+                else:
+                    self.state[b] = 0
+                continue
+            self.deficit[b] -= item[2]
+            return item
+
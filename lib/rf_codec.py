@@ -0,0 +1,226 @@
+# rf_codec.py — printable binary<->ASCII codecs for RYLR998 AT+SEND payloads
+#
+# Every RF frame is "<prefix><encoded bytes>". The prefix names the codec so
+# the receiver can decode any of them regardless of what the sender uses:
+#   "B:"  base64  (4 chars / 3 bytes, +33%)
+#   "Z:"  basE91  (~16 bits / 13 bits, +23% worst case)
+# The basE91 alphabet swaps ',' for '-' so that payloads never contain the
+# AT field separator used in "+RCV=<addr>,<len>,<data>,<rssi>,<snr>".
+# base64 goes through the port's native binascii where it exists; the
+# pure-Python code below is the fallback and the reference.
+
+try:
+    from binascii import b2a_base64, a2b_base64
+except ImportError:
+    b2a_base64 = a2b_base64 = None
+
+# Decoders write into one scratch buffer and return a single exact-size
+# copy; encode_into() writes a whole frame into the caller's buffer.
+_SCR = bytearray(256)
+
+def _scratch(n):
+    # decoded output is never longer than its input
+    return _SCR if n <= len(_SCR) else bytearray(n)
+
+# ========= base64 =========
+B64_PREFIX = "B:"
+_ALPH = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_DEC64 = bytearray(b"\xff" * 256)
+for _i, _c in enumerate(_ALPH): _DEC64[ord(_c)] = _i
+
+def b64encode(data):
+    if b2a_base64:
+        s=b2a_base64(data)
+        return str(s[:-1] if s[-1:]==b"\n" else s, "ascii")
+    return _b64encode_py(data)
+
+def _b64_into(data, out, j):
+    if b2a_base64:
+        e=b2a_base64(data); k=len(e)
+        if e[k-1:]==b"\n": k-=1
+        out[j:j+k]=memoryview(e)[:k]
+        return j+k
+    e=_b64encode_py(data).encode(); out[j:j+len(e)]=e
+    return j+len(e)
+
+def b64decode(s):
+    if a2b_base64:
+        try: return bytes(a2b_base64(s))
+        except (ValueError, TypeError): pass   # bad padding / junk: the slow path skips it
+    return _b64decode_py(s)
+
+def _b64encode_py(data):
+    out=[]; n=len(data); i=0
+    while i<n:
+        rem=n-i
+        if rem>=3: b0,b1,b2=data[i],data[i+1],data[i+2]; i+=3; pad=0
+        elif rem==2: b0,b1,b2=data[i],data[i+1],0; i+=2; pad=1
+        else: b0,b1,b2=data[i],0,0; i+=1; pad=2
+        triple=(b0<<16)|(b1<<8)|b2
+        out.append(_ALPH[(triple>>18)&0x3F]); out.append(_ALPH[(triple>>12)&0x3F])
+        out.append(_ALPH[(triple>>6)&0x3F] if pad<2 else '=')
+        out.append(_ALPH[triple&0x3F]      if pad<1 else '=')
+    return "".join(out)
+
+def _b64decode_py(s):
+    # str or any bytes-like (e.g. a memoryview straight from the driver);
+    # '=' padding, whitespace and stray characters are skipped
+    if isinstance(s, str): s=s.encode()
+    out=_scratch(len(s)); o=0; acc=0; nbits=0
+    for ch in s:
+        d=_DEC64[ch]
+        if d>63: continue
+        acc=((acc<<6)|d)&0xFFF; nbits+=6
+        if nbits>=8:
+            nbits-=8; out[o]=(acc>>nbits)&0xFF; o+=1
+    return bytes(memoryview(out)[:o])
+
+def b64_raw_limit(max_chars):
+    # output comes in padded 4-char groups of 3 bytes
+    return (max_chars // 4) * 3
+
+# ========= basE91 =========
+B91_PREFIX = "Z:"
+_ALPH91 = ("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+           "!#$%&()*+-./:;<=>?@[]^_`{|}~\"")
+_ENC91  = _ALPH91.encode()
+_DEC91  = bytearray(b"\xff" * 256)
+for _i, _c in enumerate(_ALPH91): _DEC91[ord(_c)] = _i
+
+def b91encode(data):
+    # the list-of-chars loop is the quickest way to a str; _b91_into() is
+    # the allocation-free one that encode_into() uses on the TX path
+    out=[]; acc=0; nbits=0
+    for byte in data:
+        acc|=byte<<nbits; nbits+=8
+        if nbits>13:
+            v=acc&8191
+            if v>88: acc>>=13; nbits-=13
+            else: v=acc&16383; acc>>=14; nbits-=14
+            out.append(_ALPH91[v%91]); out.append(_ALPH91[v//91])
+    if nbits:
+        out.append(_ALPH91[acc%91])
+        if nbits>7 or acc>90: out.append(_ALPH91[acc//91])
+    return "".join(out)
+
+def b91_size(n):
+    # worst case: 2 chars per 13 bits, plus the tail
+    return (n*16)//13+2
+
+def _b91_into(data, out, j):
+    acc=0; nbits=0; enc=_ENC91
+    for byte in data:
+        acc|=byte<<nbits; nbits+=8
+        if nbits>13:
+            v=acc&8191
+            if v>88: acc>>=13; nbits-=13
+            else: v=acc&16383; acc>>=14; nbits-=14
+            out[j]=enc[v%91]; out[j+1]=enc[v//91]; j+=2
+    if nbits:
+        out[j]=enc[acc%91]; j+=1
+        if nbits>7 or acc>90: out[j]=enc[acc//91]; j+=1
+    return j
+
+def b91decode(s):
+    if isinstance(s, str): s=s.encode()
+    out=_scratch(len(s)); o=0; acc=0; nbits=0; v=-1
+    for ch in s:
+        d=_DEC91[ch]
+        if d>90: continue
+        if v<0: v=d; continue
+        v+=d*91; acc|=v<<nbits
+        nbits+=13 if (v&8191)>88 else 14
+        while nbits>7:
+            out[o]=acc&0xFF; o+=1; acc>>=8; nbits-=8
+        v=-1
+    if v>=0: out[o]=(acc|v<<nbits)&0xFF; o+=1
+    return bytes(memoryview(out)[:o])
+
+def b91_raw_limit(max_chars):
+    # every 2 output chars carry at least 13 input bits
+    return ((max_chars // 2) * 13) // 8
+
+# ========= codec registry =========
+class Codec:
+    def __init__(self, name, prefix, enc, dec, raw_limit, enc_into):
+        self.name = name
+        self.prefix = prefix
+        self._pb = prefix.encode()
+        self._enc = enc
+        self._dec = dec
+        self._raw_limit = raw_limit
+        self._enc_into = enc_into
+
+    def encode(self, payload):
+        """bytes -> full ASCII RF frame including prefix."""
+        return self.prefix + self._enc(payload)
+
+    def encode_into(self, payload, out):
+        """encode() into the bytearray out (at least max_ascii long); returns the length."""
+        p = self._pb; out[0] = p[0]; out[1] = p[1]
+        return self._enc_into(payload, out, 2)
+
+    def decode(self, frame):
+        """Full ASCII RF frame (prefix included, str or bytes-like) -> bytes."""
+        return self._dec(frame[len(self.prefix):])
+
+    def raw_limit(self, max_ascii):
+        """Largest payload whose encoded frame fits in max_ascii chars."""
+        return self._raw_limit(max_ascii - len(self.prefix))
+
+CODECS = {
+    "b64": Codec("b64", B64_PREFIX, b64encode, b64decode, b64_raw_limit, _b64_into),
+    "b91": Codec("b91", B91_PREFIX, b91encode, b91decode, b91_raw_limit, _b91_into),
+}
+
+def codec_for(frame):
+    """Return the Codec whose prefix starts this frame (str or bytes-like), or None."""
+    if len(frame) < 2:
+        return None
+    text = isinstance(frame, str)
+    for c in CODECS.values():
+        p = c.prefix if text else c._pb
+        if frame[0] == p[0] and frame[1] == p[1]:
+            return c
+    return None
+
+# ========= link-layer frame types =========
+# The first decoded byte tells raw packets (0x00 tun header, 0x4_ IPv4,
+# 0x6_ IPv6) apart from link-layer frames, which all use 0x80-0xFF.
+T_HC_FULL = 0x81   # hdrcomp: full TCP/IP packet, (re)seeds a context
+T_HC_COMP = 0x82   # hdrcomp: delta-compressed TCP/IP header + payload
+T_BUNDLE  = 0x83   # aggregation: [type]([len][frame])* in one AT+SEND
+T_FRAG    = 0x84   # frag: one piece of a frame too long for a single AT+SEND
+T_ARQ     = 0x85   # arq: sequenced frame with a piggybacked selective ACK
+T_ARQ_ACK = 0x86   # arq: standalone selective ACK
+T_FEC     = 0x87   # fec: frame belonging to a parity group
+T_FEC_P   = 0x88   # fec: parity over a group of T_FEC frames
+T_ADR     = 0x89   # adr: link quality report / profile switch request
+T_LZ      = 0x8A   # lzss: compressed frame
+T_LZ_D    = 0x8B   # lzss: compressed frame, preset dictionary
+T_BOND    = 0x8C   # bond: request / grant of the quiet band's airtime
+
+def is_link_frame(frame):
+    return len(frame) > 0 and frame[0] >= 0x80
+
+def bundle(frames):
+    """Pack several frames (each < 256 bytes) into one T_BUNDLE frame."""
+    out = bytearray((T_BUNDLE,))
+    for f in frames:
+        out.append(len(f)); out += f
+    return bytes(out)
+
+def bundle_size(n_frames, n_bytes):
+    return 1 + n_frames + n_bytes
+
+def unbundle(frame):
+    """Split a T_BUNDLE frame into its inner frames; anything else is returned as [frame]."""
+    if not frame or frame[0] != T_BUNDLE:
+        return [frame]
+    out = []; i = 1; n = len(frame)
+    while i < n:
+        L = frame[i]; i += 1
+        if L == 0 or i + L > n:
+            break
+        out.append(frame[i:i+L]); i += L
+    return out
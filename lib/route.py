@@ -0,0 +1,105 @@
+# route.py — peers, prefix routes and airtime sharing for a bridge with several remote ends
+#
+# A peer is one remote bridge: the address of its RX radio (AT+SEND target)
+# and the address its TX radio sends from (+RCV=<from>). The bridge hangs
+# its per-peer state (queues, ARQ, header compression) on the Peer; this
+# module keeps the link quality heard from each peer, maps IPv4
+# destinations to peers, and decides whose traffic goes on the air next.
+#
+# Routes are (prefix, plen, candidates) on packed 32-bit addresses, longest
+# prefix first, read straight out of the packet. A route may name several
+# peers that all reach the prefix: of those heard within the last dead_s
+# the best SNR wins, the first listed if none is.
+#
+# The scheduler is deficit round robin in seconds of airtime: a backlogged
+# peer is served while its deficit is positive and is charged the
+# time-on-air of every AT+SEND made for it, so a peer on a slow profile or
+# with long frames can't take more than its share of the TX radio.
+
+
+def ip4(s):
+    """'10.10.10.2' -> 0x0A0A0A02"""
+    v = 0
+    for x in s.split("."):
+        v = (v << 8) | int(x)
+    return v
+
+
+class Peer:
+    def __init__(self, idx, addr, src):
+        self.idx = idx; self.addr = addr; self.src = src
+        self.snr = 0.0; self.rssi = 0.0; self.last_rx = -1.0
+        self.deficit = 0.0
+        self.n_rx = 0; self.n_tx = 0; self.airtime = 0.0
+
+    def on_rx(self, snr, rssi, now):
+        """Link quality of one frame heard from this peer (EWMA, 1/8 weight)."""
+        if self.n_rx:
+            self.snr += (snr - self.snr) / 8; self.rssi += (rssi - self.rssi) / 8
+        else:
+            self.snr = snr; self.rssi = rssi
+        self.n_rx += 1; self.last_rx = now
+
+    def alive(self, now, dead_s):
+        return self.last_rx >= 0 and now - self.last_rx < dead_s
+
+
+class RouteTable:
+    """routes: ("a.b.c.d/len", peer index or tuple of indices) pairs; unmatched -> peers[0]."""
+
+    def __init__(self, peers, routes=(), dead_s=120.0):
+        self.peers = peers
+        self.dead_s = dead_s
+        r = []
+        for spec, cand in routes:
+            net, _, plen = spec.partition("/")
+            plen = int(plen) if plen else 32
+            mask = (0xFFFFFFFF << (32 - plen)) & 0xFFFFFFFF
+            if isinstance(cand, int): cand = (cand,)
+            r.append((plen, ip4(net) & mask, mask, tuple(peers[i] for i in cand)))
+        r.sort(key=lambda e: -e[0])
+        self.nets = [e[1] for e in r]; self.masks = [e[2] for e in r]; self.cands = [e[3] for e in r]
+        self.by_src = {}; self.by_addr = {}
+        for p in peers: self.by_src[p.src] = p; self.by_addr[p.addr] = p
+
+    def lookup(self, pkt, off, now):
+        """Peer for the IPv4 packet whose header starts at pkt[off]."""
+        if len(pkt) < off + 20: return self.peers[0]
+        dst = (pkt[off + 16] << 24) | (pkt[off + 17] << 16) | (pkt[off + 18] << 8) | pkt[off + 19]
+        nets = self.nets; masks = self.masks
+        for i in range(len(nets)):
+            if dst & masks[i] == nets[i]:
+                c = self.cands[i]
+                return c[0] if len(c) == 1 else self._best(c, now)
+        return self.peers[0]
+
+    def _best(self, cands, now):
+        best = None
+        for p in cands:
+            if p.alive(now, self.dead_s) and (best is None or p.snr > best.snr): best = p
+        return best or cands[0]
+
+
+class AirtimeDrr:
+    """Deficit round robin over peers, quantum_s seconds of airtime per round."""
+
+    def __init__(self, peers, quantum_s=2.0):
+        self.peers = peers; self.quantum = quantum_s; self.i = 0
+
+    def pick(self, busy):
+        """Next peer to serve among those for which busy(peer) is true, or None."""
+        n = len(self.peers)
+        if n == 1: return self.peers[0] if busy(self.peers[0]) else None
+        idle = 0
+        while idle < n:
+            p = self.peers[self.i]
+            if not busy(p):
+                if p.deficit > 0: p.deficit = 0.0
+                idle += 1; self.i = (self.i + 1) % n; continue
+            idle = 0
+            if p.deficit > 0: return p
+            p.deficit += self.quantum; self.i = (self.i + 1) % n
+        return None
+
+    def charge(self, peer, airtime_s):
+        peer.deficit -= airtime_s; peer.airtime += airtime_s; peer.n_tx += 1
@@ -1,11 +1,38 @@
 # rylr998_cp.py — RYLR998 minimal driver for CircuitPython
-import time, board, busio
+import time, math, board, busio
 from digitalio import DigitalInOut, Direction
 
+_BW_KHZ = {7: 125, 8: 250, 9: 500}   # AT+PARAMETER bandwidth codes
+_BW_CODE = {125: 7, 250: 8, 500: 9}
+
+def time_on_air(nbytes, sf, bw, cr, preamble):
+    """LoRa time-on-air in seconds (explicit header, CRC on); bw in kHz or as a 7/8/9 code."""
+    tsym = (1 << sf) / (_BW_KHZ.get(bw, bw) * 1000.0)
+    de = 1 if tsym > 0.016 else 0
+    n = math.ceil((8 * nbytes - 4 * sf + 44) / (4.0 * (sf - 2 * de)))
+    return (preamble + 4.25 + 8 + max(n, 0) * (cr + 4)) * tsym
+
+class RcvFrame:
+    """One +RCV=<from>,<len>,<data>,<rssi>,<snr>. `data` is a memoryview into
+    the driver's receive buffer: records are reused and the view goes stale
+    on the next call into the driver, so copy out anything you keep."""
+    def __init__(self):
+        self.frm = 0; self.len = 0; self.rssi = 0; self.snr = 0; self.data = None
+
+class AtCmd:
+    """One command queued with RYLR998.at(). It ends on +OK, on +ERR=<n>
+    (err = n), on the answer to a query ("AT+BAND?" -> "+BAND=...") or on
+    timeout; then done is set, ok tells which, and cb(self) runs. `lines`
+    holds what the module said in reply."""
+    def __init__(self, s, cb, timeout_s):
+        self.cmd = s.encode("ascii"); self.cb = cb; self.timeout_s = timeout_s
+        self.answer = "+" + s[3:-3] + "=" if s.endswith("?\r\n") else None
+        self.lines = []; self.done = False; self.ok = False; self.err = 0; self.deadline = 0.0
+
 class RYLR998:
     def __init__(self, uart=None, tx=board.GP0, rx=board.GP1,
                  baud=115200, rst_pin=None, read_timeout_s=1.2,
-                 line_limit=4096):
+                 line_limit=4096, rx_slots=8, tx_max=240):
         # Use provided UART or make one
         self.u = uart or busio.UART(
             tx, rx,
@@ -19,58 +46,167 @@ class RYLR998:
             self.rst.direction = Direction.OUTPUT
         self.read_timeout_s = read_timeout_s
         self.line_limit = line_limit
-        self._buf = bytearray()
+        self._rx = bytearray(line_limit)
+        self._mv = memoryview(self._rx)
+        self._n = 0; self._pos = 0; self._ls = 0; self._le = 0; self._p = 0
+        self.rx_slots = rx_slots
+        self._slots = [RcvFrame() for _ in range(rx_slots)]
+        self._out = []
+        self.rx_overruns = 0
+        # module defaults until set_params() is called
+        self.sf, self.bw, self.cr, self.preamble = 9, 7, 1, 12
+        # TX completion tracking (see tx_idle)
+        self.tx_busy = False
+        self.tx_trust_ok = True      # cleared if +OK turns out to precede the end of TX
+        self._tx_cmd = None; self._tx_len = 0
+        self._txbuf = bytearray(b"AT+SEND=" + bytes(tx_max + 14))   # + "<addr>,<len>," and CRLF
+        self._txmv = memoryview(self._txbuf)
+        self._tx_resend = 0           # 1: +ERR=17 seen, re-send pending; 2: re-sent
+        self._tx_deadline = 0.0; self._tx_done_t = 0.0
+        self._tx_wait = False         # AT+SEND held back until the command on the wire ends
+        self.tx_margin_s = 0.10
+        self.tx_ok = 0; self.tx_err = 0; self.tx_timeouts = 0; self.tx_airtime = 0.0; self.tx_last_toa = 0.0
+        # AT command pipeline (see at)
+        self._q = []; self._cur = None
+        self.at_timeouts = 0
+        self.err_codes = {}           # "+ERR=<n>" code -> count, AT+SEND and commands alike
+        self.cfg_result = []; self._cfg_i = 0   # see cfg_start
 
     # ---- low level helpers ----
-    def _read_nb(self):
+    # UART bytes land in one fixed bytearray via readinto(); lines are
+    # located in place and the consumed prefix is shifted out once per call
+    # rather than once per line.
+    def _compact(self):
+        p = self._pos
+        if p:
+            rem = self._n - p
+            if rem:
+                self._mv[0:rem] = self._mv[p:self._n]
+            self._n = rem; self._pos = 0
+
+    def _fill(self, first=None):
+        self._compact()
+        if first:                        # bytes an asyncio stream already took off the UART
+            k = len(first)
+            if self._n + k > len(self._rx):
+                self._n = 0; self.rx_overruns += 1
+            if k <= len(self._rx):
+                self._mv[self._n:self._n + k] = first; self._n += k
         n = self.u.in_waiting
-        if n:
-            chunk = self.u.read(n) or b""
-            if chunk:
-                self._buf += chunk
-                if len(self._buf) > self.line_limit:
-                    self._buf = self._buf[-self.line_limit:]
+        if not n:
+            return
+        if self._n >= len(self._rx):     # a full buffer without CRLF is garbage
+            self._n = 0; self.rx_overruns += 1
+        n = min(n, len(self._rx) - self._n)
+        got = self.u.readinto(self._mv[self._n:self._n + n])
+        if got:
+            self._n += got
 
-    def _pop_lines_nb(self):
-        """Return list of complete CRLF-terminated lines (nonblocking)."""
-        self._read_nb()
-        out = []
+    def _next_line(self):
+        """Advance to the next complete line: True with self._ls/_le set, or False."""
+        b = self._rx
         while True:
-            i = self._buf.find(b"\r\n")
+            i = b.find(b"\r\n", self._pos, self._n)
             if i < 0:
-                break
-            line = bytes(self._buf[:i])
-            self._buf = self._buf[i+2:]  # slice instead of del
-            if line:
-                try:
-                    out.append(line.decode("utf-8", "ignore"))
-                except Exception:
-                    pass
-        return out
+                return False
+            self._ls = self._pos; self._le = i; self._pos = i + 2
+            if i > self._ls:
+                return True
+
+    def _line(self):
+        """The current line as a str; the +OK that ends every AT+SEND is a constant."""
+        b = self._rx; s = self._ls
+        if self._le - s == 3 and b[s] == 0x2B and b[s+1] == 0x4F and b[s+2] == 0x4B:
+            return "+OK"
+        return bytes(self._mv[s:self._le]).decode("utf-8", "ignore")
 
-    def _readlines_block(self, timeout_s):
+    def _pop_lines_nb(self):
+        """Return list of complete CRLF-terminated lines (nonblocking)."""
+        self._fill()
         out = []
-        t0 = time.monotonic()
-        while (time.monotonic() - t0) < timeout_s:
-            got = self._pop_lines_nb()
-            if got:
-                out.extend(got)
-                if any(("OK" in ln) or ln.startswith("+ERR=") for ln in got):
-                    break
-            time.sleep(0.01)
+        while self._next_line():
+            try:
+                out.append(self._line())
+            except Exception:
+                pass
         return out
 
+    def _count_err(self, ln):
+        k = ln[5:]
+        self.err_codes[k] = self.err_codes.get(k, 0) + 1
+
     def cmd(self, s, need_ok=True, timeout_s=None):
+        """Blocking AT command for setup and tools; returns the reply lines.
+
+        Runs through the at() queue, so it waits for a pending AT+SEND or
+        command first. +RCV lines arriving meanwhile are lost: a running
+        bridge uses at().
+        """
         if not s.endswith("\r\n"):
             s = s + "\r\n"
-        self.u.write(s.encode("ascii"))
         if not need_ok:
+            self.u.write(s.encode("ascii"))
             return []
-        lines = self._readlines_block(timeout_s or self.read_timeout_s)
-        if not any(("OK" in ln) or ln.startswith("+ERR=") for ln in lines):
+        c = self.at(s, timeout_s=timeout_s)
+        while not c.done:
+            self._service()
+            if not c.done: time.sleep(0.002)
+        if not c.ok and not c.err:
             raise RuntimeError("AT failed: %s\n%s" %
-                               (s.strip(), "\n".join(lines)))
-        return lines
+                               (s.strip(), "\n".join(c.lines)))
+        return c.lines
+
+    # ---- nonblocking AT commands ----
+    # at() queues a command and returns its AtCmd. One command is on the wire
+    # at a time and never together with an AT+SEND: a command waits for the
+    # radio to finish sending, and an AT+SEND issued while a command is out
+    # goes on once that one is answered. Replies are picked out of the same
+    # line stream poll() and tx_idle() read, so a retune or a query costs
+    # the caller nothing while frames keep coming in.
+    def at(self, s, cb=None, timeout_s=None):
+        if not s.endswith("\r\n"):
+            s = s + "\r\n"
+        c = AtCmd(s, cb, timeout_s or self.read_timeout_s)
+        self._q.append(c)
+        self.at_poll()
+        return c
+
+    def at_busy(self):
+        return self._cur is not None or len(self._q) > 0
+
+    def at_poll(self):
+        """Nonblocking: time out the command on the wire and start the next one.
+
+        Reads nothing; poll() and tx_idle() call it after handling lines.
+        """
+        c = self._cur
+        if c and time.monotonic() >= c.deadline:
+            self.at_timeouts += 1
+            self._at_end(c, False)
+        if self._cur is None and self._q and not self.tx_busy:
+            c = self._cur = self._q.pop(0)
+            c.deadline = time.monotonic() + c.timeout_s
+            self.u.write(c.cmd)
+
+    def _at_end(self, c, ok):
+        self._cur = None
+        c.done = True; c.ok = ok
+        if c.cb: c.cb(c)              # before a held AT+SEND, so a retune is in its airtime
+        if self._tx_wait:
+            self._tx_wait = False
+            self._tx_start()
+        self.at_poll()
+
+    def _at_line(self, ln):
+        c = self._cur
+        c.lines.append(ln)
+        if ln.startswith("+OK") or (c.answer and ln.startswith(c.answer)):
+            self._at_end(c, True)
+        elif ln.startswith("+ERR="):
+            self._count_err(ln)
+            try: c.err = int(ln[5:])
+            except ValueError: c.err = -1
+            self._at_end(c, False)
 
     # ---- module control ----
     def wake(self): self.cmd("AT")
@@ -91,45 +227,301 @@ class RYLR998:
     def set_key(self, key_hex:str):  self.cmd(f"AT+CPIN={key_hex}")
 
     def set_params(self, sf=7, bw=125, cr=1, preamble=8):
-        try:
-            self.cmd(f"AT+PARAMETER={sf},{bw},{cr},{preamble}")
-        except Exception:
-            pass
+        """Blocking AT+PARAMETER for setup and tools; True if the module took it.
 
-    # ---- TX/RX ----
-    def send_ascii(self, to_addr:int, ascii_payload:str):
-        ln = len(ascii_payload)
-        self.u.write(
-            ("AT+SEND=%d,%d,%s\r\n" %
-             (to_addr, ln, ascii_payload)).encode("ascii")
-        )
+        Like cmd(), +RCV lines arriving meanwhile are lost: a running bridge
+        uses set_params_nb().
+        """
+        c = self.set_params_nb(sf, bw, cr, preamble)
+        while not c.done:
+            self._service()
+            if not c.done: time.sleep(0.002)
+        return c.ok
 
-    def poll(self):
-        """Nonblocking: parse +RCV lines -> dicts."""
-        out = []
-        for s in self._pop_lines_nb():
-            if not s.startswith("+RCV="):
-                continue
+    def set_params_nb(self, sf=7, bw=125, cr=1, preamble=8, cb=None):
+        """Queue AT+PARAMETER; bw in kHz (125/250/500) or as the module's 7/8/9 code.
+
+        Returns the AtCmd. The airtime estimate takes the new values when
+        the module accepts them and keeps the old ones otherwise, as the
+        module does.
+        """
+        bw = _BW_CODE.get(bw, bw)
+        def done(c):
+            if c.ok: self.sf, self.bw, self.cr, self.preamble = sf, bw, cr, preamble
+            if cb: cb(c)
+        return self.at(f"AT+PARAMETER={sf},{bw},{cr},{preamble}", done)
+
+    # ---- nonblocking configuration ----
+    # cfg_start() takes (name, value) pairs such as ("BAND", 915000000) or
+    # ("PARAMETER", (9, 125, 1, 12)). For each one the module is asked for
+    # its current value (AT+<name>?); only a value that differs is set, and
+    # it is read back afterwards. One command is outstanding at a time, so
+    # cfg_poll() can step several radios side by side (see configure()).
+    # Lines other than the expected reply are dropped while this runs.
+    def cfg_start(self, settings, timeout_s=0.25):
+        self.cfg_result = []                 # [name, value, status]
+        for name, v in settings:
+            if name == "PARAMETER":
+                v = (v[0], _BW_CODE.get(v[1], v[1]), v[2], v[3])
+            if isinstance(v, (tuple, list)):
+                v = ",".join("%d" % x for x in v)
+            self.cfg_result.append([name, str(v), "?"])
+        self._cfg_i = -1; self._cfg_timeout = timeout_s; self._cfg_retried = False
+        self._pop_lines_nb()                 # stale boot chatter
+        self._cfg_next()
+
+    def _cfg_send(self, step, s, retry=False):
+        if not retry: self._cfg_retried = False
+        self._cfg_step = step; self._cfg_cmd = s
+        self._cfg_deadline = time.monotonic() + self._cfg_timeout
+        self.u.write(s)
+
+    def _cfg_next(self):
+        self._cfg_i += 1; self._cfg_blind = False
+        if self._cfg_i < len(self.cfg_result):
+            self._cfg_send(0, ("AT+%s?\r\n" % self.cfg_result[self._cfg_i][0]).encode("ascii"))
+
+    def _cfg_done(self, status):
+        self.cfg_result[self._cfg_i][2] = status
+        self._cfg_next()
+
+    def _cfg_value(self, name, val):
+        if name == "PARAMETER":          # what the module really runs, for airtime_s()
             try:
-                body = s[5:]
-                parts = body.split(",", 4)
-                f = int(parts[0]); L = int(parts[1])
-                p2 = parts[2]
-                if p2 and (p2[0] == '-' or p2.isdigit()):
-                    rssi = int(parts[2])
-                    snr  = int(parts[3])
-                    payload = parts[4]
-                else:
-                    payload = parts[2]
-                    rssi = int(parts[3])
-                    snr  = int(parts[4])
-                out.append({
-                    "from": f,
-                    "len": L,
-                    "rssi": rssi,
-                    "snr": snr,
-                    "data": payload
-                })
-            except Exception:
+                sf, bw, cr, pre = [int(x) for x in val.split(",")]
+                self.sf, self.bw, self.cr, self.preamble = sf, bw, cr, pre
+            except ValueError:
                 pass
+
+    def _cfg_line(self, ln):
+        name, want, _ = self.cfg_result[self._cfg_i]
+        step = self._cfg_step
+        if step != 1 and ln.startswith("+" + name + "="):      # query answer
+            have = ln[len(name) + 2:].strip()
+            self._cfg_value(name, have)
+            if have == want:
+                self._cfg_done("ok" if step == 0 else "set")
+            elif step == 0:
+                self._cfg_send(1, ("AT+%s=%s\r\n" % (name, want)).encode("ascii"))
+            else:
+                self._cfg_done("FAIL(is %s)" % have)
+        elif ln.startswith("+ERR="):
+            if step == 0:                # no query for this one: set it blind
+                self._cfg_blind = True
+                self._cfg_send(1, ("AT+%s=%s\r\n" % (name, want)).encode("ascii"))
+            elif step == 1:
+                self._cfg_done("FAIL(%s)" % ln[1:])
+            else:
+                self._cfg_done("set")
+        elif step == 1 and ln.startswith("+OK"):
+            if self._cfg_blind:
+                if name == "PARAMETER": self._cfg_value(name, want)
+                self._cfg_done("set")
+            else:
+                self._cfg_send(2, ("AT+%s?\r\n" % name).encode("ascii"))
+
+    def cfg_poll(self):
+        """Nonblocking: advance cfg_start()'s work; True while it is not finished.
+
+        A command that gets no answer in timeout_s is sent once more, then
+        the setting is reported as timed out and the next one started.
+        """
+        if self._cfg_i >= len(self.cfg_result):
+            return False
+        for ln in self._pop_lines_nb():
+            self._cfg_line(ln)
+            if self._cfg_i >= len(self.cfg_result):
+                return False
+        if time.monotonic() >= self._cfg_deadline:
+            if self._cfg_retried:
+                self._cfg_done("FAIL(timeout)")
+            else:
+                self._cfg_retried = True
+                self._cfg_send(self._cfg_step, self._cfg_cmd, retry=True)
+        return self._cfg_i < len(self.cfg_result)
+
+    def cfg_failed(self):
+        return [r for r in self.cfg_result if r[2] not in ("ok", "set")]
+
+    def cfg_report(self):
+        return " ".join("%s=%s:%s" % (n, v, s) for n, v, s in self.cfg_result)
+
+    # ---- TX/RX ----
+    def airtime_s(self, nbytes):
+        return time_on_air(nbytes, self.sf, self.bw, self.cr, self.preamble)
+
+    def send_ascii(self, to_addr:int, ascii_payload, n=None):
+        """AT+SEND ascii_payload (str, or bytes-like whose first n bytes are sent).
+
+        The command line is built in a buffer allocated once, so sending
+        from a buffer the caller reuses costs no allocation.
+        """
+        if n is None: n = len(ascii_payload)
+        if isinstance(ascii_payload, str): ascii_payload = ascii_payload.encode("ascii")
+        b = self._txbuf
+        if n > len(b) - 22:
+            raise ValueError("AT+SEND payload too long: %d" % n)
+        i = self._put_dec(8, to_addr); b[i] = 0x2C
+        i = self._put_dec(i + 1, n); b[i] = 0x2C; i += 1
+        self._txmv[i:i + n] = ascii_payload if len(ascii_payload) == n else memoryview(ascii_payload)[:n]
+        b[i + n] = 0x0D; b[i + n + 1] = 0x0A
+        self._tx_cmd = self._txmv[:i + n + 2]
+        self._tx_len = n
+        self._tx_resend = 0
+        if self._cur:                  # a command is out: send when it is answered
+            self.tx_busy = True; self._tx_wait = True
+        else:
+            self._tx_start()
+
+    def _put_dec(self, i, v):
+        """Write v in decimal at self._txbuf[i]; returns the index past it."""
+        b = self._txbuf; d = 1
+        while d * 10 <= v: d *= 10
+        while d:
+            b[i] = 0x30 + v // d % 10; i += 1; d //= 10
+        return i
+
+    def _tx_start(self):
+        self.u.write(self._tx_cmd)
+        toa = self.airtime_s(self._tx_len)
+        self.tx_airtime += toa; self.tx_last_toa = toa
+        self.tx_busy = True
+        self._tx_deadline = time.monotonic() + toa + self.tx_margin_s
+
+    def _tx_end(self, timeout=False):
+        self.tx_busy = False
+        self._tx_done_t = time.monotonic()
+        if timeout: self.tx_timeouts += 1
+        if self._q: self.at_poll()
+
+    def tx_idle(self, guard_s=0.0, read=True):
+        """Nonblocking: True once the last AT+SEND is off the air and guard_s has passed.
+
+        Completion is the +OK the module prints after AT+SEND, or the
+        computed time-on-air if no +OK shows up. A +ERR=17 (previous TX not
+        finished) means this module sends +OK before the air is free: the
+        frame is re-sent once its airtime has run out, and from then on
+        only the airtime estimate is trusted. Queued at() commands count as
+        busy too, so a send never lands in the middle of one. read=False is
+        for a radio that also receives: poll() reads its UART and handles
+        these replies, and this only checks the time-on-air.
+        """
+        if read: self._service()
+        else: self._tx_check()
+        return (not self.tx_busy and self._cur is None and not self._q
+                and (time.monotonic() - self._tx_done_t) >= guard_s)
+
+    def _service(self):
+        self._fill()
+        while self._next_line():
+            self._ctl_line(self._line())
+        self._tx_check()
+
+    def _ctl_line(self, s):
+        """A line other than +RCV: the reply to the command on the wire or to AT+SEND."""
+        if self._cur:
+            self._at_line(s)
+            return
+        if not self.tx_busy or self._tx_wait:
+            return
+        if s.startswith("+OK"):
+            self.tx_ok += 1
+            if self.tx_trust_ok and self._tx_resend != 1:
+                self._tx_end()
+        elif s.startswith("+ERR="):
+            self.tx_err += 1; self._count_err(s)
+            if s == "+ERR=17" and not self._tx_resend:
+                self._tx_resend = 1; self.tx_trust_ok = False
+            elif self._tx_resend != 1:
+                self._tx_end()
+
+    def _tx_check(self):
+        if self.tx_busy and not self._tx_wait and time.monotonic() >= self._tx_deadline:
+            if self._tx_resend == 1:
+                self._tx_resend = 2
+                self._tx_start()
+            else:
+                self._tx_end(timeout=self.tx_trust_ok)
+        self.at_poll()
+
+    def _int(self, i, e):
+        """Signed decimal at self._rx[i:e] up to ',' or e; self._p = index past it, -1 on error."""
+        b = self._rx; neg = i < e and b[i] == 0x2D
+        if neg: i += 1
+        j = i; v = 0
+        while j < e and 0x30 <= b[j] <= 0x39:
+            v = v * 10 + b[j] - 0x30; j += 1
+        if j == i or (j < e and b[j] != 0x2C):
+            self._p = -1; return 0
+        self._p = j + 1 if j < e else e
+        return -v if neg else v
+
+    def _parse_rcv(self, r):
+        b = self._rx; s = self._ls; e = self._le
+        if e - s < 10 or b[s] != 0x2B or b[s+1] != 0x52 or b[s+2] != 0x43 or b[s+3] != 0x56 or b[s+4] != 0x3D:
+            return False   # not "+RCV="
+        r.frm = self._int(s + 5, e)
+        if self._p < 0: return False
+        r.len = L = self._int(self._p, e)
+        if self._p < 0: return False
+        p = self._p
+        if p + L < e and b[p + L] == 0x2C:          # <data>,<rssi>,<snr>
+            r.rssi = self._int(p + L + 1, e)
+            if self._p >= 0:
+                r.snr = self._int(self._p, e)
+                if self._p == e:
+                    r.data = self._mv[p:p + L]; return True
+        r.rssi = self._int(p, e)                     # <rssi>,<snr>,<data>
+        if self._p < 0: return False
+        r.snr = self._int(self._p, e)
+        if self._p < 0 or e - self._p != L: return False
+        r.data = self._mv[self._p:e]
+        return True
+
+    def poll(self, first=None):
+        """Nonblocking: parse +RCV lines into reused RcvFrame records.
+
+        The returned list and its records stay valid until the next call
+        into this driver; other lines are taken as replies to a pending
+        at() command or AT+SEND, if any, and discarded otherwise, so a radio
+        that both sends and receives is serviced by poll() alone (with
+        tx_idle(read=False) as its send gate). `first` is data already
+        read from this UART (e.g. by an asyncio stream) that goes in ahead of
+        whatever is still waiting. At most rx_slots records come back per
+        call; a full list means more lines may be buffered.
+        """
+        self._fill(first)
+        out = self._out
+        out.clear()
+        slots = self._slots
+        while len(out) < len(slots) and self._next_line():
+            r = slots[len(out)]
+            if self._parse_rcv(r):
+                out.append(r)
+            elif self._cur or self.tx_busy:
+                self._ctl_line(self._line())
+        if self._cur or self._q or self.tx_busy: self._tx_check()
         return out
+
+
+def configure(radios, timeout_s=3.0):
+    """Run the cfg_start() work of several radios at once; True if every setting took.
+
+    Each radio has at most one command outstanding, so the modules answer
+    in parallel and a boot with nothing to change costs one query round
+    trip per setting. timeout_s bounds the whole phase.
+    """
+    t_end = time.monotonic() + timeout_s
+    while time.monotonic() < t_end:
+        busy = False
+        for r in radios:
+            if r.cfg_poll(): busy = True
+        if not busy: break
+        time.sleep(0.002)
+    ok = True
+    for r in radios:
+        for x in r.cfg_result:
+            if x[2] == "?": x[2] = "FAIL(timeout)"
+        r._cfg_i = len(r.cfg_result)
+        if r.cfg_failed(): ok = False
+    return ok
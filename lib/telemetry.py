@@ -0,0 +1,100 @@
+# telemetry.py — counters and fixed-bucket histograms for the bridge
+#
+# Everything is allocated when the bridge starts; recording a sample is an
+# integer compare loop and one list increment, so it can sit on the hot
+# paths. A snapshot is one line of JSON, built only when it is emitted:
+#   {"t":<s>,"c":{<counter>:<n>,...},"h":{<name>:{"u":unit,"b":[edges],"n":[counts]},...}}
+# n has one more entry than b: n[i] counts samples <= b[i] (and > b[i-1]),
+# the last one everything above the top edge. Histograms are cumulative
+# since boot, so a reader that misses a snapshot loses nothing.
+#
+# Heap runs the garbage collector on the bridge's schedule instead of
+# whenever an allocation finds the heap full, times each pause, and tracks
+# free memory and how much was allocated in between. Desktop Python (sim/)
+# has gc.collect() but no mem_free()/mem_alloc(), so the byte counts stay 0.
+
+import json
+try:
+    import gc
+except ImportError:
+    gc = None
+try:
+    from time import monotonic_ns as _ns
+except ImportError:
+    from time import monotonic as _mono
+    def _ns(): return int(_mono() * 1e9)
+
+def ticks_us():
+    return _ns() // 1000
+
+def _mem(name):
+    f = getattr(gc, name, None)
+    return f() if f else 0
+
+
+class Histogram:
+    def __init__(self, unit, edges):
+        self.unit = unit
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.n = 0; self.total = 0
+
+    def add(self, v):
+        e = self.edges; i = 0; k = len(e)
+        while i < k and v > e[i]: i += 1
+        self.counts[i] += 1; self.n += 1; self.total += v
+
+    def mean(self):
+        return self.total / self.n if self.n else 0
+
+    def to_dict(self):
+        return {"u": self.unit, "b": self.edges, "n": self.counts}
+
+
+class Heap:
+    """collect() = one timed gc.collect(); alloc counts bytes allocated since boot."""
+
+    def __init__(self, hist):
+        self.hist = hist
+        self.n = 0; self.max_us = 0; self.alloc = 0; self.free = _mem("mem_free"); self.low = self.free
+        self._after = _mem("mem_alloc"); self._m_alloc = 0; self._m_pkts = 0
+
+    def collect(self):
+        a = _mem("mem_alloc")
+        t0 = ticks_us()
+        if gc: gc.collect()
+        us = ticks_us() - t0
+        self.hist.add(us); self.n += 1
+        if us > self.max_us: self.max_us = us
+        self.alloc += a - self._after          # what the bridge allocated since the last collection
+        self._after = _mem("mem_alloc"); self.free = _mem("mem_free")
+        if self.free < self.low: self.low = self.free
+        return us
+
+    def per_pkt(self, pkts):
+        """Bytes allocated per packet since the previous call; pkts = packets moved since boot."""
+        da = self.alloc - self._m_alloc; dp = pkts - self._m_pkts
+        self._m_alloc = self.alloc; self._m_pkts = pkts
+        return da // dp if dp > 0 else 0
+
+
+class Telemetry:
+    """Histograms of the bridge's timing and link quality, plus a JSON snapshot."""
+
+    def __init__(self):
+        self.sojourn = Histogram("ms", (10, 30, 100, 300, 1000, 3000, 10000, 30000))   # queue wait
+        self.airtime = Histogram("ms", (25, 50, 100, 200, 400, 800, 1600, 3200))       # per AT+SEND
+        self.rssi = Histogram("dBm", (-120, -110, -100, -90, -80, -70, -60, -50))
+        self.snr = Histogram("dB", (-15, -10, -5, 0, 5, 10))
+        self.loop = Histogram("us", (100, 300, 1000, 3000, 10000, 30000, 100000, 300000))  # one pass / task step
+        self.gc = Histogram("us", (500, 1000, 2000, 5000, 10000, 20000, 50000))           # gc.collect() pause
+        self.hists = {"sojourn": self.sojourn, "airtime": self.airtime, "rssi": self.rssi,
+                      "snr": self.snr, "loop": self.loop, "gc": self.gc}
+
+    def snapshot(self, now, counters):
+        """One JSON line: counters is a dict of name -> number from the bridge."""
+        h = {}
+        for k, v in self.hists.items(): h[k] = v.to_dict()
+        d = {"t": round(now, 1), "c": counters, "h": h}
+        try: return json.dumps(d, separators=(",", ":"))
+        except TypeError: return json.dumps(d)       # ports whose json has no separators
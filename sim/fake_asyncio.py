@@ -0,0 +1,78 @@
+# fake_asyncio.py — the part of CircuitPython's asyncio the bridges use, on the virtual clock
+#
+# sleep(), Event, StreamReader(port).read(n), gather() and run(). Tasks are
+# plain coroutines stepped round-robin; a task that yields says what it is
+# waiting for (a deadline, an Event or a port with bytes waiting). When no
+# task can run, the node's thread sleeps on the virtual clock until the
+# next deadline, at most 2 ms so that stream ports are re-checked.
+
+import types
+
+STREAM_POLL_S = 0.002
+
+
+def make_asyncio(clock):
+    m = types.ModuleType("asyncio")
+    tasks = []          # [coro, wait]; wait = ("t", deadline) | ("ev", Event) | ("rd", port) | None
+
+    @types.coroutine
+    def sleep(dt):
+        yield ("t", clock.now + dt)
+
+    class Event:
+        def __init__(self): self._f = False
+        def set(self): self._f = True
+        def clear(self): self._f = False
+        def is_set(self): return self._f
+
+        @types.coroutine
+        def wait(self):
+            if not self._f:
+                yield ("ev", self)
+
+    class StreamReader:
+        def __init__(self, s):
+            if not hasattr(s, "in_waiting"):
+                raise TypeError("not a stream")
+            self.s = s
+
+        @types.coroutine
+        def read(self, n):
+            while not self.s.in_waiting:
+                yield ("rd", self.s)
+            return self.s.read(n)
+
+    async def gather(*coros):
+        for c in coros:
+            tasks.append([c, None])
+        await Event().wait()          # never set: gather() runs for the life of the node
+
+    def ready(w):
+        if w is None:
+            return True
+        k, x = w
+        if k == "t":
+            return clock.now >= x
+        if k == "ev":
+            return x.is_set()
+        return x.in_waiting > 0
+
+    def run(main):
+        tasks.append([main, None])
+        while True:
+            ran = False
+            for t in list(tasks):
+                if ready(t[1]):
+                    ran = True
+                    try:
+                        t[1] = t[0].send(None)
+                    except StopIteration:
+                        tasks.remove(t)
+            if not ran:
+                dl = [t[1][1] for t in tasks if t[1] and t[1][0] == "t"]
+                nxt = min(dl) if dl else clock.now + STREAM_POLL_S
+                clock.sleep(max(0.0, min(nxt - clock.now, STREAM_POLL_S)))
+
+    m.sleep = sleep; m.Event = Event; m.StreamReader = StreamReader
+    m.gather = gather; m.run = run
+    return m
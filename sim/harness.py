@@ -0,0 +1,257 @@
+# harness.py — run code_A.py / code_B.py unchanged against emulated hardware
+#
+# Each bridge script is executed in its own namespace with an import hook
+# that hands it per-node fakes for the CircuitPython modules (board, busio,
+# digitalio, usb_cdc, time, asyncio) and fresh copies of everything under
+# lib/, so the two bridges share nothing but the emulated Air. All clocks
+# are virtual: a minute of link time costs only the Python work done in it.
+#
+#   clock, air, a, b, logs = build_pair(t_end=60)
+#   a.start(); b.start(); clock.spawn(my_traffic, "hosts"); clock.run()
+#
+# my_traffic() injects packets with a.host.send() and must call
+# a.host.pump() / b.host.pump() and clock.sleep() in a loop; deliveries
+# land in host.received or the host.on_packet callback.
+
+import builtins, os, sys, types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.environ.get("SIM_ROOT") or os.path.dirname(HERE)
+LIB = os.path.join(ROOT, "lib")
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from vclock import VirtualClock
+from rylr998_emu import Air, RYLR998Emu, FakeUART
+from fake_asyncio import make_asyncio
+
+FEND, FESC, TFEND, TFESC = 0xC0, 0xDB, 0xDC, 0xDD
+
+
+# ---------- fake CircuitPython modules ----------
+class Pin:
+    def __init__(self, name): self.name = name
+    def __repr__(self): return "board.%s" % self.name
+
+def make_board():
+    m = types.ModuleType("board")
+    for i in range(29):
+        setattr(m, "GP%d" % i, Pin("GP%d" % i))
+    m.LED = Pin("LED")
+    return m
+
+def make_time(clock):
+    m = types.ModuleType("time")
+    m.monotonic = lambda: clock.now
+    m.monotonic_ns = lambda: int(clock.now * 1e9)
+    m.time = lambda: 1_700_000_000 + clock.now
+    m.sleep = clock.sleep
+    m.localtime = __import__("time").localtime
+    m.struct_time = __import__("time").struct_time
+    return m
+
+def make_busio(uart_map):
+    m = types.ModuleType("busio")
+    def UART(tx=None, rx=None, baudrate=9600, timeout=1.0, receiver_buffer_size=64, **kw):
+        mod = uart_map[(tx.name, rx.name)]
+        u = FakeUART(mod, receiver_buffer_size=max(receiver_buffer_size, 64))
+        u.baudrate = baudrate; u.timeout = timeout
+        return u
+    m.UART = UART
+    return m
+
+def make_digitalio():
+    m = types.ModuleType("digitalio")
+    class Direction: INPUT = 0; OUTPUT = 1
+    class Pull: UP = 1; DOWN = 2
+    class DigitalInOut:
+        def __init__(self, pin): self.pin = pin; self.value = True; self.direction = Direction.INPUT
+        def deinit(self): pass
+    m.Direction = Direction; m.Pull = Pull; m.DigitalInOut = DigitalInOut
+    return m
+
+
+class FakeCDC:
+    """usb_cdc.data look-alike: bytes written by the host appear in read()."""
+
+    def __init__(self):
+        self.to_dev = bytearray()
+        self.to_host = bytearray()
+        self.timeout = 0
+        self.write_timeout = None
+        self.connected = True
+
+    @property
+    def in_waiting(self):
+        return len(self.to_dev)
+
+    def read(self, n=None):
+        if n is None or n > len(self.to_dev):
+            n = len(self.to_dev)
+        data = bytes(self.to_dev[:n]); del self.to_dev[:n]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        n = min(len(buf) if nbytes is None else nbytes, len(self.to_dev))
+        buf[:n] = self.to_dev[:n]; del self.to_dev[:n]
+        return n
+
+    def write(self, data):
+        self.to_host += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        del self.to_dev[:]
+
+def make_usb_cdc(cdc):
+    m = types.ModuleType("usb_cdc")
+    m.data = cdc; m.console = None
+    m.enable = lambda **kw: None
+    return m
+
+
+# ---------- host side KISS helpers ----------
+def kiss_wrap(pkt, port=0):
+    out = bytearray([FEND, port])
+    for b in pkt:
+        if b == FEND: out += bytes([FESC, TFEND])
+        elif b == FESC: out += bytes([FESC, TFESC])
+        else: out.append(b)
+    out.append(FEND)
+    return bytes(out)
+
+class KissReader:
+    def __init__(self):
+        self.buf = bytearray(); self.inside = False; self.esc = False
+
+    def feed(self, data):
+        frames = []
+        for b in data:
+            if b == FEND:
+                if self.inside and self.buf:
+                    frames.append(bytes(self.buf))
+                self.buf = bytearray(); self.inside = True; self.esc = False
+            elif not self.inside:
+                continue
+            elif self.esc:
+                self.buf.append(FEND if b == TFEND else FESC if b == TFESC else b); self.esc = False
+            elif b == FESC:
+                self.esc = True
+            else:
+                self.buf.append(b)
+        return frames
+
+
+class Host:
+    """The Linux side of one bridge: injects KISS frames, collects deliveries."""
+
+    def __init__(self, clock, cdc, name):
+        self.clock = clock; self.cdc = cdc; self.name = name
+        self.reader = KissReader()
+        self.received = []            # (t, port, payload)
+        self.on_packet = None
+
+    def send(self, pkt, port=0):
+        self.cdc.to_dev += kiss_wrap(pkt, port)
+
+    def pump(self):
+        if not self.cdc.to_host:
+            return
+        data = bytes(self.cdc.to_host); del self.cdc.to_host[:]
+        for fr in self.reader.feed(data):
+            port, payload = fr[0], fr[1:]
+            self.received.append((self.clock.now, port, payload))
+            if self.on_packet:
+                self.on_packet(self.clock.now, port, payload)
+
+
+# ---------- node loader ----------
+class Node:
+    """One bridge (code_X.py) with two emulated radios and a host."""
+
+    SIM_MODULES = ("board", "busio", "digitalio", "usb_cdc", "time")
+
+    def __init__(self, clock, air, name, script, radios, log=None, echo=False, extra_modules=None,
+                 use_asyncio=True):
+        self.clock = clock; self.name = name
+        self.script = script if os.path.isabs(script) else os.path.join(ROOT, script)
+        self.radios = radios                      # {(tx_pin, rx_pin): RYLR998Emu}
+        self.cdc = FakeCDC()
+        self.host = Host(clock, self.cdc, name)
+        self.logs = [] if log is None else log
+        self.echo = echo
+        self.fakes = {
+            "board": make_board(),
+            "busio": make_busio(radios),
+            "digitalio": make_digitalio(),
+            "usb_cdc": make_usb_cdc(self.cdc),
+            "time": make_time(clock),
+        }
+        self.fakes["asyncio"] = make_asyncio(clock) if use_asyncio else None   # None: ImportError
+        self.fakes.update(extra_modules or {})
+        self.libs = {}
+        self.globals = None
+        self._builtins = dict(vars(builtins))
+        self._builtins["__import__"] = self._import
+        self._builtins["print"] = self._print
+
+    def _print(self, *args, sep=" ", end="\n", file=None, flush=False):
+        line = sep.join(str(a) for a in args)
+        self.logs.append((self.clock.now, self.name, line))
+        if self.echo:
+            sys.stdout.write("%9.3f %s| %s%s" % (self.clock.now, self.name, line, end))
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0:
+            if name in self.fakes:
+                if self.fakes[name] is None:
+                    raise ImportError("no module named %r" % name)
+                return self.fakes[name]
+            path = os.path.join(LIB, name + ".py")
+            if os.path.exists(path):
+                return self._load_lib(name, path)
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def _load_lib(self, name, path):
+        mod = self.libs.get(name)
+        if mod is None:
+            mod = types.ModuleType(name)
+            mod.__file__ = path
+            mod.__dict__["__builtins__"] = self._builtins
+            self.libs[name] = mod
+            with open(path) as f:
+                code = compile(f.read(), path, "exec")
+            exec(code, mod.__dict__)
+        return mod
+
+    def start(self):
+        def run():
+            g = {"__name__": "__main__", "__file__": self.script, "__builtins__": self._builtins}
+            self.globals = g
+            with open(self.script) as f:
+                code = compile(f.read(), self.script, "exec")
+            exec(code, g)
+        return self.clock.spawn(run, self.name)
+
+
+def build_pair(t_end=60.0, loss=0.0, seed=1, echo=False, script_a="code_A.py", script_b="code_B.py",
+               path_loss_db=60.0, ok_on_tx_done=True, address_filter=True, use_asyncio=True):
+    """Two bridges wired as in the README: A-TX -> B-RX on 916 MHz, B-TX -> A-RX on 915 MHz.
+
+    use_asyncio=False makes `import asyncio` fail, so the bridges take
+    their polling loop.
+    """
+    clock = VirtualClock(t_end)
+    air = Air(clock, loss=loss, seed=seed, path_loss_db=path_loss_db, address_filter=address_filter)
+    logs = []
+    def radio(name):
+        return RYLR998Emu(air, name, ok_on_tx_done=ok_on_tx_done)
+    a_rx, a_tx, b_rx, b_tx = radio("A-RX"), radio("A-TX"), radio("B-RX"), radio("B-TX")
+    a = Node(clock, air, "A", script_a, {("GP0", "GP1"): a_rx, ("GP4", "GP5"): a_tx}, logs, echo,
+             use_asyncio=use_asyncio)
+    b = Node(clock, air, "B", script_b, {("GP0", "GP1"): b_rx, ("GP4", "GP5"): b_tx}, logs, echo,
+             use_asyncio=use_asyncio)
+    return clock, air, a, b, logs
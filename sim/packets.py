@@ -0,0 +1,120 @@
+# packets.py — IPv4 packet builders and a pcap reader for the benchmarks
+#
+# Enough of IPv4/TCP/UDP/ICMP to make packets the bridge's header
+# compressor treats like real traffic (valid checksums, incrementing IP
+# IDs, TCP timestamps), plus a reader that pulls the IP packets out of a
+# classic libpcap capture so recorded traffic can be replayed over the link.
+
+import struct
+
+PROTO_ICMP, PROTO_TCP, PROTO_UDP = 1, 6, 17
+TCP_FIN, TCP_SYN, TCP_RST, TCP_PSH, TCP_ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+
+def ip_bytes(addr):
+    """'10.10.10.1' or a 4-item sequence -> 4 bytes."""
+    if isinstance(addr, str):
+        return bytes(int(x) for x in addr.split("."))
+    return bytes(addr)
+
+
+def checksum(b):
+    if len(b) % 2:
+        b += b"\0"
+    s = sum(struct.unpack("!%dH" % (len(b) // 2), b))
+    s = (s >> 16) + (s & 0xFFFF); s += s >> 16
+    return ~s & 0xFFFF
+
+
+def ipv4(proto, payload, src, dst, ident=0, ttl=64):
+    h = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(payload), ident & 0xFFFF, 0x4000,
+                    ttl, proto, 0, ip_bytes(src), ip_bytes(dst))
+    return h[:10] + struct.pack("!H", checksum(h)) + h[12:] + payload
+
+
+def _l4_checksum(proto, src, dst, seg):
+    ph = ip_bytes(src) + ip_bytes(dst) + struct.pack("!BBH", 0, proto, len(seg))
+    return checksum(ph + seg)
+
+
+def tcp(src, dst, sport, dport, seq, ack, flags, data=b"", win=64000, ts=None, ident=0, ws=None):
+    """ts=(tsval, tsecr) adds the timestamp option, as Linux does on every segment;
+    ws adds a window scale option (SYNs only)."""
+    opts = b"" if ts is None else b"\x01\x01\x08\x0a" + struct.pack("!II", ts[0] & 0xFFFFFFFF,
+                                                                    ts[1] & 0xFFFFFFFF)
+    if ws is not None: opts += b"\x01\x03\x03" + bytes((ws,))
+    seg = struct.pack("!HHIIBBHHH", sport, dport, seq & 0xFFFFFFFF, ack & 0xFFFFFFFF,
+                      (20 + len(opts)) // 4 << 4, flags, win, 0, 0) + opts + data
+    c = _l4_checksum(PROTO_TCP, src, dst, seg)
+    return ipv4(PROTO_TCP, seg[:16] + struct.pack("!H", c) + seg[18:], src, dst, ident)
+
+
+def udp(src, dst, sport, dport, data, ident=0):
+    seg = struct.pack("!HHHH", sport, dport, 8 + len(data), 0) + data
+    c = _l4_checksum(PROTO_UDP, src, dst, seg) or 0xFFFF
+    return ipv4(PROTO_UDP, seg[:6] + struct.pack("!H", c) + seg[8:], src, dst, ident)
+
+
+def icmp_echo(src, dst, ident, seq, data=b"", reply=False, ip_ident=0):
+    b = struct.pack("!BBHHH", 0 if reply else 8, 0, 0, ident, seq) + data
+    b = b[:2] + struct.pack("!H", checksum(b)) + b[4:]
+    return ipv4(PROTO_ICMP, b, src, dst, ip_ident)
+
+
+# ---------- pcap ----------
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+
+
+def _ip_from_frame(linktype, frame):
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        off = 0
+    elif linktype == LINKTYPE_ETHERNET:
+        off = 14; etype = frame[12:14]
+        while etype == b"\x81\x00":             # 802.1Q tags
+            etype = frame[off + 2:off + 4]; off += 4
+        if etype != b"\x08\x00":
+            return None
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if frame[14:16] != b"\x08\x00":
+            return None
+        off = 16
+    else:
+        raise ValueError("unsupported pcap link type %d" % linktype)
+    ip = frame[off:]
+    if len(ip) < 20 or ip[0] >> 4 != 4:
+        return None
+    return bytes(ip[:struct.unpack("!H", ip[2:4])[0]])    # drop Ethernet padding
+
+
+def read_pcap(path):
+    """Yields (timestamp, IPv4 packet) for every IPv4 packet in a libpcap file.
+
+    pcapng is not supported; `editcap -F pcap` converts.
+    """
+    with open(path, "rb") as f:
+        hdr = f.read(24)
+        if len(hdr) < 24:
+            raise ValueError("%s: not a pcap file" % path)
+        magic = hdr[:4]
+        if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+            e = "<"
+        elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+            e = ">"
+        else:
+            raise ValueError("%s: not a pcap file (pcapng is not supported)" % path)
+        frac = 1e-9 if magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d") else 1e-6
+        linktype = struct.unpack(e + "I", hdr[20:24])[0] & 0xFFFF
+        while True:
+            rec = f.read(16)
+            if len(rec) < 16:
+                return
+            sec, sub, incl, _orig = struct.unpack(e + "IIII", rec)
+            frame = f.read(incl)
+            if len(frame) < incl:
+                return
+            ip = _ip_from_frame(linktype, frame)
+            if ip is not None:
+                yield sec + sub * frac, ip
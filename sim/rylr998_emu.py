@@ -0,0 +1,274 @@
+# rylr998_emu.py — behavioural RYLR998 emulator for the host simulation
+#
+# Implements the AT subset the bridge uses (AT, AT+RESET, AT+ADDRESS,
+# AT+NETWORKID, AT+BAND, AT+CRFOP, AT+PARAMETER, AT+CPIN, AT+SEND and the
+# matching "?" queries), answers with +OK / +ERR=<n> / +<CMD>=<value>, and
+# delivers "+RCV=<from>,<len>,<data>,<rssi>,<snr>" lines to every module on
+# the same band/network/SF/BW once the LoRa time-on-air has elapsed.
+
+import math, random
+
+BW_CODES = {7: 125, 8: 250, 9: 500}
+UART_BYTES_PER_S = 11520          # 115200 baud, 8N1
+UART_CHUNK = 16                   # bytes handed to the host UART per tick
+SNR_FLOOR = {5: -2.5, 6: -5.0, 7: -7.5, 8: -10.0, 9: -12.5, 10: -15.0, 11: -17.5, 12: -20.0}
+
+# RYLR998 error codes used here
+ERR_NO_CRLF, ERR_NOT_AT, ERR_UNKNOWN, ERR_LEN = 1, 2, 4, 5
+ERR_TOO_LONG, ERR_TX_BUSY, ERR_PREAMBLE = 13, 17, 18
+
+def time_on_air(nbytes, sf, bw_khz, cr, preamble):
+    """Semtech SX127x/SX126x LoRa time-on-air in seconds (explicit header, CRC on)."""
+    tsym = (1 << sf) / (bw_khz * 1000.0)
+    de = 1 if tsym > 0.016 else 0
+    num = 8 * nbytes - 4 * sf + 28 + 16
+    n_payload = 8 + max(math.ceil(num / (4.0 * (sf - 2 * de))) * (cr + 4), 0)
+    return (preamble + 4.25) * tsym + n_payload * tsym
+
+
+class Air:
+    """Shared RF medium: tracks modules, in-flight transmissions and loss."""
+
+    def __init__(self, clock, loss=0.0, path_loss_db=60.0, seed=1, address_filter=True):
+        self.clock = clock
+        self.address_filter = address_filter
+        self.loss = loss
+        self.path_loss_db = path_loss_db
+        self.rng = random.Random(seed)
+        self.modules = []
+        self._on_air = []          # [(module, t_start, t_end, band)]
+        self.stats = {"tx": 0, "delivered": 0, "lost": 0, "collided": 0, "airtime_s": 0.0}
+
+    def attach(self, mod):
+        self.modules.append(mod)
+
+    def link_loss(self, src, dst):
+        """Per-link frame loss probability; override or replace for fancier models."""
+        return self.loss
+
+    def transmit(self, src, dest, data):
+        now = self.clock.now
+        toa = time_on_air(len(data), src.sf, BW_CODES[src.bw], src.cr, src.preamble)
+        entry = (src, now, now + toa, src.band)
+        self._on_air.append(entry)
+        self.stats["tx"] += 1; self.stats["airtime_s"] += toa
+        self.clock.call_at(now + toa, lambda: self._finish(entry, dest, data))
+        return toa
+
+    def _collided(self, entry):
+        src, t0, t1, band = entry
+        for other in self._on_air:
+            if other is entry or other[3] != band:
+                continue
+            if other[1] < t1 and t0 < other[2]:
+                return True
+        return False
+
+    def _finish(self, entry, dest, data):
+        src = entry[0]
+        collided = self._collided(entry)
+        self._on_air = [e for e in self._on_air if e[2] > self.clock.now - 10.0]
+        src._tx_done()
+        for m in self.modules:
+            if m is src or m.band != src.band or m.network != src.network:
+                continue
+            if m.sf != src.sf or m.bw != src.bw:
+                continue
+            if self.address_filter and dest not in (0, m.address):
+                continue
+            if m.tx_busy_until > entry[1]:
+                continue          # half duplex: it was transmitting
+            rssi = src.power - self.path_loss_db + self.rng.uniform(-3, 3)
+            snr = max(-20.0, min(13.0, rssi + 100.0 - 10 * math.log10(BW_CODES[src.bw] / 125.0) + self.rng.uniform(-2, 2)))
+            if collided:
+                self.stats["collided"] += 1; continue
+            if snr < SNR_FLOOR.get(m.sf, -15.0) or self.rng.random() < self.link_loss(src, m):
+                self.stats["lost"] += 1; continue
+            self.stats["delivered"] += 1
+            m._rx(src.address, data, int(round(rssi)), int(round(snr)))
+
+
+class RYLR998Emu:
+    """One module: AT command parser on the UART side, radio on the Air side."""
+
+    def __init__(self, air, name, address=0, band=915000000, network=18,
+                 power=22, sf=9, bw=7, cr=1, preamble=12, ok_on_tx_done=True):
+        self.air = air; self.clock = air.clock; self.name = name
+        self.address = address; self.band = band; self.network = network
+        self.power = power; self.sf = sf; self.bw = bw; self.cr = cr; self.preamble = preamble
+        self.ok_on_tx_done = ok_on_tx_done
+        self.tx_busy_until = -1.0
+        self._in = bytearray()        # host -> module
+        self.out = bytearray()        # module -> host
+        self._tx_line = bytearray(); self._tx_busy = False
+        self.log = []                 # (t, line) of every command seen
+        self.stats = {"send": 0, "err": 0, "rcv": 0}
+        air.attach(self)
+
+    # ---- UART side ----
+    def feed(self, data):
+        self._in += data
+        while True:
+            i = self._in.find(b"\r\n")
+            if i < 0:
+                return
+            line = bytes(self._in[:i]).decode("ascii", "replace")
+            del self._in[:i + 2]
+            self.log.append((self.clock.now, line))
+            self._command(line)
+
+    def _reply(self, s, delay=0.0):
+        """Queue a response line; it trickles onto the UART at line rate."""
+        self._tx_line += (s + "\r\n").encode("ascii")
+        if not self._tx_busy:
+            self._tx_busy = True
+            self.clock.call_later(delay, self._uart_tick)
+
+    def _uart_tick(self):
+        chunk = bytes(self._tx_line[:UART_CHUNK]); del self._tx_line[:UART_CHUNK]
+        self.out.extend(chunk)
+        if self._tx_line:
+            self.clock.call_later(UART_CHUNK / float(UART_BYTES_PER_S), self._uart_tick)
+        else:
+            self._tx_busy = False
+
+    def _err(self, code):
+        self.stats["err"] += 1
+        self._reply("+ERR=%d" % code)
+
+    # ---- AT commands ----
+    def _command(self, line):
+        if not line.startswith("AT"):
+            return self._err(ERR_NOT_AT)
+        if line == "AT":
+            return self._reply("+OK")
+        if not line.startswith("AT+"):
+            return self._err(ERR_UNKNOWN)
+        body = line[3:]
+        if body == "RESET":
+            self._reply("+RESET"); self._reply("+READY", 0.1); return
+        if body.startswith("SEND="):
+            return self._send(body[5:])
+        name, sep, arg = body.partition("=")
+        if not sep:
+            if name.endswith("?"):
+                return self._query(name[:-1])
+            return self._err(ERR_UNKNOWN)
+        try:
+            self._set(name, arg)
+        except (ValueError, IndexError):
+            return self._err(ERR_UNKNOWN)
+
+    def _query(self, name):
+        vals = {
+            "ADDRESS": "%d" % self.address,
+            "NETWORKID": "%d" % self.network,
+            "BAND": "%d" % self.band,
+            "CRFOP": "%d" % self.power,
+            "PARAMETER": "%d,%d,%d,%d" % (self.sf, self.bw, self.cr, self.preamble),
+        }
+        if name not in vals:
+            return self._err(ERR_UNKNOWN)
+        self._reply("+%s=%s" % (name, vals[name]))
+
+    def _set(self, name, arg):
+        if name == "ADDRESS":
+            self.address = int(arg)
+        elif name == "NETWORKID":
+            self.network = int(arg)
+        elif name == "BAND":
+            self.band = int(arg)
+        elif name == "CRFOP":
+            v = int(arg)
+            if not 0 <= v <= 22: return self._err(ERR_UNKNOWN)
+            self.power = v
+        elif name == "CPIN":
+            pass
+        elif name == "PARAMETER":
+            sf, bw, cr, pre = [int(x) for x in arg.split(",")]
+            if not (5 <= sf <= 11 and bw in BW_CODES and 1 <= cr <= 4):
+                return self._err(ERR_UNKNOWN)
+            if (self.network == 18 and not 4 <= pre <= 24) or (self.network != 18 and pre != 12):
+                return self._err(ERR_PREAMBLE)
+            self.sf, self.bw, self.cr, self.preamble = sf, bw, cr, pre
+        else:
+            return self._err(ERR_UNKNOWN)
+        self._reply("+OK")
+
+    def _send(self, arg):
+        parts = arg.split(",", 2)
+        if len(parts) < 3:
+            return self._err(ERR_UNKNOWN)
+        try:
+            dest = int(parts[0]); ln = int(parts[1])
+        except ValueError:
+            return self._err(ERR_UNKNOWN)
+        data = parts[2]
+        if ln > 240:
+            return self._err(ERR_TOO_LONG)
+        if ln != len(data):
+            return self._err(ERR_LEN)
+        if self.clock.now < self.tx_busy_until:
+            return self._err(ERR_TX_BUSY)
+        self.stats["send"] += 1
+        toa = self.air.transmit(self, dest, data)
+        self.tx_busy_until = self.clock.now + toa
+        if not self.ok_on_tx_done:
+            self._reply("+OK")
+
+    def _tx_done(self):
+        if self.ok_on_tx_done:
+            self._reply("+OK")
+
+    def _rx(self, frm, data, rssi, snr):
+        self.stats["rcv"] += 1
+        self._reply("+RCV=%d,%d,%s,%d,%d" % (frm, len(data), data, rssi, snr))
+
+
+class FakeUART:
+    """busio.UART look-alike wired to an emulated module."""
+
+    def __init__(self, module, receiver_buffer_size=4096):
+        self.module = module
+        self.size = receiver_buffer_size
+        self.baudrate = 115200
+        self.timeout = 0
+
+    def _trim(self):
+        out = self.module.out
+        if len(out) > self.size:      # hardware ring overruns drop old bytes
+            del out[:len(out) - self.size]
+
+    @property
+    def in_waiting(self):
+        self._trim()
+        return len(self.module.out)
+
+    def read(self, n=None):
+        self._trim()
+        out = self.module.out
+        if not out:
+            return None
+        if n is None or n > len(out):
+            n = len(out)
+        data = bytes(out[:n]); del out[:n]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        self._trim()
+        out = self.module.out
+        n = min(len(buf) if nbytes is None else nbytes, len(out))
+        if not n:
+            return None
+        buf[:n] = out[:n]; del out[:n]
+        return n
+
+    def write(self, data):
+        self.module.feed(bytes(data))
+        return len(data)
+
+    def reset_input_buffer(self):
+        del self.module.out[:]
+
+    def deinit(self):
+        pass
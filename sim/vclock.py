@@ -0,0 +1,107 @@
+# vclock.py — discrete-event virtual clock shared by all simulated threads
+#
+# Every bridge runs in its own thread but only one thread runs at a time.
+# A thread gives up the baton by sleeping; the clock then jumps straight to
+# the earliest pending wake-up (or timer callback) so simulated seconds cost
+# only as much wall time as the Python work done inside them.
+
+import heapq, itertools, threading
+
+class SimStopped(BaseException):
+    """Raised inside a simulated thread when the run is over."""
+
+class VirtualClock:
+    def __init__(self, t_end):
+        self.now = 0.0
+        self.t_end = t_end
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._done = threading.Event()
+        self.error = None
+
+    # ---- scheduling ----
+    def call_at(self, t, fn):
+        """Run fn() (on whichever thread holds the baton) at virtual time t."""
+        with self._lock:
+            heapq.heappush(self._heap, (max(t, self.now), next(self._seq), fn))
+
+    def call_later(self, dt, fn):
+        self.call_at(self.now + dt, fn)
+
+    def sleep(self, dt):
+        if self._stopped:
+            raise SimStopped()
+        ev = threading.Event()
+        self.call_at(self.now + max(dt, 0.0), ev)
+        self._advance()
+        if not self._stopped:
+            ev.wait()
+        if self._stopped:
+            raise SimStopped()
+
+    def _advance(self):
+        """Hand the baton to the next due thread, running timers on the way."""
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return
+                if not self._heap:
+                    self._stop_locked(); return
+                t, _, what = heapq.heappop(self._heap)
+                if t > self.t_end:
+                    if isinstance(what, threading.Event):
+                        what.set()
+                    self._stop_locked(); return
+                self.now = t
+            if isinstance(what, threading.Event):
+                what.set(); return
+            try:
+                what()
+            except BaseException as e:  # a timer blew up: end the run
+                self.fail(e); return
+
+    def _stop_locked(self):
+        self._stopped = True
+        for _, _, what in self._heap:
+            if isinstance(what, threading.Event):
+                what.set()
+        self._heap = []
+        self._done.set()
+
+    def fail(self, exc):
+        if self.error is None:
+            self.error = exc
+        with self._lock:
+            self._stop_locked()
+
+    # ---- threads ----
+    def spawn(self, target, name):
+        """Start target() as a simulated thread; it first runs at time now."""
+        start = threading.Event()
+        def run():
+            start.wait()
+            try:
+                if not self._stopped:
+                    target()
+            except SimStopped:
+                return
+            except BaseException as e:
+                self.fail(e); return
+            self._advance()  # thread finished: pass the baton on
+        th = threading.Thread(target=run, name=name, daemon=True)
+        th.start()
+        self.call_at(self.now, start)
+        return th
+
+    def run(self):
+        """Kick off the event loop and block until t_end or failure."""
+        self._advance()
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def stopped(self):
+        return self._stopped
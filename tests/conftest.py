@@ -0,0 +1,10 @@
+# conftest.py — put lib/ (the modules as the board imports them) and sim/
+# (packet builders, emulator) on the path for every test
+
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for d in ("lib", "sim"):
+    p = os.path.join(ROOT, d)
+    if p not in sys.path:
+        sys.path.insert(0, p)
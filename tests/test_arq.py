@@ -0,0 +1,103 @@
+# test_arq.py — selective-repeat ARQ: SACK bitmaps, re-sends, in-order hold
+
+from arq import ArqLink, ARQ_HDR
+from rf_codec import T_ARQ, T_ARQ_ACK
+
+
+def body(i):
+    return bytes((0x45, i)) + b"payload"
+
+
+def send(tx, n, io=False, now=0.0):
+    return [tx.wrap(2, body(i), io, now) for i in range(n)]
+
+
+def deliver(rx, wires, now=1.0):
+    got = []
+    for w in wires:
+        got += [f for _, f in rx.input(1, w, now)]
+    return got
+
+
+def test_sack_reports_holes():
+    tx = ArqLink(); rx = ArqLink()
+    w = send(tx, 5)
+    got = deliver(rx, [w[0], w[2], w[3], w[4]])
+    assert got == [body(0), body(2), body(3), body(4)]     # not in-order: handed on at once
+    ack = rx.ack_frame()
+    assert ack == bytes((T_ARQ_ACK, 0x80 | 1, 0b111))
+    assert rx.ack_frame() is None                          # owed once
+    tx.input(2, ack, 1.5)
+    assert tx.outstanding() == 4                           # base stays on 1 ...
+    assert [tx.frame[k] is None for k in range(5)] == [True, False, True, True, True]   # ... 2-4 freed
+
+
+def test_retransmits_only_the_missing_frame():
+    tx = ArqLink(rto_s=3.0); rx = ArqLink()
+    w = send(tx, 4)
+    deliver(rx, [w[0], w[2], w[3]])
+    tx.input(2, rx.ack_frame(), 1.0)
+    assert tx.retx(2.0) is None                            # RTO not up yet
+    dest, again = tx.retx(tx.rto + 0.1)
+    assert dest == 2 and again[1] & 0x7F == 1 and again[ARQ_HDR:] == body(1)
+    assert tx.retx(tx.rto + 0.2) is None
+    assert deliver(rx, [again]) == [body(1)]
+    tx.input(2, rx.ack_frame(), tx.rto + 1.0)
+    assert not tx.pending() and tx.n_retx == 1
+
+
+def test_ack_piggybacks_on_data():
+    a = ArqLink(); b = ArqLink()
+    deliver(b, send(a, 3))
+    w = b.wrap(1, body(9), False, 1.0)
+    assert w[0] == T_ARQ and w[2] == 0x80 | 3 and w[3] == 0
+    assert deliver(a, [w]) == [body(9)]
+    assert a.outstanding() == 0
+
+
+def test_in_order_frames_wait_for_the_gap():
+    tx = ArqLink(); rx = ArqLink()
+    w = send(tx, 4, io=True)
+    assert deliver(rx, [w[0], w[2], w[3]]) == [body(0)]
+    assert rx.n_ooo == 2
+    assert deliver(rx, [w[1]]) == [body(1), body(2), body(3)]
+    assert not rx.pending()
+
+
+def test_gap_skipped_after_hold():
+    tx = ArqLink(); rx = ArqLink(hold_s=8.0)
+    w = send(tx, 3, io=True)
+    deliver(rx, [w[0], w[2]], now=1.0)
+    assert [f for _, f in rx.expire(5.0)] == []
+    assert [f for _, f in rx.expire(9.0)] == [body(2)]
+    assert rx.n_skip == 1
+    assert deliver(rx, [w[1]], now=10.0) == []             # late copy is a duplicate
+    assert rx.n_dup == 1
+
+
+def test_duplicates_dropped():
+    tx = ArqLink(); rx = ArqLink()
+    w = send(tx, 2)
+    assert deliver(rx, w + w) == [body(0), body(1)]
+    assert rx.n_dup == 2
+
+
+def test_gives_up_after_max_tries():
+    tx = ArqLink(max_tries=2, rto_s=1.0, rto_min=1.0)
+    send(tx, 1)
+    assert tx.retx(1.0) is not None
+    assert tx.retx(3.5) is None                            # RTO doubles per try
+    assert tx.n_giveup == 1 and not tx.pending()
+
+
+def test_window_limits_sends():
+    tx = ArqLink(window=4)
+    send(tx, 4)
+    assert not tx.can_send()
+
+
+def test_rtt_sets_rto():
+    tx = ArqLink(rto_s=3.0, rto_min=0.8); rx = ArqLink()
+    deliver(rx, send(tx, 1, now=0.0))
+    tx.input(2, rx.ack_frame(), 1.0)
+    assert tx.srtt == 1.0 and tx.rto == 3.0                # srtt + 4 * rtt/2
@@ -0,0 +1,57 @@
+# test_bridge.py — code_A.py / code_B.py end to end on the emulated radios (sim/)
+
+from harness import build_pair
+from packets import tcp, TCP_ACK, TCP_PSH
+
+A = "10.10.10.1"; B = "10.10.10.2"
+
+
+def run(traffic, t_end=30.0):
+    clock, air, a, b, logs = build_pair(t_end=t_end)
+    a.start(); b.start()
+    clock.spawn(lambda: traffic(clock, a, b), "hosts")
+    clock.run()
+    return a, b
+
+
+def pump(clock, a, b, secs):
+    for _ in range(int(secs * 10)):
+        a.host.pump(); b.host.pump(); clock.sleep(0.1)
+
+
+def test_packets_cross_both_ways():
+    pa = tcp(A, B, 40000, 5001, 1, 1, TCP_ACK | TCP_PSH, b"hello from A" * 20, ts=(1, 1))
+    pb = tcp(B, A, 5001, 40000, 1, 1, TCP_ACK | TCP_PSH, b"hi", ts=(1, 1))
+    def traffic(clock, a, b):
+        clock.sleep(3.0); a.host.send(pa); b.host.send(pb); pump(clock, a, b, 20)
+    a, b = run(traffic)
+    assert [p for _, port, p in b.host.received if port == 0] == [pa]
+    assert [p for _, port, p in a.host.received if port == 0] == [pb]
+
+
+def test_queued_acks_are_thinned():
+    # ACKs that pile up behind a long send collapse into the newest one
+    big = tcp(A, B, 40000, 5001, 1, 1, TCP_ACK | TCP_PSH, bytes(400), ts=(1, 1))
+    acks = [tcp(A, B, 40001, 5002, 9, 1000 * i, TCP_ACK, ts=(i, 1), ident=i) for i in range(1, 6)]
+    def traffic(clock, a, b):
+        clock.sleep(3.0); a.host.send(big); pump(clock, a, b, 0.3)
+        for p in acks: a.host.send(p)
+        pump(clock, a, b, 25)
+    a, b = run(traffic)
+    got = [p for _, port, p in b.host.received if port == 0]
+    sent = [p for p in got if p != big]
+    assert big in got and sent[-1] == acks[-1]
+    assert len(sent) == len(acks) - a.globals["acks_thinned"]
+    assert a.globals["acks_thinned"] >= 3
+
+
+def test_sethw_radio_keys_need_both():
+    def traffic(clock, a, b):
+        clock.sleep(3.0)
+        for cmd in (b"sf=8", b"sf=8 both=1", b"data=4 gap=0.5"):
+            a.host.send(cmd, port=0x06); pump(clock, a, b, 6)
+    a, b = run(traffic)
+    replies = [p.decode() for _, port, p in a.host.received if port == 0x06]
+    assert replies[0].startswith("ERR sf")
+    assert replies[1].startswith("OK sf=8 ")
+    assert " data=4 " in replies[2] and " gap=0.50 " in replies[2]
@@ -0,0 +1,64 @@
+# test_fec.py — forward erasure correction: any m lost frames of a group come back
+
+import itertools, random
+
+import pytest
+
+from fec import FecEncoder, FecDecoder, gf_mul, gf_inv
+from rf_codec import T_FEC, T_FEC_P
+
+
+def frames(k, seed):
+    rng = random.Random(seed)
+    return [bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 120))) for _ in range(k)]
+
+
+def group(k, m, seed=1):
+    enc = FecEncoder(k=(k,), m=(m,), max_frame=200)
+    data = frames(k, seed)
+    air = [enc.wrap(0, 2, f, 0.0) for f in data]
+    while enc.pending: air.append(enc.pop()[1])
+    return data, air
+
+
+def test_gf_inverse():
+    for a in range(1, 256):
+        assert gf_mul(a, gf_inv(a)) == 1
+
+
+@pytest.mark.parametrize("k,m", [(4, 1), (4, 2), (8, 3), (15, 3)])
+def test_recovers_any_m_losses(k, m):
+    data, air = group(k, m, seed=k * 10 + m)
+    assert len(air) == k + m
+    assert [f[0] for f in air] == [T_FEC] * k + [T_FEC_P] * m
+    for lost in itertools.combinations(range(k + m), m):
+        dec = FecDecoder(); got = []
+        for i, f in enumerate(air):
+            if i not in lost: got += dec.input(1, f, 0.0)
+        assert sorted(got) == sorted(data)
+        assert dec.n_failed == 0
+
+
+def test_too_many_losses_passes_the_rest():
+    data, air = group(4, 1)
+    dec = FecDecoder(); got = []
+    for f in air[2:]: got += dec.input(1, f, 0.0)
+    assert got == data[2:] and dec.n_recovered == 0
+
+
+def test_short_group_flushed():
+    enc = FecEncoder(k=(8,), m=(1,), max_frame=200, flush_s=2.0)
+    data = frames(3, 7)
+    air = [enc.wrap(0, 2, f, 0.0) for f in data]
+    enc.tick(1.0); assert not enc.pending
+    enc.tick(2.0); air.append(enc.pop()[1])
+    assert air[-1][2] >> 4 == 3                          # parity covers k=3
+    dec = FecDecoder(); got = []
+    for f in air[1:]: got += dec.input(1, f, 0.0)
+    assert sorted(got) == sorted(data)
+
+
+def test_class_without_parity_is_untouched():
+    enc = FecEncoder(k=(4, 4), m=(1, 0))
+    assert enc.wrap(1, 2, b"\x45abc", 0.0) == b"\x45abc"
+    assert FecDecoder().input(1, b"\x45abc", 0.0) == [b"\x45abc"]
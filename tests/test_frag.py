@@ -0,0 +1,71 @@
+# test_frag.py — fragmentation: pieces in any order, timeouts, bad pieces
+
+import random
+
+from frag import Fragmenter, Reassembler, frag_capacity, FRAG_MAX, FRAG_HDR
+from rf_codec import T_FRAG
+
+
+def frame(n):
+    return bytes((0x45,)) + bytes(i & 0xFF for i in range(n - 1))
+
+
+def test_split_sizes():
+    f = Fragmenter()
+    pieces = f.split(frame(500), 160)
+    assert len(pieces) == 4
+    assert all(p[0] == T_FRAG and len(p) <= 160 for p in pieces)
+    assert f.split(frame(frag_capacity(160) + 1), 160) is None
+    assert len(f.split(frame(frag_capacity(160)), 160)) == FRAG_MAX
+
+
+def test_reassembly_out_of_order():
+    f = Fragmenter(); r = Reassembler()
+    for seed in range(20):
+        data = frame(700)
+        pieces = f.split(data, 100)
+        random.Random(seed).shuffle(pieces)
+        out = [r.feed(1, p, 0.0) for p in pieces]
+        assert out[:-1] == [None] * (len(pieces) - 1)
+        assert out[-1] == data
+    assert r.n_done == 20 and r.n_lost == 0
+
+
+def test_interleaved_senders():
+    f1 = Fragmenter(); f2 = Fragmenter(); r = Reassembler()
+    a = frame(300); b = frame(150)[::-1]
+    pa = f1.split(a, 80); pb = f2.split(b, 80)            # both use id 1
+    got = []
+    for x, y in zip(pa, pb):
+        got += [r.feed(1, x, 0.0), r.feed(2, y, 0.0)]
+    got += [r.feed(1, x, 0.0) for x in pa[len(pb):]]
+    assert [g for g in got if g] == [b, a]
+
+
+def test_timeout_drops_incomplete():
+    f = Fragmenter(); r = Reassembler(timeout_s=5.0)
+    old = f.split(frame(300), 100)
+    for p in old[:-1]: r.feed(1, p, 0.0)
+    new = frame(200)
+    for p in f.split(new, 100)[:-1]: r.feed(1, p, 10.0)   # sweeps the stale slot
+    assert r.n_lost == 1
+    assert r.feed(1, old[-1], 10.0) is None               # its slot is gone
+    assert r.feed(1, f.split(new, 100)[-1], 11.0) is None  # new id, incomplete
+
+
+def test_slot_reuse_when_full():
+    f = Fragmenter(); r = Reassembler(slots=2)
+    heads = [f.split(frame(300), 100) for _ in range(3)]
+    for t, ps in enumerate(heads): r.feed(1, ps[0], float(t))
+    assert r.n_lost == 1                                  # oldest evicted
+    for p in heads[2][1:]: out = r.feed(1, p, 3.0)
+    assert out == frame(300)
+
+
+def test_pass_through_and_bad():
+    r = Reassembler()
+    assert r.feed(1, b"\x45abc", 0.0) == b"\x45abc"
+    assert r.feed(1, bytes((T_FRAG, 1, 0x01, 100)), 0.0) is None      # no data
+    assert r.feed(1, bytes((T_FRAG, 1, 0x21, 10)) + bytes(10), 0.0) is None   # idx > last
+    assert r.feed(1, bytes((T_FRAG, 1, 0x01, 10)) + bytes(5), 0.0) is None    # short middle piece
+    assert r.n_bad == 3
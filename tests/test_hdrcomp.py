@@ -0,0 +1,143 @@
+# test_hdrcomp.py — TCP/IP header compression: round trips, reseeds and losses
+
+from packets import tcp, TCP_ACK, TCP_PSH, TCP_SYN
+from hdrcomp import HeaderCompressor, HeaderDecompressor, ip_checksum, HC_REFRESH, HC_REPEAT, HC_WINDOW
+from rf_codec import T_HC_FULL, T_HC_COMP
+
+A = "10.10.10.1"; B = "10.10.10.2"
+
+
+def acks(n, ack0=5000, step=400, ident0=1, ts0=1000, sport=40000):
+    """Pure ACKs of one flow: ack, IP ID and TSval all advance."""
+    return [tcp(B, A, 5001, sport, 7000, ack0 + i * step, TCP_ACK, ts=(ts0 + 50 * i, 900 + 40 * i),
+                ident=ident0 + i) for i in range(n)]
+
+
+def data(n, seq0=1000, seg=100, ident0=1):
+    return [tcp(A, B, 40000, 5001, seq0 + i * seg, 7000, TCP_ACK | TCP_PSH,
+                bytes((i + j) & 0xFF for j in range(seg)), ts=(2000 + 10 * i, 500), ident=ident0 + i)
+            for i in range(n)]
+
+
+def test_round_trip_and_saving():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(40)
+    frames = [tx.compress(p) for p in pkts]
+    assert [rx.decompress(f) for f in frames] == pkts
+    assert frames[0][0] == T_HC_FULL and frames[-1][0] == T_HC_COMP
+    assert sum(map(len, frames)) < sum(map(len, pkts)) // 2
+    assert tx.saved == sum(map(len, pkts)) - sum(map(len, frames))
+    assert rx.n_miss == 0
+
+
+def test_payload_round_trip():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = data(30)
+    assert [rx.decompress(tx.compress(p)) for p in pkts] == pkts
+
+
+def test_first_packets_go_full():
+    tx = HeaderCompressor()
+    types = [tx.compress(p)[0] for p in acks(HC_REPEAT + 1)]
+    assert types == [T_HC_FULL] * HC_REPEAT + [T_HC_COMP]
+
+
+def test_uncompressible_pass_through():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    syn = tcp(A, B, 40000, 5001, 1, 0, TCP_SYN, ts=(1, 0))
+    assert tx.compress(syn) is syn and rx.decompress(syn) is syn
+    raw = b"\x45" + bytes(10)
+    assert tx.compress(raw) is raw and rx.decompress(raw) is raw
+
+
+def test_refresh_reseeds_under_new_generation():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(HC_REFRESH + 5)
+    frames = [tx.compress(p) for p in pkts]
+    gens = {f[1] & 0x0F for f in frames}
+    assert len(gens) == 2
+    assert frames[HC_REFRESH][0] == T_HC_FULL
+    assert [rx.decompress(f) for f in frames] == pkts
+
+
+def test_duplicate_ack_and_retransmission_reseed():
+    tx = HeaderCompressor()
+    pkts = acks(5)
+    for p in pkts: tx.compress(p)
+    dup = tcp(B, A, 5001, 40000, 7000, 5000 + 4 * 400, TCP_ACK, ts=(1300, 1100), ident=6)
+    assert tx.compress(dup)[0] == T_HC_FULL
+    d = data(6)
+    for p in d: tx.compress(p)
+    assert tx.compress(d[2])[0] == T_HC_FULL           # seq went back
+
+
+def test_static_change_reseeds():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(7)
+    for p in pkts[:6]: rx.decompress(tx.compress(p))
+    h = bytearray(pkts[6]); h[1] = 0x10                 # TOS changed
+    h[10:12] = b"\0\0"; h[10:12] = ip_checksum(h, 20).to_bytes(2, "big")
+    f = tx.compress(bytes(h))
+    assert f[0] == T_HC_FULL and rx.decompress(f) == bytes(h)
+
+
+def test_loss_within_window_decodes():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(30)
+    frames = [tx.compress(p) for p in pkts]
+    for i in range(HC_REPEAT): rx.decompress(frames[i])
+    # lose HC_WINDOW - 1 frames in a row, then everything else must decode
+    skip = set(range(HC_REPEAT + 2, HC_REPEAT + 1 + HC_WINDOW))
+    for i in range(HC_REPEAT, 30):
+        if i in skip: continue
+        assert rx.decompress(frames[i]) == pkts[i]
+    assert rx.n_miss == 0
+
+
+def test_long_gap_is_dropped_not_misread():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(HC_REFRESH - 1)
+    frames = [tx.compress(p) for p in pkts]
+    for i in range(HC_REPEAT): rx.decompress(frames[i])
+    first = HC_REPEAT + HC_WINDOW + 1                  # a gap the window cannot cover
+    out = [rx.decompress(f) for f in frames[first:]]
+    assert all(o is None or o == p for o, p in zip(out, pkts[first:]))
+    assert out[0] is None and rx.n_miss >= 1
+
+
+def test_recovers_at_next_full_after_loss():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(HC_REFRESH + 10)
+    frames = [tx.compress(p) for p in pkts]
+    rx.decompress(frames[0])
+    got = [rx.decompress(f) for f in frames[HC_REPEAT + 20:]]
+    assert got[-1] == pkts[-1]                          # the refresh reseeded the context
+    assert all(o is None or o == p for o, p in zip(got, pkts[HC_REPEAT + 20:]))
+
+
+def test_generation_mismatch_is_a_miss():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(8)
+    frames = [tx.compress(p) for p in pkts]
+    for f in frames[:4]: rx.decompress(f)
+    bad = bytearray(frames[4]); bad[1] ^= 0x01
+    assert rx.decompress(bytes(bad)) is None
+    assert rx.n_miss == 1
+
+
+def test_large_jumps_use_wide_fields():
+    tx = HeaderCompressor(); rx = HeaderDecompressor()
+    pkts = acks(12, step=70000)                         # ACK advances by more than 16 bits
+    assert [rx.decompress(tx.compress(p)) for p in pkts] == pkts
+
+
+def test_never_longer_than_a_full_frame():
+    tx = HeaderCompressor()
+    for p in acks(20, step=0x40000000) + data(20, seg=1):
+        assert len(tx.compress(p)) <= len(p) + 3
+
+
+def test_max_frame_keeps_packet_raw():
+    p = data(1, seg=150)[0]
+    tx = HeaderCompressor(max_frame=len(p) + 1)
+    assert tx.compress(p) is p
@@ -0,0 +1,57 @@
+# test_kiss.py — KISS framing: frames split across serial reads at any byte
+
+from kiss import KissDecoder, KissEncoder, kiss_encode, FEND, FESC
+
+PKTS = [b"\x45hello", bytes((FEND, FESC, FEND, 1, FESC)), bytes(range(256)), b"\x45"]
+STREAM = b"".join(kiss_encode(p) for p in PKTS)
+
+
+def test_encoders_agree():
+    enc = KissEncoder(512)
+    for p in PKTS:
+        assert bytes(enc.encode(p)) == kiss_encode(p)
+        assert KissDecoder().feed(kiss_encode(p)) == [p]
+
+
+def test_every_split_point():
+    for cut in range(len(STREAM) + 1):
+        d = KissDecoder(); got = []
+        got += d.feed(STREAM[:cut]); got += d.feed(STREAM[cut:])
+        assert got == PKTS, cut
+
+
+def test_one_byte_at_a_time():
+    d = KissDecoder(); got = []
+    for i in range(len(STREAM)):
+        got += d.feed(STREAM[i:i + 1])
+    assert got == PKTS and d.n_frames == len(PKTS)
+
+
+def test_split_escape():
+    d = KissDecoder()
+    f = kiss_encode(bytes((FESC,)))
+    i = f.index(FESC)
+    assert d.feed(f[:i + 1]) == []                     # ends on the FESC
+    assert d.feed(f[i + 1:]) == [bytes((FESC,))]
+
+
+def test_noise_before_first_fend_and_empty_frames():
+    d = KissDecoder()
+    assert d.feed(b"garbage" + bytes((FEND, FEND, FEND)) + kiss_encode(b"\x45x")) == [b"\x45x"]
+
+
+def test_oversize_dropped():
+    d = KissDecoder(max_frame=16)
+    got = d.feed(kiss_encode(bytes(17)) + kiss_encode(bytes(16)))
+    assert got == [bytes(16)] and d.n_oversize == 1
+
+
+def test_commands_go_to_on_cmd():
+    seen = []
+    d = KissDecoder(on_cmd=lambda port, cmd, data: seen.append((port, cmd, data)))
+    stream = bytes((FEND, 0x01, 50, FEND, FEND, 0x16)) + b"sf=8" + bytes((FEND,)) + kiss_encode(b"\x45")
+    assert d.feed(stream) == [b"\x45"]
+    assert seen == [(0, 1, bytes((50,))), (1, 6, b"sf=8")] and d.n_cmd == 2
+    d2 = KissDecoder()
+    d2.feed(bytes((FEND, 0x01, 50, FEND)))
+    assert d2.n_other == 1
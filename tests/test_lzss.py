@@ -0,0 +1,60 @@
+# test_lzss.py — LZSS: round trips, the preset dictionary, malformed input
+
+import random
+
+from lzss import lz_compress, lz_decompress, LzCompressor, LzDecompressor, LZ_DICT
+from rf_codec import T_LZ, T_LZ_D
+
+TEXT = (b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 120\r\n\r\n'
+        b'{"node": 3, "status": "ok", "uptime": 81234, "peers": [1, 2, 3], "status2": "ok"}')
+
+
+def noise(n, seed):
+    rng = random.Random(seed)
+    return bytes(rng.getrandbits(8) for _ in range(n))
+
+
+def samples():
+    rng = random.Random(5)
+    yield b""
+    yield b"a"
+    yield b"abc" * 200                                  # overlapping matches
+    yield bytes(300)                                   # longest match length
+    yield TEXT
+    yield noise(500, 5)
+    yield bytes(rng.choice(b"ab ") for _ in range(5000))   # matches beyond the 4 KB window
+
+
+def test_round_trip():
+    for s in samples():
+        assert lz_decompress(lz_compress(s), limit=len(s)) == s
+        assert lz_decompress(lz_compress(s, LZ_DICT), LZ_DICT, len(s)) == s
+
+
+def test_dictionary_helps_http():
+    assert len(lz_compress(TEXT, LZ_DICT)) < len(lz_compress(TEXT)) < len(TEXT)
+
+
+def test_limit_gives_up():
+    rnd = noise(400, 1)
+    assert lz_compress(rnd, limit=len(rnd) - 2) is None
+    assert lz_compress(TEXT, limit=10) is None
+
+
+def test_malformed_and_oversize():
+    z = lz_compress(b"abc" * 100)
+    assert lz_decompress(z, limit=100) is None           # expands past the limit
+    assert lz_decompress(b"\x01\xff\xff") is None         # match before the start
+
+
+def test_frame_wrappers():
+    tx = LzCompressor(); rx = LzDecompressor()
+    f = tx.compress(TEXT)
+    assert f[0] == T_LZ_D and rx.decompress(f) == TEXT
+    short = b"\x45" + bytes(10)
+    assert tx.compress(short) is short and rx.decompress(short) is short
+    rnd = noise(100, 2)
+    assert tx.compress(rnd) is rnd and tx.n_skip == 1
+    plain = LzCompressor(use_dict=False).compress(TEXT)
+    assert plain[0] == T_LZ and rx.decompress(plain) == TEXT
+    assert rx.decompress(bytes((T_LZ, 0x01, 0xff, 0xff))) is None and rx.n_bad == 1
@@ -0,0 +1,67 @@
+# test_pkt_peek.py — ACK thinning keys: which queued ACK a newer one replaces
+
+from packets import tcp, TCP_ACK, TCP_PSH, TCP_FIN
+from pkt_peek import tcp_ack_key, superseded_ack, is_pure_tcp_ack, flow_hash
+from pktqueue import Ring
+
+A = "10.10.10.1"; B = "10.10.10.2"
+
+
+def ack(n, sport=40000, ts=(100, 50), sack=False):
+    p = tcp(B, A, 5001, sport, 7000, n, TCP_ACK, ts=ts)
+    if not sack: return p
+    # splice in a SACK block option (kind 5) ahead of the timestamps
+    h = bytearray(p)
+    opt = bytes((1, 1, 5, 10)) + (n + 1000).to_bytes(4, "big") + (n + 2000).to_bytes(4, "big")
+    h[32:32] = opt
+    h[32] = (h[32] >> 4) + 3 << 4
+    h[2:4] = len(h).to_bytes(2, "big")
+    return bytes(h)
+
+
+def queue(*pkts):
+    q = Ring(8)
+    for p in pkts: q.push(2, p, len(p))
+    return q
+
+
+def test_keys():
+    assert tcp_ack_key(ack(10))[1] == 10
+    assert tcp_ack_key(ack(10))[0] == tcp_ack_key(ack(99))[0]
+    assert tcp_ack_key(ack(10, sport=1))[0] != tcp_ack_key(ack(10))[0]
+    assert tcp_ack_key(ack(10, sack=True)) is None
+    assert tcp_ack_key(tcp(B, A, 5001, 40000, 7000, 10, TCP_ACK | TCP_PSH, b"x")) is None
+    assert tcp_ack_key(tcp(B, A, 5001, 40000, 7000, 10, TCP_ACK | TCP_FIN)) is None
+    assert is_pure_tcp_ack(ack(10)) and not is_pure_tcp_ack(tcp(B, A, 1, 2, 3, 4, TCP_ACK, b"x"))
+    assert flow_hash(ack(10)) == flow_hash(ack(20)) != flow_hash(ack(10, sport=1))
+
+
+def test_newer_ack_replaces_queued_one():
+    q = queue(ack(100, sport=1), ack(100), ack(200, sport=1))
+    assert superseded_ack(q, tcp_ack_key(ack(300))) == 1
+    assert superseded_ack(q, tcp_ack_key(ack(300, sport=1))) == 2
+
+
+def test_older_or_equal_ack_kept():
+    q = queue(ack(200))
+    assert superseded_ack(q, tcp_ack_key(ack(200))) == -1      # a duplicate: goes out too
+    assert superseded_ack(q, tcp_ack_key(ack(100))) == -1
+    assert superseded_ack(queue(), tcp_ack_key(ack(100))) == -1
+
+
+def test_duplicate_acks_kept():
+    # a run of duplicates is what triggers the sender's fast retransmit
+    q = queue(ack(200), ack(200))
+    assert superseded_ack(q, tcp_ack_key(ack(300))) == -1
+
+
+def test_sack_bearing_ack_kept():
+    q = queue(ack(100, sack=True))
+    assert superseded_ack(q, tcp_ack_key(ack(300))) == -1
+    q = queue(ack(100), ack(150, sack=True))
+    assert superseded_ack(q, tcp_ack_key(ack(300))) == 0       # only the plain one
+
+
+def test_sequence_wrap():
+    q = queue(ack(0xFFFFFF00))
+    assert superseded_ack(q, tcp_ack_key(ack(0x10))) == 0
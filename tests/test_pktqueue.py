@@ -0,0 +1,82 @@
+# test_pktqueue.py — TX queues: ring order, lowered limits, flow fairness, CoDel
+
+from pktqueue import Ring, PrioQueue, FlowQueue, ACK, DATA, LO
+
+
+def test_ring_order_and_wrap():
+    r = Ring(3)
+    for i in range(10):
+        assert r.push(2, i, 1, float(i))
+        assert r.pop() == (2, i, 1) and r.last_t == float(i)
+    assert r.pop() is None
+
+
+def test_ring_lowered_limit_keeps_queued():
+    r = Ring(4)
+    for i in range(4): r.push(2, i, 1)
+    assert r.set_limit(2) == 2 and len(r) == 4
+    assert not r.push(2, 9, 1)
+    r.pop(); r.pop(); r.pop()
+    assert r.push(2, 9, 1) and not r.push(2, 10, 1)
+    assert r.set_limit(99) == 4
+
+
+def test_ring_put_at():
+    r = Ring(3)
+    for i in range(3): r.push(2, i, 1, 5.0)
+    r.pop(); r.push(2, 3, 1, 6.0)
+    r.put_at(2, 7, "x", 9)
+    assert r.pkt_at(2) == "x"
+    assert [r.pop() for _ in range(3)][2] == (7, "x", 9) and r.last_t == 6.0
+
+
+def test_prio_queue():
+    q = PrioQueue(2, 2, 2)
+    q.push(LO, 2, "lo", 1); q.push(DATA, 2, "data", 1); q.push(ACK, 2, "ack", 1)
+    assert q.pop(DATA) == (2, "data", 1)
+    assert [q.pop()[1] for _ in range(2)] == ["ack", "lo"]
+
+
+def test_flows_served_round_robin():
+    q = FlowQueue(cap=20, quantum=100)
+    for i in range(6): q.push(1, 2, "bulk%d" % i, 100)
+    q.push(2, 2, "key", 10)
+    out = [q.pop(0.0)[1] for _ in range(7)]
+    assert out.index("key") <= 2                        # not behind all of the bulk flow
+    assert q.pop(0.0) is None and q.flows() == 0
+
+
+def test_full_pool_drops_head_of_longest_flow():
+    q = FlowQueue(cap=4)
+    for i in range(3): q.push(1, 2, "a%d" % i, 1)
+    q.push(2, 2, "b0", 1)
+    assert not q.push(2, 2, "b1", 1)                     # stored, but a0 was dropped
+    assert q.n_overflow == 1 and len(q) == 4
+    assert sorted(q.pop(0.0)[1] for _ in range(4)) == ["a1", "a2", "b0", "b1"]
+
+
+def test_lowered_limit_refuses_new_packets():
+    q = FlowQueue(cap=8)
+    for i in range(6): q.push(i, 2, i, 1)
+    q.set_limit(4)
+    assert not q.push(7, 2, 7, 1)
+    assert len(q) == 6 and q.n_overflow == 0             # nothing queued was lost
+    q.pop(0.0); q.pop(0.0); q.pop(0.0)
+    assert q.push(7, 2, 7, 1) and not q.push(8, 2, 8, 1)
+
+
+def test_codel_drops_standing_queue():
+    q = FlowQueue(cap=40, target_s=1.0, interval_s=2.0)
+    for i in range(30): q.push(1, 2, i, 1, 0.0)
+    got = []; now = 5.0
+    while len(q):
+        got.append(q.pop(now)[1]); now += 0.5
+    assert q.n_codel > 0 and len(got) + q.n_codel == 30
+    assert got == sorted(got)
+
+
+def test_last_tier():
+    q = FlowQueue()
+    q.push(1, 2, "x", 1, 3.0, LO)
+    q.pop(3.0)
+    assert q.last_tier == LO and q.last_t == 3.0
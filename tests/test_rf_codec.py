@@ -0,0 +1,68 @@
+# test_rf_codec.py — ASCII codecs: every frame fits one AT+SEND and decodes back
+
+import random
+
+import pytest
+
+from rf_codec import CODECS, codec_for, bundle, unbundle, b64_raw_limit, b91_raw_limit, T_BUNDLE
+
+MAX_ASCII = 220          # MAX_RF_ASCII_BYTES in code_A.py / code_B.py
+
+
+def patterns(n, seed=1):
+    rng = random.Random(seed)
+    yield bytes(n)
+    yield b"\xff" * n
+    yield bytes(i & 0xFF for i in range(n))
+    for _ in range(4):
+        yield bytes(rng.getrandbits(8) for _ in range(n))
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_encode_into_fits_and_decodes(name):
+    c = CODECS[name]
+    limit = c.raw_limit(MAX_ASCII)
+    out = bytearray(MAX_ASCII + 8)
+    for n in (0, 1, 2, 3, 13, 100, limit - 1, limit):
+        for data in patterns(n, seed=n):
+            L = c.encode_into(data, out)
+            assert L <= MAX_ASCII
+            frame = bytes(out[:L])
+            assert frame.decode() == c.encode(data)
+            assert codec_for(frame) is c
+            assert c.decode(frame) == data
+            assert c.decode(frame.decode()) == data
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_raw_limit_is_tight_enough(name):
+    # raw_limit(n) must fit for every n, not only 220
+    c = CODECS[name]
+    for n in range(4, 240):
+        L = c.raw_limit(n)
+        for data in patterns(L, seed=n):
+            assert len(c.encode(data)) <= n
+
+
+def test_raw_limits():
+    assert b64_raw_limit(218) == 162
+    assert b91_raw_limit(218) == 177
+
+
+def test_b91_never_emits_comma():
+    data = bytes(range(256)) * 2
+    assert "," not in CODECS["b91"].encode(data)
+
+
+def test_codec_for_unknown():
+    assert codec_for("X:abc") is None
+    assert codec_for(b"Z") is None
+
+
+def test_bundle_round_trip():
+    frames = [b"\x45" + bytes(10), b"\x81\x10\x01abc", bytes(range(200))]
+    b = bundle(frames)
+    assert b[0] == T_BUNDLE
+    assert unbundle(b) == frames
+    assert unbundle(b"\x45abc") == [b"\x45abc"]
+    assert unbundle(b[:-5]) == frames[:2]           # truncated last frame is dropped
@@ -0,0 +1,23 @@
+# test_scripts.py — code_A.py and code_B.py are one bridge with two sets of site settings
+
+import os
+
+from conftest import ROOT
+
+
+def shared(name):
+    """The script without its header comment and its PER-DEVICE SETTINGS block."""
+    with open(os.path.join(ROOT, name)) as f:
+        lines = f.read().splitlines()
+    i = 0
+    while lines[i].startswith("#"): i += 1
+    start = next(j for j, l in enumerate(lines) if l.startswith("# ========= PER-DEVICE SETTINGS"))
+    end = next(j for j in range(start + 1, len(lines)) if lines[j].startswith("# ========="))
+    return lines[i:start] + lines[end:]
+
+
+def test_scripts_differ_only_in_site_settings():
+    a = shared("code_A.py"); b = shared("code_B.py")
+    for n, (x, y) in enumerate(zip(a, b)):
+        assert x == y, "first difference outside PER-DEVICE SETTINGS:\n  A: %s\n  B: %s" % (x, y)
+    assert len(a) == len(b)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# kiss_ctl.py — tune a running bridge over its data CDC port with KISS commands
+#
+# Sends the standard KISS TNC parameters and the bridge's SetHardware
+# frames (see lib/kisscmd.py) to the same serial device tncattach uses, so
+# the link can be tuned against live traffic without a reboot:
+#
+#   python3 tools/kiss_ctl.py /dev/ttyACM1 get
+#   python3 tools/kiss_ctl.py /dev/ttyACM1 set sf=8 cr=1 both=1 pwr=14 data=8
+#   python3 tools/kiss_ctl.py /dev/ttyACM1 txdelay 50 slottime 100 persist 63 fullduplex 0
+#
+# txdelay and slottime are in ms (sent in 10 ms units). set and get wait
+# for the bridge's answer and print it; the exit status is 1 on "ERR" or
+# when no answer came. Radio settings change only this bridge's modules:
+# run the same set against the other end's host too, and add both=1 to
+# say so, or the bridge refuses them. The port is opened
+# raw with termios, no pyserial needed. If tncattach has the port open it
+# may read the answer first; it ignores such frames, and the setting still
+# takes effect.
+
+import argparse, os, select, sys, termios, time, tty
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "lib"))
+
+from kiss import KissDecoder, kiss_encode
+from kisscmd import KISS_TXDELAY, KISS_P, KISS_SLOTTIME, KISS_FULLDUPLEX, KISS_SETHW
+
+BYTE_CMDS = {"txdelay": (KISS_TXDELAY, 10), "slottime": (KISS_SLOTTIME, 10),
+             "persist": (KISS_P, 1), "fullduplex": (KISS_FULLDUPLEX, 1)}
+
+
+def frames(args):
+    """Command-line words -> list of (command, payload, label); ValueError on bad input."""
+    out = []; i = 0
+    while i < len(args):
+        w = args[i].lower(); i += 1
+        if w in BYTE_CMDS:
+            if i >= len(args): raise ValueError("%s needs a value" % w)
+            cmd, unit = BYTE_CMDS[w]
+            v = int(args[i]) // unit; i += 1
+            if not 0 <= v <= 255: raise ValueError("%s out of range" % w)
+            out.append((cmd, bytes((v,)), "%s %s" % (w, args[i - 1])))
+        elif w == "set":
+            kv = []
+            while i < len(args) and "=" in args[i]:
+                kv.append(args[i]); i += 1
+            if not kv: raise ValueError("set needs key=value")
+            out.append((KISS_SETHW, " ".join(kv).encode(), "set"))
+        elif w == "get":
+            out.append((KISS_SETHW, b"?", "get"))
+        else:
+            raise ValueError("unknown command " + w)
+    return out
+
+
+def open_port(path):
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+    if os.isatty(fd): tty.setraw(fd, termios.TCSANOW)
+    return fd
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Send KISS commands to a running bridge")
+    ap.add_argument("port", help="data CDC device, e.g. /dev/ttyACM1")
+    ap.add_argument("words", nargs="+", help="get | set key=value... | txdelay MS | slottime MS | persist P | fullduplex 0|1")
+    ap.add_argument("--wait", type=float, default=3.0, help="seconds to wait for each SetHardware answer")
+    a = ap.parse_args()
+    try: todo = frames(a.words)
+    except ValueError as e: ap.error(str(e))
+    fd = open_port(a.port)
+    answers = []
+    dec = KissDecoder(1024, on_cmd=lambda port, cmd, data: answers.append(data) if cmd == KISS_SETHW else None)
+    status = 0
+    for cmd, payload, label in todo:
+        os.write(fd, kiss_encode(payload, cmd))
+        if cmd != KISS_SETHW:
+            print("sent", label); continue
+        del answers[:]
+        end = time.monotonic() + a.wait
+        while not answers and time.monotonic() < end:
+            r, _, _ = select.select([fd], [], [], max(0.0, end - time.monotonic()))
+            if r: dec.feed(os.read(fd, 1024))
+        if not answers:
+            print("no answer (is another program reading %s?)" % a.port); status = 1; continue
+        text = answers[0].decode("ascii", "replace")
+        print(text)
+        if not text.startswith("OK"): status = 1
+    os.close(fd)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())